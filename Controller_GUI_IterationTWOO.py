@@ -1,75 +1,108 @@
+import time
+STARTUP_STARTED = time.perf_counter()  # origin for the time-to-interactive measurement
+
+import os
+import sys
 import tkinter as tk
 from tkinter import ttk, messagebox
 import threading
-import time
-import random
+
+from experiment_engine import (
+    ExperimentEngine, POLL_INTERVAL_MS,
+    EVENT_PROGRESS, EVENT_PAUSED, EVENT_RESUMED,
+    EVENT_DONE, EVENT_CANCELLED, EVENT_ERROR, EVENT_SAMPLES,
+)
+from dispense_scheduler import SimulatedPump
+from formulation import Formulation, Component
+from reagent_registry import reagents
+from experiment_log import (
+    ExperimentLog, last_experiment_number, format_experiment_summary, read_records, RECORD_EXPERIMENT,
+)
+from virtual_table import VirtualTable
+from recipe_cache import RecipeCache, format_results
+from trace_store import TraceStore, TRACE_DIR
+from instrumentation import tracer
 
 # ------------------------------------------------------------------
-# PYTHON CONTROLLER VARIABLES & PLACEHOLDERS (from your controller)
+# PYTHON CONTROLLER VARIABLES & PLACEHOLDERS
+# (now live in experiment_controller.py so headless runs share them)
 # ------------------------------------------------------------------
-import math  # just in case we need it
-
-# Ports, volumes, and placeholders
-ARDUINO_PORT = "/dev/tty.usbserial-1110"
-COND_METER_PORT = "COM15"
-BAUD_RATE = 115200
-TOTAL_VOLUME = 3.00  # ml
-
-PORT_ELECTROLYTE_LP30 = 1
-PORT_ADDITIVE_TEP = 2
-PORT_ARGON_GAS = 3
-PORT_ADDITIVE_X = 4
-PORT_ADDITIVE_Y = 5
-
-# Dictionary to store additives and their properties
-# (Will be updated by the GUI selections)
-additives = {
-    "TEP": {
-        "port": PORT_ADDITIVE_TEP,
-        "used": False,
-        "percentage": 0,
-        "volume": 0.0
-    },
-    "ADDITIVE_X": {
-        "port": PORT_ADDITIVE_X,
-        "used": False,
-        "percentage": 0,
-        "volume": 0.0
-    },
-    "ADDITIVE_Y": {
-        "port": PORT_ADDITIVE_Y,
-        "used": False,
-        "percentage": 0,
-        "volume": 0.0
-    },
-    "LP30": {
-        "port": PORT_ELECTROLYTE_LP30,
-        "used": True,
-        "percentage": 100,  # LP30 is always used by default
-        "volume": 0.0
-    },
-}
-
-# This dict is updated by the GUI to store user selections (like {"TEP": 50, "ADDITIVE_X": 30})
-selected_additives_from_ui = {}
-
-# For demonstration, we track the entire experiment list here
-experiments = []
+from experiment_controller import (
+    ARDUINO_PORT, COND_METER_PORT, BAUD_RATE, TOTAL_VOLUME, EXPERIMENT_LOG_PATH,
+    PORT_ELECTROLYTE_LP30, PORT_ARGON_GAS,
+    additives, selected_additives_from_ui, get_arduino, get_cond_meter,
+    build_log_record,
+    make_settling_detector, make_signal_pipeline,
+)
+from settling import SimulatedProbe
+from progress_model import ProgressModel, load_progress_model, format_eta
+from experiment_queue import (
+    ExperimentQueue, schedule, count_changeovers, changeover_plan, EXPERIMENT_QUEUE_PATH,
+)
+from formulation_validation import validate_batch, POLICIES, DEFAULT_POLICY
+
+# Written on exit when tracing is enabled (BATTERY_TRACE=1)
+TRACE_PATH = "trace.json"
+METRICS_PATH = "metrics.prom"
+
+# Window fade-in on startup; BATTERY_FADE_MS=0 skips it
+FADE_DURATION_MS = int(os.environ.get("BATTERY_FADE_MS", "150"))
+FADE_STEP_MS = 15
+
+# Virtualized tables: compounds and past experiments
+COMPOUND_COLUMNS = [("compound", "Compound"), ("additive", "Additive"), ("pct", "%")]
+HISTORY_COLUMNS = [
+    ("number", "#"), ("mode", "Mode"), ("compounds", "Compounds"),
+    ("iterations", "Iterations"), ("mean", "Mean Conductivity"), ("logged", "Logged"),
+]
+
+
+# Validation report panel; BATTERY_VALIDATION_POLICY sets the starting policy
+VALIDATION_POLICY = os.environ.get("BATTERY_VALIDATION_POLICY", DEFAULT_POLICY)
+VALIDATION_COLUMNS = [
+    ("item", "Formulation"), ("level", "Level"), ("check", "Check"), ("details", "Details"),
+]
+
+
+def compound_row(c):
+    return (c.name, c.additive_key, f"{c.percentage:.2f}")
+
+
+def history_row(record):
+    """Row of the History table for one experiment log record."""
+    readings = record.get("conductivity_readings") or []
+    mean = f"{sum(readings) / len(readings):.2f}" if readings else ""
+    compounds = " + ".join(f"{name} {pct:.2f}%" for name, pct in record.get("parsed_compounds", {}).items())
+    logged = time.strftime("%Y-%m-%d %H:%M", time.localtime(record.get("logged_at", time.time())))
+    return (record["experiment_number"], record.get("mode", ""), compounds or "LP30 only",
+            record.get("iterations", ""), mean, logged)
+
+
+# Snapshot of the learned per-stage timings (rebuilt from the log if missing)
+PROGRESS_STATS_PATH = "progress_stats.json"
 
 # ------------------------------------------------------------------
 # GUI CLASS
 # ------------------------------------------------------------------
 class BatteryExperimentApp:
-    def __init__(self, root):
-        """Initialize the main application window and layout."""
+    def __init__(self, root, fade_ms=FADE_DURATION_MS):
+        """
+        Initialize the main application window and layout.
+
+        Only the Manual tab is built here; the Automatic and History tabs
+        are built the first time they are selected. fade_ms=0 shows the window at once.
+        """
         self.root = root
         self.root.title("Battery Additives Experiment UI")
         self.root.geometry("800x600")
         self.root.resizable(True, True)
+        init_started = time.perf_counter()
         
         # Fade in the window from 0% to 100% opacity
-        self.root.attributes("-alpha", 0.0)
-        self.root.after(50, lambda: self.fade_in_step(0.0))
+        if fade_ms > 0:
+            self.root.attributes("-alpha", 0.0)
+            step = 1.0 / max(1, fade_ms // FADE_STEP_MS)
+            self.root.after(0, lambda: self.fade_in_step(0.0, step))
         
         # Handle window close
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
@@ -90,11 +123,17 @@ class BatteryExperimentApp:
         self.automatic_frame = tk.Frame(self.notebook, bg="#2C3E50")
         self.notebook.add(self.automatic_frame, text="Automatic")
 
+        # History Tab (every experiment in the log)
+        self.history_frame = tk.Frame(self.notebook, bg="#2C3E50")
+        self.notebook.add(self.history_frame, text="History")
+        self.history_table = None
+        self.history_index = None  # HistoryIndex, built on a worker thread
+
         # --- Shared Variables ---
         self.is_manual = False  # True if user submits Manual, False if Automatic
-        self.selected_default_compound = tk.StringVar(value="Compound 1")
+        self.selected_default_compound = tk.StringVar(value=reagents.compound_names()[0])
         self.total_additive_concentration = tk.StringVar(value="0.00")
-        self.selected_compounds = []  # Shared list of added compounds
+        self.selected_compounds = Formulation()  # Shared compounds (tables render from it)
 
         # Additional variables
         self.conductivity_value = tk.StringVar(value="0.00")
@@ -102,31 +141,151 @@ class BatteryExperimentApp:
         self.iterations = 10
         self.compounds = []  # Not used as heavily now, but retained
 
-        # Keep a log of all experiments for console output
+        # Experiments from this session (the full history is on disk)
         self.experiments_log = []
 
-        # Build the UIs
-        self.create_manual_ui()
-        self.create_automatic_ui()
+        # Persistent log; numbering continues from the previous session
+        self.experiment_log = ExperimentLog(EXPERIMENT_LOG_PATH)
+        self.experiment_count = last_experiment_number(EXPERIMENT_LOG_PATH)
+
+        # Automatic-mode candidates: (additive keys, percentages, volumes)
+        self.auto_candidates = None
+        self.optimizer = None  # ConductivityOptimizer over auto_candidates
+
+        # Per-stage timing statistics for the ETA (priors until the saved ones
+        # are loaded after the first frame)
+        self.progress_model = ProgressModel()
+        self.eta_value = tk.StringVar(value="Idle")
+
+        # Persistent experiment queue (survives restarts)
+        self.queue = ExperimentQueue(EXPERIMENT_QUEUE_PATH)
+        self.queue_running = False
+        self.current_job = None    # QueuedExperiment being run
+        self.queue_ports = None    # additive ports of the last queued job
+        self.queue_backlog = []    # [(plan, iterations)] still queued, for the ETA
+        self.queue_held = set()    # Automatic job ids with no candidate set (this run)
+        self.queue_status = tk.StringVar()
+        self.update_queue_status()
+
+        # Validation policy and the message line above the report panel
+        self.validation_policy = tk.StringVar(value=VALIDATION_POLICY)
+        self.status_message = tk.StringVar(value="")
+
+        # Planned recipes (LRU) and past results per recipe, for replicates
+        self.recipes = RecipeCache()
+        self.recipe_history = tk.StringVar(value="")
+
+        # Meter stand-in: relaxes toward a new value after each mix
+        self.probe = SimulatedProbe()
+
+        # Background experiment engine (None when idle); the signal pipeline
+        # (built on first use, NumPy) cleans the meter readings it settles on
+        self.engine = None
+        self.signal = None
+        self.traces = TraceStore(TRACE_DIR)  # every raw reading, per experiment
+        self.trace = None                   # TraceWriter of the running experiment
+        self.pending_experiment = None
+
+        # Build the visible tab now, the others on first selection
+        self.tab_builders = {
+            str(self.manual_frame): self.create_manual_ui,
+            str(self.automatic_frame): self.create_automatic_ui,
+            str(self.history_frame): self.create_history_ui,
+        }
+        self.notebook.bind("<<NotebookTabChanged>>", self.on_tab_changed)
+        self.build_tab(str(self.manual_frame))
+
+        self.init_seconds = time.perf_counter() - init_started
+        self.startup_ms = None
+        self.root.after_idle(self.on_first_frame)
+
+    # ---------- Startup ----------
+    def build_tab(self, tab):
+        builder = self.tab_builders.pop(tab, None)
+        if builder is not None:
+            with tracer.span(f"startup.{builder.__name__}"):
+                builder()
+
+    def on_tab_changed(self, event):
+        self.build_tab(self.notebook.select())
+
+    def on_first_frame(self):
+        """First idle callback: the window is drawn and accepting input."""
+        self.root.update_idletasks()
+        self.startup_ms = (time.perf_counter() - STARTUP_STARTED) * 1000
+        print(f"[Startup] Interactive after {self.startup_ms:.0f} ms "
+              f"(window setup {self.init_seconds * 1000:.0f} ms)")
+        # ETA statistics: the snapshot plus whatever was logged since
+        def load_stats():
+            with tracer.span("startup.progress_model"):
+                return load_progress_model(PROGRESS_STATS_PATH, EXPERIMENT_LOG_PATH)
+
+        self.run_in_background("ETA", load_stats, self.progress_loaded)
+
+        # Past results per recipe: the whole log is read on a worker thread
+        def load():
+            with tracer.span("startup.recipe_results"):
+                past = RecipeCache()
+                past.load_results(read_records(EXPERIMENT_LOG_PATH, RECORD_EXPERIMENT))
+                return past
+
+        self.run_in_background("Recipes", load, self.recipes.merge_results)
+
+    def run_in_background(self, name, work, done):
+        """
+        Runs work() on a worker thread and hands its result to done() on
+        the Tk thread (polled with after(), so Tk is only touched from the
+        thread that owns it).
+        """
+        outcome = {}
+
+        def target():
+            try:
+                outcome["result"] = work()
+            except Exception as exc:
+                outcome["error"] = exc
+
+        worker = threading.Thread(target=target, name=name, daemon=True)
+        worker.start()
+
+        def check():
+            if worker.is_alive():
+                self.root.after(POLL_INTERVAL_MS, check)
+            elif "error" in outcome:
+                print(f"[{name}] Failed: {outcome['error']}")
+            else:
+                done(outcome["result"])
+
+        self.root.after(POLL_INTERVAL_MS, check)
+
+    def progress_loaded(self, model):
+        # Runs finished before this are in the log: the loaded model has them
+        # (or learns them on the next start), so the priors are just replaced
+        self.progress_model = model
 
     # ---------- Shared Helper Functions ----------
     def add_compound(self, compound, concentration):
-        """Add a compound to the shared list and update both listboxes."""
-        compound_entry = f"{compound}: {concentration:.2f}%"
-        self.selected_compounds.append(compound_entry)
-        if hasattr(self, 'manual_compounds_listbox'):
-            self.manual_compounds_listbox.insert(tk.END, compound_entry)
-        if hasattr(self, 'auto_compounds_listbox'):
-            self.auto_compounds_listbox.insert(tk.END, compound_entry)
+        """Add a compound to the shared formulation and update both tables (one row each)."""
+        index, created = self.selected_compounds.add(compound, concentration)
+        component = self.selected_compounds.components[index]
+        for table_name in ('manual_compounds_table', 'auto_compounds_table'):
+            table = getattr(self, table_name, None)
+            if table is not None:
+                table.upsert(component.additive_key, compound_row(component))
 
     def clear_compounds_list(self):
-        """Clear the shared compounds list and both listboxes."""
+        """Clear the shared compounds list and both tables."""
         self.selected_compounds.clear()
-        if hasattr(self, 'manual_compounds_listbox'):
-            self.manual_compounds_listbox.delete(0, tk.END)
-        if hasattr(self, 'auto_compounds_listbox'):
-            self.auto_compounds_listbox.delete(0, tk.END)
-        messagebox.showinfo("Cleared", "Compounds list has been cleared for both tabs.")
+        if hasattr(self, 'manual_compounds_table'):
+            self.manual_compounds_table.clear()
+        if hasattr(self, 'auto_compounds_table'):
+            self.auto_compounds_table.clear()
+        self.notify("Compounds list has been cleared for both tabs.")
+
+    def notify(self, message):
+        """Non-blocking message in the line above the validation report."""
+        self.status_message.set(message)
+        print(f"[UI] {message}")
 
     # ---------- Manual Tab UI ----------
     def create_manual_ui(self):
@@ -162,7 +321,7 @@ class BatteryExperimentApp:
             font=("Helvetica", 14), bg="#2C3E50", fg="#ECF0F1"
         )
         label_default_compound.grid(row=2, column=1, sticky="e", padx=5, pady=5)
-        self.default_compounds = ["Compound 1", "Compound 2", "Compound 3"]
+        self.default_compounds = reagents.compound_names()
         self.default_compound_menu = ttk.Combobox(
             self.form_container, textvariable=self.selected_default_compound, 
             values=self.default_compounds, font=("Helvetica", 14), 
@@ -208,16 +367,65 @@ class BatteryExperimentApp:
         )
         self.run_button.grid(row=6, column=1, columnspan=2, pady=5)
 
+        # Pause / Resume / Cancel for the running experiment
+        engine_controls = tk.Frame(self.form_container, bg="#2C3E50")
+        engine_controls.grid(row=11, column=1, columnspan=2, pady=5)
+        self.pause_button = tk.Button(
+            engine_controls, text="Pause", font=("Helvetica", 12),
+            bg="#F39C12", fg="#FFFFFF", state="disabled",
+            command=self.toggle_pause_experiment
+        )
+        self.pause_button.pack(side="left", padx=5)
+        self.cancel_button = tk.Button(
+            engine_controls, text="Cancel", font=("Helvetica", 12),
+            bg="#E74C3C", fg="#FFFFFF", state="disabled",
+            command=self.cancel_experiment
+        )
+        self.cancel_button.pack(side="left", padx=5)
+
+        self.conductivity_label = tk.Label(
+            self.form_container, text="Conductivity:",
+            font=("Helvetica", 14), bg="#2C3E50", fg="#ECF0F1"
+        )
+        self.conductivity_label.grid(row=12, column=1, sticky="e", padx=5, pady=5)
+        self.conductivity_value_label = tk.Label(
+            self.form_container, textvariable=self.conductivity_value,
+            font=("Helvetica", 14), bg="#2C3E50", fg="#E74C3C"
+        )
+        self.conductivity_value_label.grid(row=12, column=2, sticky="w", padx=5, pady=5)
+
+        # Past conductivity of the recipe being run (replicates)
+        self.recipe_history_label = tk.Label(
+            self.form_container, textvariable=self.recipe_history,
+            font=("Helvetica", 12), bg="#2C3E50", fg="#ECF0F1"
+        )
+        self.recipe_history_label.grid(row=16, column=1, columnspan=2, pady=5)
+
+        # Progress bar + ETA learned from past runs
+        self.progress_bar = ttk.Progressbar(self.form_container, length=300, mode="determinate")
+        self.progress_bar.grid(row=14, column=1, sticky="e", padx=5, pady=5)
+        self.eta_label = tk.Label(
+            self.form_container, textvariable=self.eta_value,
+            font=("Helvetica", 12), bg="#2C3E50", fg="#ECF0F1"
+        )
+        self.eta_label.grid(row=14, column=2, sticky="w", padx=5, pady=5)
+
+        # Live trend of every reading this session (bounded memory)
+        from conductivity_plot import ConductivityPlot
+        self.conductivity_plot = ConductivityPlot(self.form_container, width=600, height=160)
+        self.conductivity_plot.grid(row=13, column=0, columnspan=4, pady=5)
+
         compounds_label = tk.Label(
             self.form_container, text="Compounds List:", 
             font=("Helvetica", 12, "bold"), bg="#2C3E50", fg="#ECF0F1"
         )
         compounds_label.grid(row=7, column=1, columnspan=2, pady=5)
-        self.manual_compounds_listbox = tk.Listbox(
-            self.form_container, font=("Helvetica", 12), width=40, height=5, 
-            bg="#3B4B5C", fg="#ECF0F1"
+        self.manual_compounds_table = VirtualTable(
+            self.form_container, COMPOUND_COLUMNS, height=5,
+            widths={"compound": 160, "additive": 140, "pct": 80}, bg="#2C3E50"
         )
-        self.manual_compounds_listbox.grid(row=8, column=1, columnspan=2, pady=5)
+        self.manual_compounds_table.grid(row=8, column=1, columnspan=2, pady=5)
+        self.manual_compounds_table.extend((c.additive_key, compound_row(c)) for c in self.selected_compounds)
 
         self.clear_compounds_button_manual = tk.Button(
             self.form_container, text="Clear Compounds List",
@@ -233,6 +441,48 @@ class BatteryExperimentApp:
         )
         self.submit_manual_button.grid(row=10, column=1, columnspan=2, pady=5)
 
+        # Experiment queue: enqueue now, run everything back to back later
+        queue_controls = tk.Frame(self.form_container, bg="#2C3E50")
+        queue_controls.grid(row=15, column=1, columnspan=2, pady=5)
+        tk.Button(
+            queue_controls, text="Add to Queue", font=("Helvetica", 12),
+            bg="#3498DB", fg="#FFFFFF", command=lambda: self.enqueue_experiment(manual=True)
+        ).pack(side="left", padx=5)
+        self.run_queue_button = tk.Button(
+            queue_controls, text="Run Queue", font=("Helvetica", 12, "bold"),
+            bg="#2ECC71", fg="#FFFFFF", command=self.run_queue
+        )
+        self.run_queue_button.pack(side="left", padx=5)
+        tk.Button(
+            queue_controls, text="Clear Queue", font=("Helvetica", 12),
+            bg="#E74C3C", fg="#FFFFFF", command=self.clear_queue
+        ).pack(side="left", padx=5)
+        tk.Label(
+            queue_controls, textvariable=self.queue_status,
+            font=("Helvetica", 12), bg="#2C3E50", fg="#ECF0F1"
+        ).pack(side="left", padx=5)
+
+        # Validation: policy + every violation of the last check (no dialogs)
+        validation_controls = tk.Frame(self.form_container, bg="#2C3E50")
+        validation_controls.grid(row=17, column=0, columnspan=4, pady=5)
+        tk.Label(
+            validation_controls, text="Validation:", font=("Helvetica", 12),
+            bg="#2C3E50", fg="#ECF0F1"
+        ).pack(side="left", padx=5)
+        ttk.Combobox(
+            validation_controls, textvariable=self.validation_policy, values=POLICIES,
+            font=("Helvetica", 12), state="readonly", width=10
+        ).pack(side="left", padx=5)
+        tk.Label(
+            validation_controls, textvariable=self.status_message,
+            font=("Helvetica", 12), bg="#2C3E50", fg="#ECF0F1"
+        ).pack(side="left", padx=5)
+        self.validation_table = VirtualTable(
+            self.form_container, VALIDATION_COLUMNS, height=4, bg="#2C3E50",
+            widths={"item": 200, "level": 70, "check": 200, "details": 420},
+        )
+        self.validation_table.grid(row=18, column=0, columnspan=4, pady=5)
+
     def add_selected_compound_manual(self):
         """Reads the concentration from the manual tab and adds the compound."""
         compound = self.selected_default_compound.get()
@@ -249,12 +499,12 @@ class BatteryExperimentApp:
             return
         self.add_compound(compound, concentration)
         self.concentration_entry.delete(0, tk.END)
-        messagebox.showinfo("Success", f"Added {compound} with {concentration:.2f}% concentration.")
+        self.notify(f"Added {compound} with {concentration:.2f}% concentration.")
 
     def set_manual_true(self):
         """Sets is_manual to True and shows a confirmation message."""
         self.is_manual = True
-        messagebox.showinfo("Mode Set", "Mode set to Manual (is_manual = True)")
+        self.notify("Mode set to Manual (is_manual = True)")
 
     # ---------- Automatic Tab UI ----------
     def create_automatic_ui(self):
@@ -277,7 +527,7 @@ class BatteryExperimentApp:
         label_auto_compound.grid(row=1, column=1, sticky="e", padx=5, pady=5)
         self.auto_compound_menu = ttk.Combobox(
             auto_container, textvariable=self.selected_default_compound,
-            values=["Compound 1", "Compound 2", "Compound 3"],
+            values=reagents.compound_names(),
             font=("Helvetica", 14), state="readonly", width=17
         )
         self.auto_compound_menu.grid(row=1, column=2, sticky="w", padx=5, pady=5)
@@ -306,11 +556,13 @@ class BatteryExperimentApp:
             font=("Helvetica", 12, "bold"), bg="#2C3E50", fg="#ECF0F1"
         )
         auto_compounds_label.grid(row=4, column=1, columnspan=2, pady=5)
-        self.auto_compounds_listbox = tk.Listbox(
-            auto_container, font=("Helvetica", 12), width=40, height=5,
-            bg="#3B4B5C", fg="#ECF0F1"
+        self.auto_compounds_table = VirtualTable(
+            auto_container, COMPOUND_COLUMNS, height=5,
+            widths={"compound": 160, "additive": 140, "pct": 80}, bg="#2C3E50"
         )
-        self.auto_compounds_listbox.grid(row=5, column=1, columnspan=2, pady=5)
+        self.auto_compounds_table.grid(row=5, column=1, columnspan=2, pady=5)
+        # Compounds added before this tab was first opened
+        self.auto_compounds_table.extend((c.additive_key, compound_row(c)) for c in self.selected_compounds)
 
         self.clear_compounds_button_auto = tk.Button(
             auto_container, text="Clear Compounds List",
@@ -326,216 +578,701 @@ class BatteryExperimentApp:
         )
         self.submit_automatic_button.grid(row=7, column=1, columnspan=2, pady=5)
 
+        label_grid_step = tk.Label(
+            auto_container, text="Grid Step (%):",
+            font=("Helvetica", 14), bg="#2C3E50", fg="#ECF0F1"
+        )
+        label_grid_step.grid(row=8, column=1, sticky="e", padx=5, pady=5)
+        self.grid_step_entry = tk.Entry(
+            auto_container, font=("Helvetica", 14), width=15,
+            bg="#3B4B5C", fg="#ECF0F1", insertbackground="#ECF0F1"
+        )
+        self.grid_step_entry.insert(0, "0.50")
+        self.grid_step_entry.grid(row=8, column=2, sticky="w", padx=5, pady=5)
+
+        self.generate_candidates_button = tk.Button(
+            auto_container, text="Generate Candidate Formulations",
+            font=("Helvetica", 12), bg="#3498DB", fg="#FFFFFF",
+            command=self.generate_auto_candidates
+        )
+        self.generate_candidates_button.grid(row=9, column=1, columnspan=2, pady=5)
+
+        # Each queued Automatic job asks the optimizer for a formulation when it starts
+        self.enqueue_auto_button = tk.Button(
+            auto_container, text="Add Optimizer Run to Queue",
+            font=("Helvetica", 12), bg="#3498DB", fg="#FFFFFF",
+            command=lambda: self.enqueue_experiment(manual=False)
+        )
+        self.enqueue_auto_button.grid(row=10, column=1, columnspan=2, pady=5)
+
+    # ---------- History Tab UI ----------
+    def create_history_ui(self):
+        """Every logged experiment in one sortable, filterable, virtualized table."""
+        from history_index import HistoryIndex  # NumPy is only needed once History opens
+
+        history_container = tk.Frame(self.history_frame, bg="#2C3E50")
+        history_container.pack(fill="both", expand=True, padx=10, pady=10)
+
+        title_history = tk.Label(
+            history_container, text="Experiment History",
+            font=("Helvetica", 18, "bold"), bg="#2C3E50", fg="#ECF0F1"
+        )
+        title_history.pack(pady=10)
+
+        filter_row = tk.Frame(history_container, bg="#2C3E50")
+        filter_row.pack(fill="x", pady=5)
+        tk.Label(
+            filter_row, text="Filter:", font=("Helvetica", 14), bg="#2C3E50", fg="#ECF0F1"
+        ).pack(side="left", padx=5)
+        self.history_filter = tk.StringVar()
+        tk.Entry(
+            filter_row, textvariable=self.history_filter, font=("Helvetica", 14), width=30,
+            bg="#3B4B5C", fg="#ECF0F1", insertbackground="#ECF0F1"
+        ).pack(side="left", padx=5)
+        self.history_count = tk.StringVar()
+        tk.Label(
+            filter_row, textvariable=self.history_count,
+            font=("Helvetica", 12), bg="#2C3E50", fg="#ECF0F1"
+        ).pack(side="right", padx=5)
+
+        # Indexed query, e.g. "TEP=3..7 mean>50 mode=Manual since=2026-10-01"
+        query_row = tk.Frame(history_container, bg="#2C3E50")
+        query_row.pack(fill="x", pady=5)
+        tk.Label(
+            query_row, text="Query:", font=("Helvetica", 14), bg="#2C3E50", fg="#ECF0F1"
+        ).pack(side="left", padx=5)
+        self.history_query = tk.StringVar()
+        query_entry = tk.Entry(
+            query_row, textvariable=self.history_query, font=("Helvetica", 14), width=30,
+            bg="#3B4B5C", fg="#ECF0F1", insertbackground="#ECF0F1"
+        )
+        query_entry.pack(side="left", padx=5)
+        query_entry.bind("<Return>", lambda event: self.query_history())
+        tk.Button(
+            query_row, text="Run Query", font=("Helvetica", 12),
+            bg="#3498DB", fg="#FFFFFF", command=self.query_history
+        ).pack(side="left", padx=5)
+        tk.Button(
+            query_row, text="Best per Additive Pair", font=("Helvetica", 12),
+            bg="#3498DB", fg="#FFFFFF", command=self.best_history_pairs
+        ).pack(side="left", padx=5)
+        tk.Button(
+            query_row, text="Show All", font=("Helvetica", 12),
+            bg="#7F8C8D", fg="#FFFFFF", command=self.show_all_history
+        ).pack(side="left", padx=5)
+        self.history_query_status = tk.StringVar()
+        tk.Label(
+            query_row, textvariable=self.history_query_status,
+            font=("Helvetica", 12), bg="#2C3E50", fg="#ECF0F1"
+        ).pack(side="right", padx=5)
+
+        self.history_table = VirtualTable(
+            history_container, HISTORY_COLUMNS, height=18, bg="#2C3E50",
+            widths={"number": 60, "mode": 90, "compounds": 280, "iterations": 80,
+                    "mean": 130, "logged": 130},
+        )
+        self.history_table.pack(fill="both", expand=True)
+        self.history_filter_job = None
+        self.history_filter.trace_add("write", lambda *args: self.schedule_history_filter())
+        self.update_history_count()
+
+        # Reading and indexing a large log takes seconds: do it off the Tk thread
+        self.history_query_status.set("Loading history...")
+
+        def load():
+            with tracer.span("history.load"):
+                return HistoryIndex.from_records(read_records(EXPERIMENT_LOG_PATH, RECORD_EXPERIMENT))
+
+        self.run_in_background("History", load, self.history_loaded)
+
+    def history_loaded(self, index):
+        """Installs the index built in the background, plus runs logged meanwhile."""
+        last = index.records[-1]["experiment_number"] if index.records else 0
+        for record in self.experiments_log:
+            if record["experiment_number"] > last:  # not flushed to disk before the load
+                index.add(dict(record, logged_at=time.time()))
+        self.history_index = index
+        self.history_query_status.set("")
+        self.query_history()
+
+    def schedule_history_filter(self):
+        """Filters once typing pauses, not on every keystroke."""
+        if self.history_filter_job is not None:
+            self.root.after_cancel(self.history_filter_job)
+        self.history_filter_job = self.root.after(150, self.filter_history)
+
+    def filter_history(self):
+        self.history_filter_job = None
+        self.history_table.set_filter(self.history_filter.get())
+        self.update_history_count()
+
+    def show_records(self, records):
+        self.history_table.set_rows((r["experiment_number"], history_row(r)) for r in records)
+        self.update_history_count()
+
+    def history_ready(self):
+        if self.history_index is None:
+            self.history_query_status.set("Loading history...")
+            return False
+        return True
+
+    def query_history(self):
+        """Runs the query box against the history index; an empty query shows everything."""
+        from history_index import parse_query
+
+        if not self.history_ready():
+            return
+        text = self.history_query.get().strip()
+        if not text:
+            self.show_all_history()
+            return
+        try:
+            conditions = parse_query(text)
+        except ValueError as exc:
+            self.history_query_status.set(str(exc))
+            return
+        started = time.perf_counter()
+        records = self.history_index.query(**conditions)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self.show_records(records)
+        self.history_query_status.set(f"{len(records)} match(es) in {elapsed_ms:.1f} ms")
+
+    def best_history_pairs(self):
+        """Highest mean conductivity for each pair of additives used together."""
+        if not self.history_ready():
+            return
+        started = time.perf_counter()
+        best = self.history_index.best_per_combination(metric="mean", size=2)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self.history_query.set("")
+        self.show_records(record for _, record in best)
+        self.history_query_status.set(f"Best of {len(best)} additive pair(s) in {elapsed_ms:.1f} ms")
+
+    def show_all_history(self):
+        if not self.history_ready():
+            return
+        self.history_query.set("")
+        self.history_query_status.set("")
+        self.show_records(self.history_index.records)
+
+    def update_history_count(self):
+        shown, total = self.history_table.visible_count, len(self.history_table)
+        self.history_count.set(f"{shown} of {total} experiment(s)" if shown != total
+                               else f"{total} experiment(s)")
+
     def add_selected_compound_auto(self):
         """Adds the compound with a default concentration of 0.0 (for automatic mode)."""
         compound = self.selected_default_compound.get()
         concentration = 0.0
         self.add_compound(compound, concentration)
-        messagebox.showinfo("Success", f"Added {compound} with {concentration:.2f}% concentration.")
+        self.notify(f"Added {compound} with {concentration:.2f}% concentration.")
+
+    def generate_auto_candidates(self):
+        """Enumerates every mixture of the listed compounds on a grid (Automatic mode)."""
+        from formulation_grid import generate_candidates  # NumPy is only needed here
+
+        if not self.selected_compounds:
+            messagebox.showerror("No Compounds", "Please add at least one compound first.")
+            return
+        try:
+            total = float(self.total_additive_concentration.get())
+            step = float(self.grid_step_entry.get())
+            candidates = generate_candidates(
+                len(self.selected_compounds), total, TOTAL_VOLUME, design="grid", step=step
+            )
+        except ValueError as exc:
+            messagebox.showerror("Invalid Input", f"Could not build the grid: {exc}")
+            return
+
+        keys = [c.additive_key for c in self.selected_compounds]
+        self.auto_candidates = (keys, candidates[0], candidates[1])
+        self.optimizer = None  # new candidate pool -> start a fresh optimizer
+        print(f"[Automatic] {len(candidates[0])} candidate formulations over {keys} "
+              f"(total {total:.2f}%, step {step:.2f}%)")
 
     def set_manual_false(self):
         """Sets is_manual to False and shows a confirmation message."""
         if not self.total_additive_concentration.get().strip():
             self.total_additive_concentration.set("0.00")
         self.is_manual = False
-        messagebox.showinfo("Mode Set", "Mode set to Automatic (is_manual = False)")
+        self.notify("Mode set to Automatic (is_manual = False)")
 
     # ---------- Run Experiment & Integration with "Controller" ----------
     def run_experiment(self):
         """
-        Runs the experiment, checks manual constraints, logs the experiment,
-        and prints a combined output: immediate summary + full log.
-        
-        Also updates the 'additives' dictionary from your controller snippet
-        with the user’s selected compounds.
+        Validates the formulation under the current policy, picks the
+        formulation and starts the experiment (see start_experiment()).
+        """
+        if self.engine is not None and self.engine.running:
+            messagebox.showwarning("Experiment Running", "An experiment is already running.")
+            return
+
+        settings = self.read_experiment_settings(self.is_manual)
+        if settings is None:
+            return
+        total_add_pct, iterations = settings
+        mode_str = "Manual" if self.is_manual else "Automatic"
+
+        if self.is_manual:
+            result = self.validate_formulations(
+                [("Current formulation", self.selected_compounds.copy(), total_add_pct, mode_str)]
+            ).results[0]
+            if not result.accepted:
+                return
+            formulation = result.formulation
+            measure = self.probe  # simulated meter until COND_METER_PORT is wired up
+            suggestion = None
+        else:
+            # AUTOMATIC MODE: the optimizer picks (and validates) the formulation to measure
+            if not self.has_candidates(self.selected_compounds):
+                messagebox.showerror(
+                    "No Candidates",
+                    "No candidate set for these compounds. Click 'Generate Candidate Formulations' first."
+                )
+                return
+            picked = self.next_optimizer_formulation(self.selected_compounds, total_add_pct)
+            if picked is None:
+                return
+            formulation, suggestion, measure = picked
+
+        self.start_experiment(formulation, total_add_pct, iterations, mode_str, measure, suggestion)
+
+    def read_experiment_settings(self, manual):
+        """
+        Parses iterations and the total additive concentration. Returns
+        (total_add_pct, iterations), or None if either is invalid.
         """
-        self.experiment_count += 1
         try:
-            self.iterations = int(self.iterations_entry.get())
-            if self.iterations < 1:
+            with tracer.span("parse"):
+                iterations = int(self.iterations_entry.get())
+            if iterations < 1:
                 raise ValueError
         except ValueError:
             messagebox.showerror("Invalid Input", "Please ensure iterations is a valid positive integer.")
-            return
+            return None
 
-        mode_str = "Manual" if self.is_manual else "Automatic"
+        try:
+            total_add_pct = float(self.total_additive_concentration.get())
+        except ValueError:
+            if manual:
+                messagebox.showerror("Invalid Input", "Total Additive Concentration must be a valid number.")
+                return None
+            total_add_pct = 0.0
+        return total_add_pct, iterations
 
-        # Prepare variables for manual checks
-        total_add_pct = 0.0
-        total_compound_pct = 0.0
+    def validate_formulations(self, items):
+        """
+        Checks (label, formulation, total, mode) items in one pass under the
+        selected policy and shows every violation in the report panel.
+        """
+        with tracer.span("validate"):
+            report = validate_batch(items, self.validation_policy.get())
+        self.show_validation(report)
+        return report
 
-        # MANUAL MODE CHECKS
-        if self.is_manual:
-            try:
-                total_add_pct = float(self.total_additive_concentration.get())
-            except ValueError:
-                messagebox.showerror("Invalid Input", "Total Additive Concentration must be a valid number.")
-                return
+    def show_validation(self, report):
+        rows = []
+        for r in report:
+            label = r.label if r.accepted else f"{r.label} (rejected)"
+            if not r.violations:
+                rows.append(((r.index, 0), (label, "ok", "", "")))
+            for j, v in enumerate(r.violations):
+                rows.append(((r.index, j), (label, v.severity, v.title, v.message)))
+        self.validation_table.set_rows(rows)
+        self.notify(report.summary())
 
-            # Sum up the individual compound percentages
-            for item in self.selected_compounds:
-                try:
-                    parts = item.split(":")
-                    if len(parts) == 2:
-                        pct = float(parts[1].strip().replace("%", ""))
-                        total_compound_pct += pct
-                except:
-                    continue
-
-            # If sum of compounds > user-entered total
-            if total_compound_pct > total_add_pct + 1e-9:
-                proceed_exceed = messagebox.askyesno(
-                    "Compounds Exceed Entered Total",
-                    f"The sum of your selected compounds is {total_compound_pct:.2f}%, "
-                    f"which exceeds the total additive concentration you entered ({total_add_pct:.2f}%).\n\n"
-                    "It is recommended to clear or correct your compound list before proceeding.\n"
-                    "Do you want to continue anyway?"
-                )
-                if not proceed_exceed:
-                    return
-
-            # If total_add_pct != 10, ask
-            if abs(total_add_pct - 10.0) > 0.001:
-                proceed_total = messagebox.askyesno(
-                    "Confirm Total Concentration",
-                    f"You entered {total_add_pct:.2f}% as the total additive concentration.\n"
-                    "The recommended value is 10%.\nDo you want to proceed?"
-                )
-                if not proceed_total:
-                    return
-
-            # If sum of compounds != 10, ask
-            if abs(total_compound_pct - 10.0) > 0.01:
-                proceed_compounds = messagebox.askyesno(
-                    "Confirm Compound Percentages",
-                    f"The sum of individual compound percentages is {total_compound_pct:.2f}%.\n"
-                    "It is suggested to have a total of 10%.\nDo you want to proceed?"
-                )
-                if not proceed_compounds:
-                    return
+    def start_experiment(self, formulation, total_add_pct, iterations, mode_str,
+                         measure, suggestion=None):
+        """
+        Prints an immediate summary, dispenses the formulation and starts the
+        measurement iterations on the background ExperimentEngine.
+
+        The log entry is written in finish_experiment() once the engine
+        reports it is done.
+        """
+        self.experiment_count += 1
+        self.iterations = iterations
 
         # PRINT AN IMMEDIATE SUMMARY
         print(f"\n=== Running Experiment #{self.experiment_count} ({mode_str} Mode) ===")
         print(f"Number of Iterations: {self.iterations}")
         print("Compounds selected:")
-        for c in self.selected_compounds:
-            print(f"  - {c}")
-        print(f"Total Additive Concentration (overall): {self.total_additive_concentration.get()}%")
+        for c in formulation:
+            print(f"  - {c.label()}")
+        print(f"Total Additive Concentration (overall): {total_add_pct:.2f}%")
+
+        # Dispense first, then measure
+        recipe, dispense_time, stage_times = self.dispense_formulation(formulation, total_add_pct)
+        self.start_progress(recipe.plan, dispense_time)
 
-        # Simulate measuring conductivity
-        for i in range(self.iterations):
-            conductivity = random.uniform(0, 100)
-            self.conductivity_value.set(f"{conductivity:.2f}")
-            self.root.update()
-            time.sleep(0.5)
+        # Measure conductivity on a worker thread; poll_experiment() drains
+        # its progress queue so the Tk event loop stays responsive.
+        self.pending_experiment = {
+            "mode": mode_str,
+            "formulation": formulation,  # frozen for this run
+            "suggestion": suggestion,
+            "stage_times": stage_times,
+            "recipe": recipe,
+        }
+        # Each iteration ends as soon as the filtered reading settles (no fixed sleep)
+        if self.signal is None:
+            self.signal = make_signal_pipeline()
+        self.trace = self.traces.writer(self.experiment_count)
+        self.engine = ExperimentEngine(
+            self.iterations, measure=measure, settling=make_settling_detector(), signal=self.signal,
+            trace=self.trace,
+        )
+        self.engine.start()
+        self.set_engine_controls(running=True)
+        self.root.after(POLL_INTERVAL_MS, self.poll_experiment)
 
+    def dispense_formulation(self, formulation, total_add_pct):
+        """
+        Looks up (or plans) the recipe for this formulation and dispenses it.
+        Returns (recipe, seconds, per-stage breakdown).
+        """
         # --------------------------------------------------------------------
-        # INTEGRATE WITH YOUR "CONTROLLER" ADDITIVES DICTIONARY
-        # (like your snippet, but simplified for demonstration)
+        # "CONTROLLER" ADDITIVES FOR THIS FORMULATION
+        # Replicates reuse the cached volumes and compiled pump batch.
         # --------------------------------------------------------------------
-        # 1) Clear out old values
-        for ad in additives:
-            additives[ad]["used"] = False
-            additives[ad]["percentage"] = 0
-            additives[ad]["volume"] = 0.0
-
-        # 2) Convert self.selected_compounds into a dictionary, e.g. {"TEP": 30, ...}
-        #    We need a mapping from "Compound 1" -> "TEP", etc. Adjust as needed.
-        selected_additives_from_ui.clear()
-        for item in self.selected_compounds:
-            try:
-                name, val = item.split(":")
-                name = name.strip()                 # "Compound 1"
-                val = float(val.strip().replace("%", ""))  # e.g. 3.0
-            except:
-                continue
-            # Simple mapping for demonstration
-            # "Compound 1" -> "TEP", "Compound 2" -> "ADDITIVE_X", "Compound 3" -> "ADDITIVE_Y"
-            if name == "Compound 1":
-                additive_key = "TEP"
-            elif name == "Compound 2":
-                additive_key = "ADDITIVE_X"
-            elif name == "Compound 3":
-                additive_key = "ADDITIVE_Y"
-            else:
-                additive_key = name.upper().replace(" ", "_")
-
-            selected_additives_from_ui[additive_key] = val
-
-        # 3) Mark these additives as used
-        for additive_key, percentage in selected_additives_from_ui.items():
-            if additive_key in additives:
-                additives[additive_key]["used"] = True
-                additives[additive_key]["percentage"] = percentage
-
-        # LP30 is always used, filling leftover if you want
-        try:
-            user_total = float(self.total_additive_concentration.get())
-        except:
-            user_total = 0.0
-        leftover_lp30 = 100 - user_total
-        if leftover_lp30 < 0:
-            leftover_lp30 = 0
-        additives["LP30"]["used"] = True
-        additives["LP30"]["percentage"] = leftover_lp30
-
-        # 4) Compute volumes (example)
-        for k, v in additives.items():
-            if v["used"]:
-                v["volume"] = (v["percentage"] / 100) * TOTAL_VOLUME
+        with tracer.span("plan"):
+            recipe, hit = self.recipes.get_or_build(formulation, total_add_pct, TOTAL_VOLUME)
+        past = self.recipes.results(recipe.key)
+        self.recipe_history.set(f"This recipe: {format_results(past)}")
+        if hit:
+            print(f"[Recipe] Replicate of recipe {recipe.key} (planning skipped)")
+        print(f"[Recipe] Past conductivity: {format_results(past)}")
 
         # Print final "additives" dictionary
         print("[Controller] Final 'additives' dictionary after integration:")
-        for k, v in additives.items():
-            if v["used"]:
-                print(f"  {k}: port={v['port']}, used={v['used']}, "
-                      f"percentage={v['percentage']}, volume={v['volume']:.2f} ml")
+        for k, v in recipe.used_additives().items():
+            print(f"  {k}: port={v['port']}, used={v['used']}, "
+                  f"percentage={v['percentage']}, volume={v['volume']:.2f} ml")
+
+        # The volumes compiled into one batched pump command plan
+        pump = SimulatedPump()
+        with tracer.span("dispense"):
+            dispense_time = pump.run(recipe.plan)
+        print(f"[Controller] Dispense plan ({recipe.plan.valve_switches} valve switches, "
+              f"{recipe.plan.purges} purges, ~{dispense_time:.1f} s simulated):")
+        for line in recipe.frame:
+            print(f"  {line}")
         # --------------------------------------------------------------------
+        return recipe, dispense_time, pump.last_breakdown
+
+    def next_optimizer_formulation(self, compounds, total_add_pct):
+        """
+        Asks the optimizer for the next candidate over `compounds` (which
+        must match the candidate set, see has_candidates()) and validates
+        it. Returns (formulation, (optimizer, candidate index, percentages),
+        measure callable), or None if the suggestion was rejected.
+        """
+        from conductivity_optimizer import ConductivityOptimizer, synthetic_conductivity
+
+        if not self.has_candidates(compounds):
+            raise ValueError("No candidate set for these compounds")
+        keys, pcts, _ = self.auto_candidates
+        if self.optimizer is None:
+            self.optimizer = ConductivityOptimizer(pcts)
+        index, row = self.optimizer.suggest()
+
+        formulation = Formulation(
+            Component(c.name, p, c.additive_key)
+            for c, p in zip(compounds, row)
+        )
+        # What is dispensed is what gets validated
+        result = self.validate_formulations(
+            [(f"Optimizer candidate {index}", formulation, total_add_pct, "Automatic")]
+        ).results[0]
+        if not result.accepted:
+            self.optimizer.skip(index)  # suggest a different one next time
+            return None
+        # Synthetic meter stand-in until the conductivity meter is wired up
+        measure = lambda: float(synthetic_conductivity(row, noise=0.05))
+        return result.formulation, (self.optimizer, index, row), measure
+
+    # ---------- Experiment Queue ----------
+    def enqueue_experiment(self, manual):
+        """Adds the current compounds list to the persistent queue."""
+        if not self.selected_compounds:
+            messagebox.showerror("No Compounds", "Please add at least one compound first.")
+            return
+        settings = self.read_experiment_settings(manual)
+        if settings is None:
+            return
+        total_add_pct, iterations = settings
+        mode = "Manual" if manual else "Automatic"
+        result = self.validate_formulations(
+            [("New queue entry", self.selected_compounds.copy(), total_add_pct, mode)]
+        ).results[0]
+        if not result.accepted:
+            return
+        job = self.queue.enqueue(result.formulation, total_add_pct, iterations, mode=mode)
+        print(f"[Queue] Added {job.label()}")
+        self.update_queue_status()
+
+    def run_queue(self):
+        """Runs every queued experiment back to back, in scheduled order."""
+        if self.engine is not None and self.engine.running:
+            messagebox.showwarning("Experiment Running", "An experiment is already running.")
+            return
+        # Every queued job in one pass: rejected ones are dropped, none of them blocks
+        with tracer.span("validate"):
+            report = self.queue.validate(self.validation_policy.get())
+        self.show_validation(report)
+        self.update_queue_status()
+        pending = self.queue.pending()
+        if not pending:
+            self.notify(f"{report.summary()} - no experiments left to run.")
+            return
+        print(f"[Queue] Running {len(pending)} experiment(s): "
+              f"{count_changeovers(schedule(pending))} changeover purge(s) scheduled "
+              f"(enqueue order would need {count_changeovers(pending)})")
+        self.queue_running = True
+        self.queue_ports = None
+        self.queue_held = set()
+        self.start_next_job()
+
+    def has_candidates(self, compounds):
+        """True if the generated candidate set is over exactly these compounds."""
+        return (self.auto_candidates is not None
+                and self.auto_candidates[0] == [c.additive_key for c in compounds])
+
+    def start_next_job(self):
+        while True:
+            job = self.queue.next_job(self.queue_ports, skip=self.queue_held)
+            if job is None:
+                self.stop_queue()
+                print("[Queue] All queued experiments finished.\n")
+                if self.queue_held:
+                    self.notify(f"{len(self.queue_held)} Automatic job(s) held in the queue: "
+                                f"no candidate set for this job")
+                return
+            formulation = job.formulation()
+            if job.mode != "Automatic" or self.has_candidates(formulation):
+                break
+            # The optimizer's candidates are not saved with the job (e.g. after
+            # a restart or a new grid): keep it queued rather than run it at 0%
+            self.queue.requeue(job)
+            self.queue_held.add(job.job_id)
+            print(f"[Queue] Holding {job.label()}: no candidate set for this job "
+                  f"(generate candidates for {', '.join(c.name for c in formulation)} "
+                  f"and run the queue again)")
+
+        purge = changeover_plan(self.queue_ports, job.ports)
+        if purge is not None:
+            print(f"[Queue] Changeover purge (~{SimulatedPump().run(purge):.1f} s simulated)")
+        self.current_job = job
+        self.queue_backlog = self.queue.backlog(exclude=job, recipes=self.recipes)
+        self.update_queue_status()
+
+        measure = self.probe
+        suggestion = None
+        if job.mode == "Automatic":
+            picked = self.next_optimizer_formulation(formulation, job.total_add_pct)
+            if picked is None:
+                self.stop_queue()
+                print(f"[Queue] Stopped: the optimizer's formulation for {job.label()} was rejected")
+                return
+            formulation, suggestion, measure = picked
+        print(f"[Queue] Starting {job.label()}")
+        self.start_experiment(formulation, job.total_add_pct, job.iterations, job.mode,
+                              measure, suggestion)
+
+    def stop_queue(self):
+        """Stops after a cancel or error; the interrupted job stays queued."""
+        if self.current_job is not None:
+            self.queue.requeue(self.current_job)
+            self.current_job = None
+        self.queue_running = False
+        self.queue_backlog = []
+        self.update_queue_status()
+
+    def clear_queue(self):
+        if self.queue_running:
+            messagebox.showwarning("Queue Running", "Cancel the running queue before clearing it.")
+            return
+        self.queue.clear()
+        self.update_queue_status()
+
+    def update_queue_status(self):
+        self.queue_status.set(f"Queue: {len(self.queue.pending())} pending")
+
+    # ---------- Experiment Engine Plumbing ----------
+    def poll_experiment(self):
+        """Drains engine events on the Tk thread and reschedules itself."""
+        if self.engine is None:
+            return
+        if not self.engine.drain(self.handle_engine_event):
+            self.root.after(POLL_INTERVAL_MS, self.poll_experiment)
+
+    def handle_engine_event(self, kind, index, payload):
+        if kind == EVENT_PROGRESS:
+            with tracer.span("gui_update"):
+                self.conductivity_value.set(f"{payload:.2f}")
+            self.experiment_log.log_sample(self.experiment_count, index, payload)
+            if index < len(self.engine.settle_times):  # worker may already be ahead
+                self.progress_model.observe_settle(self.engine.settle_times[index])
+            self.update_progress(index + 1)
+        elif kind == EVENT_SAMPLES:
+            # Clean, block-averaged samples while the reading settles
+            with tracer.span("gui_update"):
+                for timestamp, value in zip(*payload):
+                    self.conductivity_plot.append(timestamp, value)
+        elif kind == EVENT_PAUSED:
+            self.pause_button.config(text="Resume")
+        elif kind == EVENT_RESUMED:
+            self.pause_button.config(text="Pause")
+        elif kind == EVENT_DONE:
+            self.set_engine_controls(running=False)
+            self.close_trace()
+            self.finish_experiment(payload)
+        elif kind == EVENT_CANCELLED:
+            self.set_engine_controls(running=False)
+            self.close_trace()
+            self.finish_progress()
+            self.stop_queue()
+            self.engine = None
+            print(f"=== Experiment #{self.experiment_count} cancelled after {index} iteration(s) ===\n")
+        elif kind == EVENT_ERROR:
+            self.set_engine_controls(running=False)
+            self.close_trace()
+            self.finish_progress()
+            self.stop_queue()
+            self.engine = None
+            messagebox.showerror("Experiment Failed", f"Iteration {index + 1} failed: {payload}")
+
+    def close_trace(self):
+        """The worker has stopped writing; flush the raw trace to disk."""
+        if self.trace is not None:
+            print(f"[Trace] {self.trace.samples} raw sample(s) saved to {self.trace.directory}")
+            self.trace.close()
+            self.trace = None
+
+    # ---------- Progress Bar & ETA ----------
+    def start_progress(self, plan, dispense_time):
+        """Resets the bar and shows the model's prediction for this experiment."""
+        predicted = self.progress_model.predict_experiment(plan, self.iterations)
+        print(f"[Progress] Predicted time: ~{format_eta(predicted)} "
+              f"(dispense {dispense_time:.1f} s + {self.iterations} x "
+              f"{self.progress_model.settle_seconds():.1f} s settle)")
+        self.progress_bar.config(maximum=self.iterations, value=0)
+        self.update_progress(0)
+
+    def update_progress(self, done):
+        """Live ETA for the remaining iterations, using the latest settle statistics."""
+        self.progress_bar.config(value=done)
+        remaining = self.progress_model.predict_remaining(self.iterations - done, self.queue_backlog)
+        queued = f" ({len(self.queue_backlog)} queued)" if self.queue_backlog else ""
+        self.eta_value.set(f"{done}/{self.iterations} - ETA {format_eta(remaining)}{queued}")
+
+    def finish_progress(self):
+        self.eta_value.set("Idle")
+
+    def set_engine_controls(self, running):
+        state = "normal" if running else "disabled"
+        self.pause_button.config(state=state, text="Pause")
+        self.cancel_button.config(state=state)
+        self.run_button.config(state="disabled" if running else "normal")
+        self.run_queue_button.config(state="disabled" if running else "normal")
+
+    def toggle_pause_experiment(self):
+        if self.engine is None:
+            return
+        if self.engine.paused:
+            self.engine.resume()
+        else:
+            self.engine.pause()
+
+    def cancel_experiment(self):
+        if self.engine is not None:
+            self.engine.cancel()
+
+    def finish_experiment(self, readings):
+        """
+        Runs after the engine completes: feeds the optimizer and the ETA
+        model, logs the experiment and prints the new log entry.
+        """
+        settle_times = self.engine.settle_times
+        self.engine = None
+        mode_str = self.pending_experiment["mode"]
+        formulation = self.pending_experiment["formulation"]
+        suggestion = self.pending_experiment["suggestion"]
+        stage_times = self.pending_experiment["stage_times"]
+        recipe = self.pending_experiment["recipe"]
+        self.pending_experiment = None
+        self.progress_model.observe_dispense(stage_times)
+        self.progress_model.mark_learned(self.experiment_count)
+        self.progress_model.save(PROGRESS_STATS_PATH)
+        self.finish_progress()
+
+        # Feed the measured conductivity back to the optimizer (Automatic mode)
+        if suggestion is not None and readings:
+            optimizer, index, row = suggestion
+            optimizer.observe(row, sum(readings) / len(readings), index)
+            print(f"[Optimizer] {optimizer.observations} observation(s); best so far "
+                  f"{optimizer.best_value:.3f} at {list(optimizer.best_pcts)}")
+
+        if settle_times:
+            print(f"[Settling] {len(settle_times)} iteration(s), settle time "
+                  f"min {min(settle_times):.2f} s / mean {sum(settle_times) / len(settle_times):.2f} s "
+                  f"/ max {max(settle_times):.2f} s")
 
         # CREATE A LOG ENTRY FOR THIS EXPERIMENT
-        # parse each compound from self.selected_compounds into a dict
-        additives_dict = {}
-        for item in self.selected_compounds:
-            try:
-                cname, val = item.split(":")
-                cname = cname.strip()
-                val = float(val.strip().replace("%", ""))
-                additives_dict[cname] = val
-            except:
-                continue
-
-        exp_data = {
-            "experiment_number": self.experiment_count,
-            "mode": mode_str,
-            "iterations": self.iterations,
-            "gui_compounds": self.selected_compounds.copy(),
-            "parsed_compounds": additives_dict,
-            "controller_additives": {  # from the actual 'additives' dictionary
-                k: dict(v) for k, v in additives.items() if v["used"]
-            }
-        }
-        self.experiments_log.append(exp_data)
-
-        # PRINT EXPERIMENTS LOG SO FAR
-        print("\n[Experiments Log] So far:")
-        for e in self.experiments_log:
-            print(f"  Experiment #{e['experiment_number']} ({e['mode']}) -> Iterations: {e['iterations']}")
-            print(f"    GUI compounds: {e['gui_compounds']}")
-            print(f"    Parsed (GUI -> dict): {e['parsed_compounds']}")
-            print("    Controller 'additives' used:")
-            for add_name, add_vals in e["controller_additives"].items():
-                print(f"      {add_name}: {add_vals}")
+        with tracer.span("log"):
+            exp_data = build_log_record(
+                self.experiment_count, mode_str, self.iterations, readings, formulation,
+                settle_times, stage_times, recipe.additives, recipe=recipe.key
+            )
+            self.experiments_log.append(exp_data)
+            self.experiment_log.log_experiment(exp_data)
+        self.recipes.add_result(recipe.key, self.experiment_count, readings)
+        self.recipe_history.set(f"This recipe: {format_results(self.recipes.results(recipe.key))}")
+        if self.history_index is not None:  # else history_loaded() picks it up
+            self.history_index.add(dict(exp_data, logged_at=time.time()))
+            if self.history_query.get().strip():
+                self.query_history()  # the new run shows if it matches
+            else:
+                self.history_table.upsert(exp_data["experiment_number"], history_row(exp_data))
+                self.history_table.see(exp_data["experiment_number"])
+                self.update_history_count()
+        tracer.count("experiments")
+
+        # PRINT ONLY THE NEW LOG ENTRY (full history lives in EXPERIMENT_LOG_PATH)
+        print(f"\n[Experiments Log] Added ({len(self.experiments_log)} this session, "
+              f"saved to {EXPERIMENT_LOG_PATH}):")
+        print(format_experiment_summary(exp_data))
         print("=== End of this experiment's summary ===\n")
 
-    def fade_in_step(self, alpha):
+        # Next queued experiment, straight away (no idle gap)
+        if self.current_job is not None:
+            self.queue.complete(self.current_job)
+            self.queue_ports = self.current_job.ports
+            self.current_job = None
+            self.update_queue_status()
+        if self.queue_running:
+            self.root.after(0, self.start_next_job)
+
+    def fade_in_step(self, alpha, step):
         if alpha < 1.0:
-            alpha += 0.05
-            self.root.attributes("-alpha", alpha)
-            self.root.after(50, lambda: self.fade_in_step(alpha))
+            alpha += step
+            self.root.attributes("-alpha", min(alpha, 1.0))
+            self.root.after(FADE_STEP_MS, lambda: self.fade_in_step(alpha, step))
         else:
             self.root.attributes("-alpha", 1.0)
 
     def on_closing(self):
+        if self.engine is not None:
+            self.engine.cancel()
+            self.engine.join(1.0)
+        self.close_trace()
+        if "serial_transport" in sys.modules:  # only imported once a device was used
+            sys.modules["serial_transport"].transport_pool.close_all()
+        self.experiment_log.close()
+        self.progress_model.save(PROGRESS_STATS_PATH)
+        if tracer.enabled:
+            tracer.write_chrome_trace(TRACE_PATH)
+            tracer.write_prometheus(METRICS_PATH)
         self.root.destroy()
 
 # --- MAIN APP ENTRY POINT ---
@@ -1,8 +1,11 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
 import threading
-import time
-import random
+
+from experiment_engine import (
+    ExperimentEngine, POLL_INTERVAL_MS,
+    EVENT_PROGRESS, EVENT_PAUSED, EVENT_RESUMED, EVENT_DONE, EVENT_CANCELLED, EVENT_ERROR,
+)
 
 # --- Global Variables ---
 global_compounds = []  # Truly global list of compounds
@@ -49,6 +52,7 @@ class BatteryExperimentApp:
         self.experiment_count = 0
         self.iterations = 10
         self.compounds = global_compounds  # still global
+        self.engine = None  # ExperimentEngine of the running experiment
 
         # Build the UIs
         self.create_manual_ui()
@@ -218,6 +222,22 @@ class BatteryExperimentApp:
         )
         self.submit_manual_button.grid(row=10, column=1, columnspan=2, pady=5)
 
+        # Pause / Resume / Cancel for the running experiment
+        engine_controls = tk.Frame(self.form_container, bg="#2C3E50")
+        engine_controls.grid(row=11, column=1, columnspan=2, pady=5)
+        self.pause_button = tk.Button(
+            engine_controls, text="Pause", font=("Helvetica", 12),
+            bg="#F39C12", fg="#FFFFFF", state="disabled",
+            command=self.toggle_pause_experiment
+        )
+        self.pause_button.pack(side="left", padx=5)
+        self.cancel_button = tk.Button(
+            engine_controls, text="Cancel", font=("Helvetica", 12),
+            bg="#E74C3C", fg="#FFFFFF", state="disabled",
+            command=self.cancel_experiment
+        )
+        self.cancel_button.pack(side="left", padx=5)
+
         # The conductivity placeholder UI remains commented out.
         # -----------------------------------
         # # Row 11: Conductivity Label
@@ -375,6 +395,9 @@ class BatteryExperimentApp:
     # ---------- Run Experiment and Misc Functions ----------
     def run_experiment(self):
         """Runs the manual experiment with user-defined parameters."""
+        if self.engine is not None and self.engine.running:
+            messagebox.showwarning("Experiment Running", "An experiment is already running.")
+            return
         self.experiment_count += 1
         try:
             self.iterations = int(self.iterations_entry.get())
@@ -389,12 +412,50 @@ class BatteryExperimentApp:
         print(f"Selected Compound: {self.selected_default_compound.get()}")
         print(f"Total Additive Concentration: {self.total_additive_concentration.get()}%")
 
-        # Simulate measuring conductivity (updates the hidden variable)
-        for i in range(self.iterations):
-            conductivity = random.uniform(0, 100)
-            self.conductivity_value.set(f"{conductivity:.2f}")
-            self.root.update()
-            time.sleep(0.5)
+        # Simulate measuring conductivity on a worker thread (keeps the UI responsive)
+        self.engine = ExperimentEngine(self.iterations)
+        self.engine.start()
+        self.set_engine_controls(running=True)
+        self.root.after(POLL_INTERVAL_MS, self.poll_experiment)
+
+    def poll_experiment(self):
+        """Drains conductivity readings from the engine on the Tk thread."""
+        if not self.engine.drain(self.handle_engine_event):
+            self.root.after(POLL_INTERVAL_MS, self.poll_experiment)
+
+    def handle_engine_event(self, kind, index, payload):
+        if kind == EVENT_PROGRESS:
+            self.conductivity_value.set(f"{payload:.2f}")
+        elif kind == EVENT_PAUSED:
+            self.pause_button.config(text="Resume")
+        elif kind == EVENT_RESUMED:
+            self.pause_button.config(text="Pause")
+        elif kind == EVENT_DONE:
+            self.set_engine_controls(running=False)
+        elif kind == EVENT_CANCELLED:
+            self.set_engine_controls(running=False)
+            print(f"Experiment #{self.experiment_count} cancelled after {index} iteration(s).")
+        elif kind == EVENT_ERROR:
+            self.set_engine_controls(running=False)
+            messagebox.showerror("Experiment Failed", f"Iteration {index + 1} failed: {payload}")
+
+    def set_engine_controls(self, running):
+        state = "normal" if running else "disabled"
+        self.pause_button.config(state=state, text="Pause")
+        self.cancel_button.config(state=state)
+        self.run_button.config(state="disabled" if running else "normal")
+
+    def toggle_pause_experiment(self):
+        if self.engine is None:
+            return
+        if self.engine.paused:
+            self.engine.resume()
+        else:
+            self.engine.pause()
+
+    def cancel_experiment(self):
+        if self.engine is not None:
+            self.engine.cancel()
 
     def fade_in_step(self, alpha):
         if alpha < 1.0:
@@ -405,6 +466,8 @@ class BatteryExperimentApp:
             self.root.attributes("-alpha", 1.0)
 
     def on_closing(self):
+        if self.engine is not None:
+            self.engine.cancel()
         self.root.destroy()
 
 # --- Main App Entry Point ---
@@ -0,0 +1,228 @@
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+
+from experiment_controller import ExperimentRunner, integrate_additives, plan_dispense, fresh_additives
+from experiment_engine import ExperimentEngine
+from dispense_scheduler import SimulatedPump
+from formulation import Formulation
+
+# ------------------------------------------------------------------
+# PIPELINE BENCHMARKS (simulated devices, no hardware or display needed)
+#
+#   python benchmark_pipeline.py                    # print + write benchmark_results.json
+#   python benchmark_pipeline.py --meter-latency 0.2 --output results.json
+#
+# Each benchmark reports seconds per operation. Results carry the git
+# revision so runs from different versions can be compared.
+# ------------------------------------------------------------------
+
+# Fixed per-iteration waits hard-coded in the earlier GUI iterations
+# (they cannot run headless, so they are modelled from their source).
+LEGACY_BASELINES = {
+    "GUIV3": {"iteration_wait": 1.0 + 15 * 0.03, "note": "update_conductivity: sleep(1) + 15 x sleep(0.03)"},
+    "GUIV4": {"iteration_wait": 1.0 + 15 * 0.03, "note": "same loop as GUIV3; ETA assumed 2 s/iteration"},
+    "GUIV5": {"iteration_wait": 0.5, "note": "run_experiment: sleep(0.5) per iteration"},
+    "RECENT_ITERATION_TEST": {"iteration_wait": 0.5, "note": "run_experiment: sleep(0.5) per iteration"},
+}
+
+
+class SimulatedMeter:
+    """Conductivity meter with configurable read latency and Gaussian noise."""
+
+    def __init__(self, latency=0.0, noise=0.5, base=10.0, seed=None):
+        self.latency = latency
+        self.noise = noise
+        self.base = base
+        self.rng = random.Random(seed)
+        self.reads = 0
+
+    def __call__(self):
+        if self.latency:
+            time.sleep(self.latency)
+        self.reads += 1
+        return self.base + self.rng.gauss(0.0, self.noise)
+
+
+def timeit(fn, repeat=5, number=1000):
+    """Best-of-`repeat` seconds per call."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+# ---------- Individual benchmarks ----------
+def sample_strings(n=3):
+    return [f"Compound {i + 1}: {10.0 / n:.2f}%" for i in range(n)]
+
+
+def legacy_parse(selected_compounds):
+    """The three string re-parses the pre-Formulation run_experiment did."""
+    total = 0.0
+    for item in selected_compounds:
+        parts = item.split(":")
+        if len(parts) == 2:
+            total += float(parts[1].strip().replace("%", ""))
+    by_key = {}
+    for item in selected_compounds:
+        name, val = item.split(":")
+        by_key[name.strip()] = float(val.strip().replace("%", ""))
+    by_name = {}
+    for item in selected_compounds:
+        name, val = item.split(":")
+        by_name[name.strip()] = float(val.strip().replace("%", ""))
+    return total, by_key, by_name
+
+
+def bench_parse():
+    strings = sample_strings()
+    formulation = Formulation()
+    for c in strings:
+        name, val = c.split(":")
+        formulation.add(name.strip(), float(val.strip().rstrip("%")))
+    return {
+        "legacy_string_parse": timeit(lambda: legacy_parse(strings)),
+        "formulation_model": timeit(lambda: (
+            formulation.total_percentage, formulation.by_additive_key(), formulation.by_name()
+        )),
+    }
+
+
+def bench_volumes():
+    formulation = Formulation()
+    formulation.add("Compound 1", 5.0)
+    formulation.add("Compound 2", 5.0)
+    target = fresh_additives()  # a private copy: the controller's 'additives' is left alone
+    integrate_additives(formulation, 10.0, target=target)
+    return {
+        "integrate_additives": timeit(lambda: integrate_additives(formulation, 10.0, target=target)),
+        "plan_dispense": timeit(lambda: plan_dispense(target)),
+    }
+
+
+def bench_iteration_overhead(iterations=2000):
+    """Engine cost per iteration with an instant meter and no interval."""
+    engine = ExperimentEngine(iterations, measure=lambda: 1.0, interval=0.0)
+    start = time.perf_counter()
+    engine.start()
+    engine.join()
+    engine.drain(lambda *event: None, budget=10.0)
+    return {"engine_iteration": (time.perf_counter() - start) / iterations}
+
+
+def bench_gui_update():
+    """Cost of one StringVar.set on a bare Tcl interpreter (no display needed)."""
+    try:
+        import tkinter as tk
+        interp = tk.Tcl()
+        var = tk.StringVar(master=interp)
+    except Exception as exc:  # no Tcl available
+        return {"stringvar_set": None, "error": str(exc)}
+    values = [f"{random.uniform(0, 100):.2f}" for _ in range(64)]
+    counter = iter(range(10 ** 9))
+    return {"stringvar_set": timeit(lambda: var.set(values[next(counter) % 64]))}
+
+
+def bench_end_to_end(meter_latency, meter_noise, iterations, interval, experiments=5):
+    """Experiments per hour through ExperimentRunner with simulated devices."""
+    meter = SimulatedMeter(latency=meter_latency, noise=meter_noise, seed=1)
+    pump = SimulatedPump()
+    runner = ExperimentRunner(measure=meter, interval=interval, pump=pump)
+    formulation = Formulation()
+    formulation.add("Compound 1", 5.0)
+    formulation.add("Compound 2", 5.0)
+
+    wall = simulated = 0.0
+    for _ in range(experiments):
+        record = runner.run(formulation, 10.0, iterations)
+        wall += record["elapsed"]
+        simulated += record["dispense_time"]  # pump time is modelled, not slept
+    per_experiment = (wall + simulated) / experiments
+    return {
+        "seconds_per_experiment": per_experiment,
+        "dispense_seconds_per_experiment": simulated / experiments,
+        "experiments_per_hour": 3600.0 / per_experiment,
+    }
+
+
+def bench_baselines(iterations, dispense_seconds):
+    results = {}
+    for name, info in LEGACY_BASELINES.items():
+        per_experiment = iterations * info["iteration_wait"] + dispense_seconds
+        results[name] = {
+            "modelled": True,  # computed from the source's sleeps, not run
+            "iteration_wait": info["iteration_wait"],
+            "seconds_per_experiment": per_experiment,
+            "experiments_per_hour": 3600.0 / per_experiment,
+            "note": info["note"],
+        }
+    return results
+
+
+def run_all(meter_latency=0.0, meter_noise=0.5, iterations=10, interval=0.0):
+    end_to_end = bench_end_to_end(meter_latency, meter_noise, iterations, interval)
+    return {
+        "revision": git_revision(),
+        "timestamp": time.time(),
+        "python": platform.python_version(),
+        "config": {
+            "meter_latency": meter_latency, "meter_noise": meter_noise,
+            "iterations": iterations, "interval": interval,
+        },
+        "parse": bench_parse(),
+        "volumes": bench_volumes(),
+        "iteration_overhead": bench_iteration_overhead(),
+        "gui_update": bench_gui_update(),
+        "end_to_end": end_to_end,
+        "baselines": bench_baselines(iterations, end_to_end["dispense_seconds_per_experiment"]),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the experiment pipeline with simulated devices.")
+    parser.add_argument("--meter-latency", type=float, default=0.0, help="seconds per meter read")
+    parser.add_argument("--meter-noise", type=float, default=0.5, help="std-dev of meter noise")
+    parser.add_argument("--iterations", type=int, default=10, help="iterations per experiment")
+    parser.add_argument("--interval", type=float, default=0.0, help="seconds between iterations")
+    parser.add_argument("--output", default="benchmark_results.json", help="machine-readable results file")
+    args = parser.parse_args(argv)
+
+    results = run_all(args.meter_latency, args.meter_noise, args.iterations, args.interval)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+
+    print(f"Benchmarks @ {results['revision']} (Python {results['python']})")
+    for section in ("parse", "volumes", "iteration_overhead", "gui_update"):
+        for name, value in results[section].items():
+            if isinstance(value, float):
+                print(f"  {section}.{name}: {value * 1e6:.2f} us")
+    e2e = results["end_to_end"]
+    print(f"  end_to_end: {e2e['seconds_per_experiment']:.3f} s/experiment, "
+          f"{e2e['experiments_per_hour']:.0f} experiments/hour")
+    for name, b in results["baselines"].items():
+        print(f"  baseline {name} (modelled, not measured): {b['experiments_per_hour']:.0f} experiments/hour")
+    print(f"Results written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,197 @@
+import threading
+import time
+import random
+
+# ------------------------------------------------------------------
+# CONDUCTIVITY ACQUISITION PIPELINE
+#
+#   meter --(producer thread)--> SampleRingBuffer --(Tk after tick)--> display
+#
+# Only the producer thread touches the meter and only the Tk thread
+# touches widgets/StringVars. The sample rate (producer) and repaint
+# rate (display tick) are configured independently.
+# ------------------------------------------------------------------
+
+
+def simulated_meter():
+    """Stand-in for the conductivity meter until the real port is wired up."""
+    return random.uniform(0, 100)
+
+
+class SampleRingBuffer:
+    """
+    Fixed-size single-producer / single-consumer ring of (timestamp, value).
+
+    No lock is taken: the producer writes the slot first and only then
+    advances `head`, and each side only ever writes its own index. A slow
+    consumer loses the oldest samples (counted in `dropped`) instead of
+    blocking the producer.
+    """
+
+    def __init__(self, capacity=1024):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self._times = [0.0] * capacity
+        self._values = [0.0] * capacity
+        self.head = 0      # total samples ever written (producer-owned)
+        self.dropped = 0   # samples overwritten before the consumer saw them
+
+    def push(self, timestamp, value):
+        """Producer side. Never blocks."""
+        slot = self.head % self.capacity
+        self._times[slot] = timestamp
+        self._values[slot] = value
+        self.head += 1  # publish only after the slot is written
+
+    def read_since(self, cursor):
+        """
+        Consumer side. Returns (samples, new_cursor) where samples is a list
+        of (timestamp, value) written after `cursor`.
+        """
+        head = self.head
+        oldest = head - self.capacity
+        if cursor < oldest:
+            self.dropped += oldest - cursor
+            cursor = oldest
+        samples = []
+        for n in range(cursor, head):
+            slot = n % self.capacity
+            samples.append((self._times[slot], self._values[slot]))
+        return samples, head
+
+    def latest(self):
+        """Most recent (timestamp, value), or None if nothing was written yet."""
+        if self.head == 0:
+            return None
+        slot = (self.head - 1) % self.capacity
+        return self._times[slot], self._values[slot]
+
+
+class ConductivityAcquisition:
+    """Producer: reads the meter at a fixed sample rate into a ring buffer."""
+
+    def __init__(self, read_meter=simulated_meter, sample_rate=1.0, capacity=1024):
+        """
+        read_meter:  callable returning one conductivity reading
+        sample_rate: readings per second
+        capacity:    ring buffer size in samples
+        """
+        if sample_rate <= 0:
+            raise ValueError("sample_rate must be positive")
+        self.read_meter = read_meter
+        self.sample_period = 1.0 / sample_rate
+        self.buffer = SampleRingBuffer(capacity)
+        self.errors = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=1.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def _run(self):
+        # Schedule against absolute deadlines so slow reads don't make the
+        # sample rate drift.
+        next_due = time.perf_counter()
+        while not self._stop.is_set():
+            try:
+                value = self.read_meter()
+            except Exception:
+                self.errors += 1
+            else:
+                self.buffer.push(time.time(), value)
+            next_due += self.sample_period
+            delay = next_due - time.perf_counter()
+            if delay < 0:
+                # Fell behind (e.g. a slow meter read); skip missed slots
+                next_due = time.perf_counter()
+                delay = 0
+            self._stop.wait(delay)
+
+
+class ConductivityDisplay:
+    """
+    Consumer: runs on the Tk thread via root.after(). Each tick it pulls any
+    new samples and eases the displayed value toward the newest reading.
+    """
+
+    def __init__(self, root, variable, acquisition, repaint_ms=30, ease_steps=15, on_samples=None,
+                 signal=None):
+        """
+        root:        Tk root (only used for after/after_cancel)
+        variable:    StringVar showing the value
+        acquisition: ConductivityAcquisition to consume from
+        repaint_ms:  tick period of the display
+        ease_steps:  ticks used to animate between two readings
+        on_samples:  optional callback(list of (timestamp, value)) per tick
+        signal:      optional conductivity_dsp.SignalPipeline; each tick's new
+                     samples go through it as one block, and only the clean
+                     samples are shown and passed to on_samples
+        """
+        self.root = root
+        self.variable = variable
+        self.acquisition = acquisition
+        self.repaint_ms = repaint_ms
+        self.ease_steps = max(1, ease_steps)
+        self.on_samples = on_samples
+        self.signal = signal
+
+        self.cursor = 0
+        self.current = 0.0
+        self.target = 0.0
+        self.step = 0.0
+        self.steps_left = 0
+        self._shown = None
+        self._after_id = None
+
+    def start(self):
+        if self._after_id is None:
+            self._after_id = self.root.after(self.repaint_ms, self.tick)
+
+    def stop(self):
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+            self._after_id = None
+
+    def animate_to(self, target):
+        """Starts a GUI-side ease from the current value to `target`."""
+        self.target = target
+        self.step = (target - self.current) / self.ease_steps
+        self.steps_left = self.ease_steps
+
+    def tick(self):
+        samples, self.cursor = self.acquisition.buffer.read_since(self.cursor)
+        if samples and self.signal is not None:
+            timestamps, values = self.signal.process(*zip(*samples))
+            samples = list(zip(timestamps.tolist(), values.tolist()))
+        if samples:
+            if self.on_samples is not None:
+                self.on_samples(samples)
+            self.animate_to(samples[-1][1])
+
+        if self.steps_left > 0:
+            self.steps_left -= 1
+            self.current = self.target if self.steps_left == 0 else self.current + self.step
+            self._render()
+
+        self._after_id = self.root.after(self.repaint_ms, self.tick)
+
+    def _render(self):
+        text = f"{self.current:.2f}"
+        if text != self._shown:  # skip redundant StringVar writes
+            self._shown = text
+            self.variable.set(text)
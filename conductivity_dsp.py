@@ -0,0 +1,259 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# ------------------------------------------------------------------
+# CONDUCTIVITY SIGNAL PROCESSING
+#
+#   meter -> raw block -> temperature compensation -> filters
+#         -> block average -> clean samples (settling, plot, optimizer)
+#
+# Every stage works on a NumPy block of samples and carries its state
+# (window tail, filter estimate) to the next block, so splitting a
+# stream into blocks of any size gives the same output. Filters are
+# causal: each output sample only depends on samples up to it.
+#
+# The recursive filters (EMA, Kalman) are evaluated in closed form per
+# block instead of with a Python loop per sample; a Kalman filter with
+# a random-walk model is an EMA whose gain converges (independently of
+# the data) to a fixed value.
+# ------------------------------------------------------------------
+
+MAD_TO_SIGMA = 1.4826  # MAD of normally distributed noise -> standard deviation
+
+
+def _as_block(values):
+    return np.asarray(values, dtype=np.float64).ravel()
+
+
+def exponential_smooth(x, y0, alpha):
+    """
+    y[n] = (1 - alpha) * y[n-1] + alpha * x[n] with y[-1] = y0, for a whole
+    block at once: y[n] = d^(n+1) y0 + alpha d^n cumsum(x[j] d^-j), d = 1 - alpha.
+    Long blocks are split so d^-j stays finite.
+    """
+    decay = 1.0 - alpha
+    if decay <= 0.0:
+        return x.copy()
+    chunk = max(1, int(300.0 / -np.log(decay)))  # d^-chunk stays below e^300
+    out = np.empty_like(x)
+    for start in range(0, len(x), chunk):
+        seg = x[start:start + chunk]
+        powers = decay ** np.arange(len(seg))
+        out[start:start + chunk] = powers * (decay * y0 + alpha * np.cumsum(seg / powers))
+        y0 = out[start + len(seg) - 1]
+    return out
+
+
+class _WindowStage:
+    """Base for stages over a sliding window of the last `window` raw samples."""
+
+    def __init__(self, window):
+        if window < 1:
+            raise ValueError("window must be at least 1 sample")
+        self.window = window
+        self.reset()
+
+    def reset(self):
+        self._tail = None  # last window - 1 raw samples of the previous block
+
+    def _windows(self, x):
+        """One row per sample of x: that sample and the window - 1 before it."""
+        if self._tail is None:
+            self._tail = np.full(self.window - 1, x[0])  # warm up on the first sample
+        history = np.concatenate((self._tail, x))
+        self._tail = history[len(history) - (self.window - 1):]
+        return sliding_window_view(history, self.window)
+
+
+class MedianFilter(_WindowStage):
+    """Rolling median: removes spikes shorter than half the window."""
+
+    def process(self, values):
+        x = _as_block(values)
+        if not len(x):
+            return x
+        return np.median(self._windows(x), axis=1)
+
+
+class OutlierRejector(_WindowStage):
+    """
+    Hampel filter: a sample more than `sigmas` robust standard deviations
+    (MAD based) from the rolling median is replaced by that median.
+    """
+
+    def __init__(self, window=15, sigmas=4.0, min_sigma=1e-6):
+        """min_sigma: floor on the noise estimate, so a flat window doesn't reject everything."""
+        self.sigmas = sigmas
+        self.min_sigma = min_sigma
+        self.rejected = 0
+        super().__init__(window)
+
+    def process(self, values):
+        x = _as_block(values)
+        if not len(x):
+            return x
+        windows = self._windows(x)
+        median = np.median(windows, axis=1)
+        sigma = MAD_TO_SIGMA * np.median(np.abs(windows - median[:, None]), axis=1)
+        outliers = np.abs(x - median) > self.sigmas * np.maximum(sigma, self.min_sigma)
+        self.rejected += int(np.count_nonzero(outliers))
+        return np.where(outliers, median, x)
+
+
+class EMAFilter:
+    """Exponential moving average with smoothing factor alpha (0 < alpha <= 1)."""
+
+    def __init__(self, alpha=0.3):
+        if not 0.0 < alpha <= 1.0:
+            raise ValueError("alpha must be in (0, 1]")
+        self.alpha = alpha
+        self.reset()
+
+    def reset(self):
+        self.value = None
+
+    def process(self, values):
+        x = _as_block(values)
+        if not len(x):
+            return x
+        y0 = x[0] if self.value is None else self.value
+        out = exponential_smooth(x, y0, self.alpha)
+        self.value = out[-1]
+        return out
+
+
+class KalmanFilter:
+    """
+    1-D Kalman filter for a slowly drifting level (random walk).
+
+    process_std:     expected drift of the true value per sample
+    measurement_std: meter noise
+    """
+
+    def __init__(self, process_std=0.03, measurement_std=0.05, tolerance=1e-9):
+        if process_std <= 0 or measurement_std <= 0:
+            raise ValueError("process_std and measurement_std must be positive")
+        self.q = process_std ** 2
+        self.r = measurement_std ** 2
+        self.tolerance = tolerance
+        # Steady state of the Riccati recursion: the gain every run converges to
+        p = (-self.q + np.sqrt(self.q * self.q + 4.0 * self.q * self.r)) / 2.0
+        self.steady_gain = (p + self.q) / (p + self.q + self.r)
+        self.reset()
+
+    def reset(self):
+        self.value = None
+        self.variance = None
+        self.gain = None
+
+    def process(self, values):
+        x = _as_block(values)
+        if not len(x):
+            return x
+        out = np.empty_like(x)
+        start = 0
+        if self.value is None:
+            self.value, self.variance = x[0], self.r
+            out[0] = x[0]
+            start = 1
+        # Transient: the gain depends only on the step count, not on the data,
+        # and reaches the steady gain within a few dozen samples.
+        while start < len(x) and (self.gain is None or abs(self.gain - self.steady_gain) > self.tolerance):
+            predicted = self.variance + self.q
+            self.gain = predicted / (predicted + self.r)
+            self.variance = (1.0 - self.gain) * predicted
+            self.value += self.gain * (x[start] - self.value)
+            out[start] = self.value
+            start += 1
+        if start < len(x):
+            out[start:] = exponential_smooth(x[start:], self.value, self.steady_gain)
+            self.value = out[-1]
+        return out
+
+
+class TemperatureCompensation:
+    """
+    Linear compensation to the reference temperature:
+    k_ref = k_T / (1 + coefficient * (T - reference)).
+    """
+
+    def __init__(self, temperature, coefficient=0.02, reference=25.0):
+        """
+        temperature: degrees C, or a callable returning the current temperature
+                     (read once per block)
+        coefficient: fractional change per degree C (about 0.02 for electrolytes)
+        """
+        self.temperature = temperature
+        self.coefficient = coefficient
+        self.reference = reference
+
+    def process(self, values, temperatures=None):
+        x = _as_block(values)
+        if temperatures is None:
+            temperatures = self.temperature() if callable(self.temperature) else self.temperature
+        return x / (1.0 + self.coefficient * (np.asarray(temperatures, dtype=np.float64) - self.reference))
+
+
+class BlockAverager:
+    """Averages every `factor` samples into one; a partial block waits for the next call."""
+
+    def __init__(self, factor=1):
+        if factor < 1:
+            raise ValueError("factor must be at least 1")
+        self.factor = factor
+        self.reset()
+
+    def reset(self):
+        self._t = np.empty(0)
+        self._v = np.empty(0)
+
+    def process(self, timestamps, values):
+        t = np.concatenate((self._t, _as_block(timestamps)))
+        v = np.concatenate((self._v, _as_block(values)))
+        n = len(v) - len(v) % self.factor
+        self._t, self._v = t[n:], v[n:]
+        if self.factor == 1:
+            return t[:n], v[:n]
+        return t[:n].reshape(-1, self.factor).mean(axis=1), v[:n].reshape(-1, self.factor).mean(axis=1)
+
+
+class SignalPipeline:
+    def __init__(self, stages=(), compensation=None, decimate=1):
+        """
+        stages:       filters applied in order (MedianFilter, OutlierRejector,
+                      EMAFilter, KalmanFilter, ...), each with process(block)
+        compensation: TemperatureCompensation applied to the raw block first
+        decimate:     raw samples averaged into each clean sample
+        """
+        self.stages = list(stages)
+        self.compensation = compensation
+        self.decimate = decimate
+        self._averager = BlockAverager(decimate)
+        self.samples_in = 0
+        self.samples_out = 0
+
+    def reset(self):
+        """Forgets all filter state (e.g. after a new mix)."""
+        for stage in self.stages:
+            stage.reset()
+        self._averager.reset()
+
+    @property
+    def rejected(self):
+        return sum(getattr(stage, "rejected", 0) for stage in self.stages)
+
+    def process(self, timestamps, values, temperatures=None):
+        """
+        Runs a block of raw samples through every stage. Returns
+        (timestamps, values) of the clean samples, len(values) // decimate of them
+        (plus any carried over from the previous block).
+        """
+        v = _as_block(values)
+        self.samples_in += len(v)
+        if self.compensation is not None:
+            v = self.compensation.process(v, temperatures)
+        for stage in self.stages:
+            v = stage.process(v)
+        t, v = self._averager.process(timestamps, v)
+        self.samples_out += len(v)
+        return t, v
@@ -0,0 +1,188 @@
+import math
+
+import numpy as np
+
+# ------------------------------------------------------------------
+# CLOSED-LOOP CONDUCTIVITY OPTIMIZER
+#
+# Gaussian process (RBF kernel) + expected improvement over a pool of
+# candidate formulations (rows of additive percentages, e.g. from
+# formulation_grid.generate_candidates).
+#
+# The GP keeps the inverse Cholesky factor of its kernel matrix and
+# extends it by one row per observation, so learning from a new
+# measurement is O(n^2) instead of an O(n^3) refit.
+# ------------------------------------------------------------------
+
+
+def _norm_cdf(z):
+    # Abramowitz & Stegun 7.1.26 erf approximation (|error| < 1.5e-7), vectorized
+    x = np.abs(z) / math.sqrt(2.0)
+    t = 1.0 / (1.0 + 0.3275911 * x)
+    poly = t * (0.254829592 + t * (-0.284496736 + t * (1.421413741 + t * (-1.453152027 + t * 1.061405429))))
+    erf = 1.0 - poly * np.exp(-x * x)
+    return 0.5 * (1.0 + np.sign(z) * erf)
+
+
+def _norm_pdf(z):
+    return np.exp(-0.5 * z * z) / math.sqrt(2.0 * math.pi)
+
+
+def expected_improvement(mu, sigma, best, xi=0.01):
+    """EI for maximization."""
+    sigma = np.maximum(sigma, 1e-12)
+    gain = mu - best - xi
+    z = gain / sigma
+    return gain * _norm_cdf(z) + sigma * _norm_pdf(z)
+
+
+class IncrementalGP:
+    """
+    GP regression with a fixed RBF kernel on standardized targets.
+
+    Stores L^-1 (inverse lower Cholesky factor of K + noise*I). Adding the
+    (n+1)-th point appends one row to L^-1 in O(n^2):
+        L_new^-1 = [[L^-1, 0], [-(l^T L^-1) / d, 1/d]]
+    where l = L^-1 k(X, x) and d = sqrt(k(x, x) + noise - l.l).
+    """
+
+    def __init__(self, length_scale=2.0, noise=0.05, initial_capacity=64):
+        self.length_scale = length_scale
+        self.noise = noise
+        self.n = 0
+        self._X = None
+        self._y = np.zeros(initial_capacity)
+        self._Linv = np.zeros((initial_capacity, initial_capacity))
+
+    def kernel(self, A, B):
+        sq = (
+            np.sum(A * A, axis=1)[:, None]
+            + np.sum(B * B, axis=1)[None, :]
+            - 2.0 * A @ B.T
+        )
+        return np.exp(-0.5 * np.maximum(sq, 0.0) / self.length_scale ** 2)
+
+    def _grow(self):
+        cap = self._Linv.shape[0] * 2
+        Linv = np.zeros((cap, cap))
+        Linv[:self.n, :self.n] = self._Linv[:self.n, :self.n]
+        self._Linv = Linv
+        X = np.zeros((cap, self._X.shape[1]))
+        X[:self.n] = self._X[:self.n]
+        self._X = X
+        y = np.zeros(cap)
+        y[:self.n] = self._y[:self.n]
+        self._y = y
+
+    def add(self, x, y):
+        x = np.asarray(x, dtype=float).reshape(1, -1)
+        if self._X is None:
+            self._X = np.zeros((self._Linv.shape[0], x.shape[1]))
+        if self.n == self._Linv.shape[0]:
+            self._grow()
+
+        n = self.n
+        kss = 1.0 + self.noise
+        if n == 0:
+            d = math.sqrt(kss)
+            self._Linv[0, 0] = 1.0 / d
+        else:
+            Linv = self._Linv[:n, :n]
+            k = self.kernel(self._X[:n], x)[:, 0]
+            l = Linv @ k
+            d = math.sqrt(max(kss - l @ l, 1e-12))
+            self._Linv[n, :n] = -(l @ Linv) / d
+            self._Linv[n, n] = 1.0 / d
+
+        self._X[n] = x[0]
+        self._y[n] = y
+        self.n += 1
+
+    def predict(self, Xs):
+        """Posterior mean and std (in the units of y) at rows of Xs."""
+        Xs = np.asarray(Xs, dtype=float)
+        if self.n == 0:
+            return np.zeros(len(Xs)), np.ones(len(Xs))
+        n = self.n
+        y = self._y[:n]
+        y_mean = y.mean()
+        y_std = y.std() if n > 1 and y.std() > 0 else 1.0
+
+        Linv = self._Linv[:n, :n]
+        v = Linv @ ((y - y_mean) / y_std)          # O(n^2)
+        A = Linv @ self.kernel(self._X[:n], Xs)     # O(n^2 m)
+        mu = A.T @ v
+        var = np.maximum(1.0 - np.sum(A * A, axis=0), 1e-12)
+        return mu * y_std + y_mean, np.sqrt(var) * y_std
+
+
+class ConductivityOptimizer:
+    """
+    Proposes the next formulation to measure and learns from each result.
+
+    candidates: (m, d) array of additive percentages to choose from
+    """
+
+    def __init__(self, candidates, length_scale=2.0, noise=0.05, xi=0.01,
+                 max_candidates=2048, seed=None):
+        self.candidates = np.asarray(candidates, dtype=float)
+        if self.candidates.ndim != 2 or len(self.candidates) == 0:
+            raise ValueError("candidates must be a non-empty 2-D array")
+        self.gp = IncrementalGP(length_scale=length_scale, noise=noise)
+        self.xi = xi
+        self.max_candidates = max_candidates
+        self.rng = np.random.default_rng(seed)
+        self.tried = np.zeros(len(self.candidates), dtype=bool)
+        self.best_value = -np.inf
+        self.best_pcts = None
+
+    @property
+    def observations(self):
+        return self.gp.n
+
+    def suggest(self):
+        """Returns (candidate index, percentages row) to measure next."""
+        pool = np.flatnonzero(~self.tried)
+        if len(pool) == 0:
+            pool = np.arange(len(self.candidates))
+        if self.gp.n == 0:
+            index = int(self.rng.choice(pool))
+            return index, self.candidates[index]
+        # Score a random subset so suggestion latency is bounded on huge pools
+        if len(pool) > self.max_candidates:
+            pool = self.rng.choice(pool, self.max_candidates, replace=False)
+        mu, sigma = self.gp.predict(self.candidates[pool])
+        ei = expected_improvement(mu, sigma, self.best_value, self.xi)
+        index = int(pool[np.argmax(ei)])
+        return index, self.candidates[index]
+
+    def skip(self, index):
+        """Marks a candidate as tried without measuring it (e.g. it failed validation)."""
+        self.tried[index] = True
+
+    def observe(self, pcts, conductivity, index=None):
+        """Adds one measured (formulation, conductivity) pair."""
+        pcts = np.asarray(pcts, dtype=float)
+        self.gp.add(pcts, conductivity)
+        if index is not None:
+            self.tried[index] = True
+        if conductivity > self.best_value:
+            self.best_value = conductivity
+            self.best_pcts = pcts.copy()
+
+
+def synthetic_conductivity(pcts, optimum=None, peak=12.0, base=9.0, width=3.0,
+                           noise=0.0, rng=None):
+    """
+    Stand-in for the meter in tests and simulation (mS/cm). A smooth bump of
+    height `peak - base` centred on `optimum`, plus optional Gaussian noise.
+    Works on one formulation (1-D) or a batch (2-D).
+    """
+    pcts = np.asarray(pcts, dtype=float)
+    if optimum is None:
+        optimum = np.linspace(1.0, 2.0, pcts.shape[-1]) * 10.0 / (1.5 * pcts.shape[-1])
+    dist2 = np.sum((pcts - np.asarray(optimum)) ** 2, axis=-1)
+    value = base + (peak - base) * np.exp(-0.5 * dist2 / width ** 2)
+    if noise:
+        value = value + np.random.default_rng(rng).normal(0.0, noise, np.shape(value))
+    return value
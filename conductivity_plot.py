@@ -0,0 +1,161 @@
+import tkinter as tk
+from array import array
+
+# ------------------------------------------------------------------
+# LIVE CONDUCTIVITY PLOT
+#
+# MinMaxHistory keeps the whole run in a fixed number of time buckets.
+# Each bucket stores (start time, min, max, last). When every bucket is
+# used, neighbouring pairs are merged and the bucket span doubles, so
+# memory stays constant no matter how long the run is: 24 h of 10 Hz
+# data (864k samples) still fits in `capacity` buckets.
+#
+# ConductivityPlot draws one canvas line per bucket and only touches the
+# newest bucket on append. A full redraw happens only when buckets are
+# merged or the y-range grows, both of which become rarer as the run
+# gets longer.
+# ------------------------------------------------------------------
+
+
+class MinMaxHistory:
+    def __init__(self, capacity=1024, bucket_seconds=0.1):
+        """
+        capacity:       number of buckets kept (memory bound)
+        bucket_seconds: initial bucket width; doubles on every compaction
+        """
+        if capacity < 2 or capacity % 2:
+            raise ValueError("capacity must be an even number >= 2")
+        self.capacity = capacity
+        self.bucket_seconds = bucket_seconds
+        self.start_time = None
+        self.t = array("d")
+        self.lo = array("d")
+        self.hi = array("d")
+        self.last = array("d")
+        self.samples = 0
+        self.compactions = 0
+
+    def __len__(self):
+        return len(self.t)
+
+    def append(self, timestamp, value):
+        """
+        Adds one sample. Returns "new" if it opened a bucket, "update" if it
+        went into the newest bucket, or "compact" if buckets were merged.
+        """
+        self.samples += 1
+        if self.start_time is None:
+            self.start_time = timestamp
+
+        if self._in_last_bucket(timestamp):
+            self._merge_into_last(value)
+            return "update"
+
+        result = "new"
+        if len(self.t) == self.capacity:
+            self._compact()
+            result = "compact"
+            if self._in_last_bucket(timestamp):  # the wider last bucket may cover it now
+                self._merge_into_last(value)
+                return result
+        self.t.append(timestamp)
+        self.lo.append(value)
+        self.hi.append(value)
+        self.last.append(value)
+        return result
+
+    def _slot(self, timestamp):
+        return int((timestamp - self.start_time) / self.bucket_seconds)
+
+    def _in_last_bucket(self, timestamp):
+        return bool(self.t) and self._slot(timestamp) <= self._slot(self.t[-1])
+
+    def _merge_into_last(self, value):
+        if value < self.lo[-1]:
+            self.lo[-1] = value
+        if value > self.hi[-1]:
+            self.hi[-1] = value
+        self.last[-1] = value
+
+    def _compact(self):
+        """Merges bucket pairs (halving resolution) and doubles the bucket span."""
+        t, lo, hi, last = array("d"), array("d"), array("d"), array("d")
+        for i in range(0, len(self.t) - 1, 2):
+            t.append(self.t[i])
+            lo.append(min(self.lo[i], self.lo[i + 1]))
+            hi.append(max(self.hi[i], self.hi[i + 1]))
+            last.append(self.last[i + 1])
+        self.t, self.lo, self.hi, self.last = t, lo, hi, last
+        self.bucket_seconds *= 2
+        self.compactions += 1
+
+    def bucket(self, i):
+        return self.t[i], self.lo[i], self.hi[i], self.last[i]
+
+
+class ConductivityPlot(tk.Canvas):
+    """Canvas panel showing the min/max envelope of the conductivity trace."""
+
+    def __init__(self, master, capacity=1024, width=600, height=160,
+                 y_min=0.0, y_max=100.0, line_color="#E74C3C", **kwargs):
+        kwargs.setdefault("bg", "#3B4B5C")
+        kwargs.setdefault("highlightthickness", 0)
+        super().__init__(master, width=width, height=height, **kwargs)
+        self.history = MinMaxHistory(capacity)
+        self.plot_width = width
+        self.plot_height = height
+        self.y_min = y_min
+        self.y_max = y_max
+        self.line_color = line_color
+        self._items = []  # one canvas line per bucket
+        self.full_redraws = 0
+
+    # ---------- Coordinates ----------
+    def _x(self, i):
+        return i * self.plot_width / self.history.capacity
+
+    def _y(self, value):
+        span = (self.y_max - self.y_min) or 1.0
+        return self.plot_height - (value - self.y_min) / span * self.plot_height
+
+    def _bucket_coords(self, i):
+        h = self.history
+        x = self._x(i)
+        prev = h.last[i - 1] if i > 0 else h.lo[i]
+        x_prev = self._x(i - 1) if i > 0 else x
+        return (x_prev, self._y(prev), x, self._y(h.lo[i]),
+                x, self._y(h.hi[i]), x, self._y(h.last[i]))
+
+    # ---------- Drawing ----------
+    def append(self, timestamp, value):
+        """Adds a sample and updates only the canvas items that changed."""
+        change = self.history.append(timestamp, value)
+
+        if value < self.y_min or value > self.y_max:
+            margin = 0.1 * (max(self.y_max, value) - min(self.y_min, value))
+            self.y_min = min(self.y_min, value - margin)
+            self.y_max = max(self.y_max, value + margin)
+            self.redraw()
+        elif change == "compact":
+            self.redraw()
+        elif change == "new":
+            i = len(self.history) - 1
+            self._items.append(self.create_line(*self._bucket_coords(i), fill=self.line_color))
+        else:
+            i = len(self.history) - 1
+            self.coords(self._items[i], *self._bucket_coords(i))
+
+    def redraw(self):
+        self.full_redraws += 1
+        for item in self._items:
+            self.delete(item)
+        self._items = [
+            self.create_line(*self._bucket_coords(i), fill=self.line_color)
+            for i in range(len(self.history))
+        ]
+
+    def clear(self):
+        for item in self._items:
+            self.delete(item)
+        self._items = []
+        self.history = MinMaxHistory(self.history.capacity)
@@ -0,0 +1,247 @@
+import time
+
+# ------------------------------------------------------------------
+# DISPENSE SCHEDULER
+#
+# Turns the controller's final `additives` dict ({name: {port, used,
+# volume, ...}}) into a pump command plan and sends it to the Arduino
+# as one framed batch:
+#
+#   BATCH <n>
+#   VALVE <port>
+#   RATE <ml/s>        (only with a pump calibration; see pump_calibration.py)
+#   DISPENSE <ml>
+#   PURGE <argon port> <seconds>
+#   ...
+#   END <checksum>
+#
+# RATE sets the flow rate for the following dispenses. Plans built
+# without a calibration never contain it, so they run at the firmware's
+# default rate exactly as before.
+#
+# checksum = sum of the bytes of the <n> command lines (without
+# newlines) modulo 65536, so the firmware can reject a truncated batch.
+# ------------------------------------------------------------------
+
+OP_VALVE = "VALVE"
+OP_DISPENSE = "DISPENSE"
+OP_PURGE = "PURGE"
+OP_RATE = "RATE"
+
+DEFAULT_PURGE_SECONDS = 2.0
+DEFAULT_FLOW_RATE = 0.5  # ml/s, the firmware's rate until a RATE command
+MIN_DISPENSE_VOLUME = 0.0005  # ml; anything smaller is below pump resolution
+
+
+class DispensePlan:
+    """
+    Ordered list of (op, port, amount) commands plus some bookkeeping.
+    Plans are not modified once built, so the framed batch is compiled once.
+    """
+
+    def __init__(self, commands=None):
+        self.commands = list(commands or [])
+        self._frame = None
+
+    def __len__(self):
+        return len(self.commands)
+
+    def __iter__(self):
+        return iter(self.commands)
+
+    @property
+    def valve_switches(self):
+        return sum(1 for op, _, _ in self.commands if op == OP_VALVE)
+
+    @property
+    def purges(self):
+        return sum(1 for op, _, _ in self.commands if op == OP_PURGE)
+
+    @property
+    def total_volume(self):
+        return sum(amount for op, _, amount in self.commands if op == OP_DISPENSE)
+
+    def to_lines(self):
+        lines = []
+        for op, port, amount in self.commands:
+            if op == OP_VALVE:
+                lines.append(f"{OP_VALVE} {port}")
+            elif op == OP_DISPENSE:
+                lines.append(f"{OP_DISPENSE} {amount:.3f}")
+            elif op == OP_PURGE:
+                lines.append(f"{OP_PURGE} {port} {amount:.1f}")
+            elif op == OP_RATE:
+                lines.append(f"{OP_RATE} {amount:.3f}")
+        return lines
+
+    def frame(self):
+        """The whole plan as framed lines, ready for one batched write."""
+        if self._frame is None:
+            lines = self.to_lines()
+            checksum = sum(sum(line.encode("ascii")) for line in lines) % 65536
+            self._frame = [f"BATCH {len(lines)}"] + lines + [f"END {checksum}"]
+        return self._frame
+
+
+def used_volumes(additives):
+    """{port: total ml} for every used additive with a dispensable volume."""
+    volumes = {}
+    for entry in additives.values():
+        if entry.get("used") and entry.get("volume", 0.0) >= MIN_DISPENSE_VOLUME:
+            port = entry["port"]
+            volumes[port] = volumes.get(port, 0.0) + entry["volume"]
+    return volumes
+
+
+def build_dispense_plan(additives, purge_port, purge_seconds=DEFAULT_PURGE_SECONDS,
+                        current_port=None, bulk_port=None, dispense_settings=None):
+    """
+    Builds an optimized plan from the final `additives` dict.
+
+    - Additives sharing a port are merged into a single dispense.
+    - Each port is visited once; the valve is only switched when the port
+      actually changes (so `current_port` can save the very first switch).
+    - An argon purge separates consecutive reagents, but none is added
+      before the first reagent or after the last one.
+    - `bulk_port` (LP30) is dispensed last so the large bulk volume flushes
+      the small additive volumes out of the shared line.
+    - `dispense_settings(port, ml)` -> (ml to command, ml/s) corrects each
+      volume for the pump's calibration and picks its flow rate; a RATE
+      command is only sent when the rate changes.
+    """
+    volumes = used_volumes(additives)
+
+    ports = sorted(p for p in volumes if p != bulk_port)
+    if current_port in ports:
+        # Start on the port the valve is already on
+        ports.remove(current_port)
+        ports.insert(0, current_port)
+    if bulk_port in volumes:
+        ports.append(bulk_port)
+
+    commands = []
+    position = current_port
+    rate = None
+    for i, port in enumerate(ports):
+        if i > 0:
+            commands.append((OP_PURGE, purge_port, purge_seconds))
+            position = purge_port
+        if port != position:
+            commands.append((OP_VALVE, port, None))
+            position = port
+        volume = volumes[port]
+        if dispense_settings is not None:
+            volume, port_rate = dispense_settings(port, volume)
+            if port_rate != rate:
+                commands.append((OP_RATE, port, port_rate))
+                rate = port_rate
+        commands.append((OP_DISPENSE, port, volume))
+    return DispensePlan(commands)
+
+
+def build_naive_plan(additives, purge_port, purge_seconds=DEFAULT_PURGE_SECONDS):
+    """One switch + dispense + purge per used additive, in dict order (for comparison)."""
+    commands = []
+    for entry in additives.values():
+        if entry.get("used") and entry.get("volume", 0.0) >= MIN_DISPENSE_VOLUME:
+            commands.append((OP_VALVE, entry["port"], None))
+            commands.append((OP_DISPENSE, entry["port"], entry["volume"]))
+            commands.append((OP_PURGE, purge_port, purge_seconds))
+    return DispensePlan(commands)
+
+
+def send_plan(plan, transport, timeout=5.0):
+    """
+    Sends the framed plan in a single write and waits for the Arduino's
+    one-line acknowledgement (e.g. "OK <n>"). Returns the reply.
+    A TransportError from the write is not retried: the Arduino may have
+    received the batch, so check before sending it again.
+    """
+    transport.write_commands(plan.frame())
+    return transport.read_line(timeout)
+
+
+class SimulatedPump:
+    """
+    Timing model of the pump/valve rig. run() returns the total dispense
+    time in seconds; with realtime=True it also sleeps for that long
+    (scaled by time_scale, so simulated rigs can run faster than real ones).
+    """
+
+    def __init__(self, flow_rate=DEFAULT_FLOW_RATE, valve_switch_time=0.8, command_overhead=0.05,
+                 realtime=False, time_scale=1.0, physics=None):
+        """
+        flow_rate:         ml per second until a RATE command
+        valve_switch_time: seconds per valve move
+        command_overhead:  fixed per-command cost (parse + ack)
+        time_scale:        realtime sleeps last total * time_scale seconds
+        physics:           what actually comes out of the pump, e.g.
+                           pump_calibration.PumpPhysics; None = exactly the
+                           commanded volume
+        """
+        self.flow_rate = flow_rate
+        self.rate = flow_rate
+        self.physics = physics
+        self.delivered = {}  # port -> ml actually delivered
+        self.valve_switch_time = valve_switch_time
+        self.command_overhead = command_overhead
+        self.realtime = realtime
+        self.time_scale = time_scale
+        self.port = None
+        self.dispensed = {}
+        self.last_breakdown = None
+
+    def command_time(self, op, port, amount):
+        cost = self.command_overhead
+        if op == OP_VALVE:
+            if port != self.port:
+                cost += self.valve_switch_time
+            self.port = port
+        elif op == OP_RATE:
+            self.rate = amount
+        elif op == OP_DISPENSE:
+            cost += amount / self.rate
+            self.dispensed[self.port] = self.dispensed.get(self.port, 0.0) + amount
+            delivered = amount if self.physics is None else self.physics.deliver(self.port, amount, self.rate)
+            self.delivered[self.port] = self.delivered.get(self.port, 0.0) + delivered
+        elif op == OP_PURGE:
+            if port != self.port:
+                cost += self.valve_switch_time
+            self.port = port
+            cost += amount
+        return cost
+
+    def run(self, plan):
+        """
+        Returns the total time. Per-stage times are left in `last_breakdown`:
+        {"dispense": {port: [ml, seconds]}, "valve": [count, seconds],
+         "purge": [count, seconds], "command": [count, seconds]}
+        The fixed per-command overhead of every command is in "command"
+        only, so the stage times are what each stage itself costs.
+        """
+        total = 0.0
+        breakdown = {"dispense": {}, "valve": [0, 0.0], "purge": [0, 0.0], "command": [0, 0.0]}
+        for op, port, amount in plan:
+            cost = self.command_time(op, port, amount)
+            total += cost
+            breakdown["command"][0] += 1
+            breakdown["command"][1] += self.command_overhead
+            cost -= self.command_overhead
+            if op == OP_DISPENSE:
+                ml_s = breakdown["dispense"].setdefault(port, [0.0, 0.0])
+                ml_s[0] += amount
+                ml_s[1] += cost
+            elif op in (OP_VALVE, OP_PURGE):
+                stage = breakdown["valve" if op == OP_VALVE else "purge"]
+                stage[0] += 1
+                stage[1] += cost
+        self.last_breakdown = breakdown
+        if self.realtime:
+            time.sleep(total * self.time_scale)
+        return total
+
+    def respond(self, line):
+        """Responder for serial_transport.PtyLoopback: acks each framed batch."""
+        if line.startswith("END"):
+            return "OK"
+        return None
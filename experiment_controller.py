@@ -0,0 +1,334 @@
+import time
+
+from experiment_engine import (
+    ExperimentEngine, simulated_measurement, EVENT_CANCELLED, EVENT_ERROR,
+)
+from dispense_scheduler import build_dispense_plan, send_plan, SimulatedPump
+from formulation import Formulation
+from reagent_registry import reagents
+from instrumentation import tracer
+
+# ------------------------------------------------------------------
+# PYTHON CONTROLLER VARIABLES & PLACEHOLDERS (from your controller)
+#
+# Headless half of the controller: no Tk, no dialogs. The GUI and the
+# command-line runner (headless_runner.py) both drive the same pipeline:
+#   validate -> integrate 'additives' -> volumes -> dispense -> measure -> log
+# ------------------------------------------------------------------
+
+# Ports, volumes, and placeholders
+ARDUINO_PORT = "/dev/tty.usbserial-1110"
+COND_METER_PORT = "COM15"
+BAUD_RATE = 115200
+TOTAL_VOLUME = 3.00  # ml
+
+# Append-only JSON-lines log of every experiment and conductivity sample
+EXPERIMENT_LOG_PATH = "experiments_log.jsonl"
+
+# Reagents and their ports: reagent_registry.py (reagents.json)
+PORT_ELECTROLYTE_LP30 = reagents.solvent.port
+PORT_ARGON_GAS = reagents.purge.port
+
+# Recommended overall additive concentration (%)
+RECOMMENDED_TOTAL = 10.0
+
+# Adaptive settling (replaces the fixed per-iteration sleep)
+SETTLE_WINDOW = 10           # samples
+SETTLE_SLOPE_TOL = 0.05      # reading units per second
+SETTLE_STD_TOL = 0.1         # reading units
+SETTLE_SAMPLE_PERIOD = 0.1   # seconds
+SETTLE_MAX_SECONDS = 30.0
+
+# Signal processing between the meter and the settling detector / plot / optimizer
+SIGNAL_DECIMATE = 5             # raw samples per clean sample (raw rate = 5 / SETTLE_SAMPLE_PERIOD)
+SIGNAL_OUTLIER_WINDOW = 15      # raw samples
+SIGNAL_OUTLIER_SIGMAS = 4.0
+SIGNAL_PROCESS_STD = 0.03       # Kalman: drift of the true reading per raw sample
+SIGNAL_MEASUREMENT_STD = 0.05   # Kalman: meter noise
+TEMPERATURE_COEFFICIENT = 0.02  # fractional conductivity change per degree C
+REFERENCE_TEMPERATURE = 25.0    # degrees C
+
+# Dictionary to store additives and their properties, one entry per
+# registered additive plus the solvent (LP30, always used by default)
+# (Will be updated by the GUI selections)
+additives = reagents.additives_dict()
+
+# This dict is updated by the GUI to store user selections (like {"TEP": 50, "ADDITIVE_X": 30})
+selected_additives_from_ui = {}
+
+
+# Long-lived device connections (opened on first use, reused for the session)
+def get_arduino():
+    """Shared connection to the pump/valve Arduino (auto-reset paid once)."""
+    from serial_transport import transport_pool
+    return transport_pool.get(ARDUINO_PORT, baudrate=BAUD_RATE, reset_delay=2.0)
+
+def get_cond_meter():
+    """Shared connection to the conductivity meter."""
+    from serial_transport import transport_pool
+    return transport_pool.get(COND_METER_PORT, baudrate=BAUD_RATE, reset_delay=0)
+
+
+# ------------------------------------------------------------------
+# PIPELINE STAGES
+# ------------------------------------------------------------------
+def formulation_warnings(total_add_pct, total_compound_pct):
+    """
+    Manual-mode checks. Returns a list of (title, message) for every check
+    that fails (see formulation_validation for policies and batches).
+    """
+    from formulation_validation import check_totals
+    return [(v.title, v.message) for v in check_totals(total_add_pct, total_compound_pct)]
+
+
+def integrate_additives(formulation, total_add_pct, total_volume=TOTAL_VOLUME, target=None):
+    """
+    Writes a formulation into the controller 'additives' dictionary and
+    computes each used additive's volume. Returns the dictionary.
+
+    target: a copy from fresh_additives() to work out volumes without
+            touching the controller state (e.g. for queued experiments)
+    """
+    if target is None:
+        target = additives
+        # Additive keys come straight from the formulation, e.g. {"TEP": 30, ...}
+        # ("Compound 1" -> "TEP" etc. is resolved when the compound is added)
+        selected_additives_from_ui.clear()
+        selected_additives_from_ui.update(formulation.by_additive_key())
+
+    # 1) Clear out old values
+    for ad in target:
+        target[ad]["used"] = False
+        target[ad]["percentage"] = 0
+        target[ad]["volume"] = 0.0
+
+    # 2) Mark the formulation's additives as used
+    for additive_key, percentage in formulation.by_additive_key().items():
+        if additive_key in target:
+            target[additive_key]["used"] = True
+            target[additive_key]["percentage"] = percentage
+
+    # LP30 is always used, filling the leftover
+    leftover_lp30 = max(100 - total_add_pct, 0)
+    target[reagents.solvent.key]["used"] = True
+    target[reagents.solvent.key]["percentage"] = leftover_lp30
+
+    # 3) Compute volumes
+    for v in target.values():
+        if v["used"]:
+            v["volume"] = (v["percentage"] / 100) * total_volume
+    return target
+
+
+def fresh_additives():
+    """Independent copy of the 'additives' dictionary."""
+    return {k: dict(v) for k, v in additives.items()}
+
+
+def plan_dispense(additives_dict=None):
+    """
+    Compiles the 'additives' volumes into one batched pump plan. With a
+    pump calibration (pump_calibration.json), volumes are corrected and
+    each reagent runs at its fastest in-tolerance flow rate.
+    """
+    from pump_calibration import calibration
+    return build_dispense_plan(
+        additives if additives_dict is None else additives_dict,
+        purge_port=PORT_ARGON_GAS, bulk_port=PORT_ELECTROLYTE_LP30,
+        dispense_settings=calibration.settings if calibration.active else None,
+    )
+
+
+def plan_for(formulation, total_add_pct, total_volume=TOTAL_VOLUME):
+    """Dispense plan for a formulation, leaving the controller state alone."""
+    return plan_dispense(
+        integrate_additives(formulation, total_add_pct, total_volume, target=fresh_additives())
+    )
+
+
+def make_settling_detector(max_seconds=SETTLE_MAX_SECONDS):
+    """Settling detector configured with the controller defaults."""
+    from settling import SettlingDetector
+    return SettlingDetector(
+        window=SETTLE_WINDOW, slope_tol=SETTLE_SLOPE_TOL, std_tol=SETTLE_STD_TOL,
+        sample_period=SETTLE_SAMPLE_PERIOD, max_seconds=max_seconds,
+    )
+
+
+def make_signal_pipeline(temperature=None, decimate=SIGNAL_DECIMATE):
+    """
+    Outlier rejection + Kalman smoothing + block averaging with the
+    controller defaults. `temperature` (degrees C, or a callable reading a
+    probe) turns on compensation to REFERENCE_TEMPERATURE.
+    """
+    from conductivity_dsp import SignalPipeline, OutlierRejector, KalmanFilter, TemperatureCompensation
+    compensation = None
+    if temperature is not None:
+        compensation = TemperatureCompensation(
+            temperature, coefficient=TEMPERATURE_COEFFICIENT, reference=REFERENCE_TEMPERATURE
+        )
+    return SignalPipeline(
+        [OutlierRejector(window=SIGNAL_OUTLIER_WINDOW, sigmas=SIGNAL_OUTLIER_SIGMAS),
+         KalmanFilter(process_std=SIGNAL_PROCESS_STD, measurement_std=SIGNAL_MEASUREMENT_STD)],
+        compensation=compensation, decimate=decimate,
+    )
+
+
+def build_log_record(experiment_number, mode, iterations, readings, formulation,
+                     settle_times=(), stage_times=None, additives_dict=None, rig=None,
+                     recipe=None):
+    """
+    Log entry for one experiment (same shape in the GUI and the CLI).
+    `stage_times` is the pump's per-stage breakdown, used to learn the ETA;
+    `rig` names the mixing station when several share one log; `recipe`
+    is the recipe_cache key, so replicates can be grouped.
+    """
+    if additives_dict is None:
+        additives_dict = additives
+    record = {
+        "experiment_number": experiment_number,
+        "mode": mode,
+        "iterations": iterations,
+        "conductivity_readings": list(readings),
+        "settle_times": list(settle_times),
+        "stage_times": stage_times,
+        "gui_compounds": formulation.labels(),
+        "parsed_compounds": formulation.by_name(),
+        "controller_additives": {  # from the actual 'additives' dictionary
+            k: dict(v) for k, v in additives_dict.items() if v["used"]
+        }
+    }
+    if rig is not None:
+        record["rig"] = rig
+    if recipe is not None:
+        record["recipe"] = recipe
+    return record
+
+
+def formulation_from_dict(compounds):
+    """{"Compound 1": 3.0, "ADDITIVE_X": 5.0, ...} -> Formulation."""
+    formulation = Formulation()
+    for name, pct in compounds.items():
+        formulation.add(name, float(pct))
+    return formulation
+
+
+# ------------------------------------------------------------------
+# HEADLESS RUNNER
+# ------------------------------------------------------------------
+class CancelledExperiment(Exception):
+    """Raised by ExperimentRunner.run() when the measurement was cancelled."""
+
+
+class ExperimentRunner:
+    """
+    Runs whole experiments without a display: validate, integrate,
+    dispense, measure, log.
+
+    measure:   callable returning one conductivity reading
+    interval:  seconds between measurement iterations (ignored with settling)
+    settling:  settling.SettlingDetector to end iterations once readings are stable
+    signal:    conductivity_dsp.SignalPipeline cleaning the readings (one per runner)
+    traces:    trace_store.TraceStore receiving every raw reading, per experiment
+    transport: SerialTransport for the Arduino, or None to simulate the pump
+    log:       ExperimentLog (or None) receiving samples and experiments
+    rig:       station name recorded with each experiment (multi-rig runs)
+    recipes:   recipe_cache.RecipeCache (may be shared between runners)
+
+    Volumes and pump plans come from the recipe cache, never from the shared
+    'additives' dictionary, so several runners can work in parallel threads.
+    """
+
+    def __init__(self, measure=simulated_measurement, interval=0.0, transport=None,
+                 log=None, pump=None, first_experiment_number=0, settling=None,
+                 rig=None, recipes=None, signal=None, traces=None):
+        self.measure = measure
+        self.interval = interval
+        self.settling = settling
+        self.signal = signal
+        self.traces = traces
+        self.transport = transport
+        self.log = log
+        self.pump = pump or SimulatedPump()
+        self.experiment_count = first_experiment_number
+        self.rig = rig
+        if recipes is None:
+            from recipe_cache import RecipeCache
+            recipes = RecipeCache()
+        self.recipes = recipes
+
+    def dispense(self, plan):
+        """
+        Sends a plan to the Arduino, or times it on the simulated pump.
+        Returns (seconds, per-stage breakdown or None).
+        """
+        if self.transport is not None:
+            started = time.perf_counter()
+            send_plan(plan, self.transport)
+            return time.perf_counter() - started, None
+        # only the simulated pump reports a breakdown
+        return self.pump.run(plan), self.pump.last_breakdown
+
+    def run(self, formulation, total_add_pct, iterations=1, mode="Manual", measure=None,
+            number=None):
+        """
+        Runs one experiment and returns its log record (plus timing fields).
+        `number` overrides the runner's own experiment numbering.
+        """
+        with tracer.span("plan"):
+            recipe, hit = self.recipes.get_or_build(formulation, total_add_pct)
+        tracer.count("recipe_cache_hits" if hit else "recipe_cache_misses")
+        # Validation (formulation_validation.validate_batch) happens before a job
+        # gets here; the total checks only apply to Manual formulations
+        warnings = recipe.warnings if mode == "Manual" else []
+
+        if number is None:
+            self.experiment_count += 1
+            number = self.experiment_count
+        started = time.perf_counter()
+
+        with tracer.span("dispense"):
+            dispense_time, stage_times = self.dispense(recipe.plan)
+
+        trace = self.traces.writer(number) if self.traces is not None else None
+        try:
+            with tracer.span("iterations"):
+                engine = ExperimentEngine(
+                    iterations, measure=measure or self.measure,
+                    interval=self.interval, settling=self.settling, signal=self.signal,
+                    trace=trace,
+                )
+                engine.start()
+                engine.join()
+        finally:
+            if trace is not None:
+                trace.close()
+        # A failed or cancelled measurement is never logged as an experiment
+        kind, index, payload = engine.outcome() or (EVENT_ERROR, 0, RuntimeError("Engine did not finish"))
+        if kind == EVENT_ERROR:
+            tracer.count("experiments_failed")
+            raise payload
+        if kind == EVENT_CANCELLED:
+            raise CancelledExperiment(f"Experiment {number} cancelled after {index} iteration(s)")
+        readings = engine.readings
+
+        with tracer.span("log"):
+            if self.log is not None:
+                for i, value in enumerate(readings):
+                    self.log.log_sample(number, i, value)
+            record = build_log_record(
+                number, mode, iterations, readings, formulation, engine.settle_times,
+                stage_times, recipe.additives, self.rig, recipe.key
+            )
+            if self.log is not None:
+                self.log.log_experiment(record)
+        self.recipes.add_result(recipe.key, number, readings)
+        tracer.count("experiments")
+
+        record["warnings"] = [title for title, _ in warnings]
+        record["dispense_time"] = dispense_time
+        record["recipe_cached"] = hit
+        if trace is not None:
+            record["trace_samples"] = trace.samples
+        record["elapsed"] = time.perf_counter() - started
+        return record
@@ -0,0 +1,242 @@
+import threading
+import queue
+import time
+import random
+
+from instrumentation import tracer
+
+# ------------------------------------------------------------------
+# EXPERIMENT ENGINE
+# Runs the measurement iterations on a worker thread so the Tk event
+# loop never blocks. The GUI drains `events` from root.after().
+# ------------------------------------------------------------------
+
+# Event kinds put on the queue by the worker
+EVENT_PROGRESS = "progress"    # (EVENT_PROGRESS, iteration_index, conductivity)
+EVENT_PAUSED = "paused"        # (EVENT_PAUSED, iteration_index, None)
+EVENT_RESUMED = "resumed"      # (EVENT_RESUMED, iteration_index, None)
+EVENT_DONE = "done"            # (EVENT_DONE, iterations_completed, readings)
+EVENT_CANCELLED = "cancelled"  # (EVENT_CANCELLED, iterations_completed, readings)
+EVENT_ERROR = "error"          # (EVENT_ERROR, iteration_index, exception)
+EVENT_SAMPLES = "samples"      # (EVENT_SAMPLES, iteration_index, (timestamps, values)) clean samples
+
+# How often the GUI should drain the queue (ms). One 60 Hz frame.
+POLL_INTERVAL_MS = 16
+
+
+def simulated_measurement():
+    """Stand-in for the conductivity meter (same as the old GUI loop)."""
+    return random.uniform(0, 100)
+
+
+class ExperimentEngine:
+    def __init__(self, iterations, measure=simulated_measurement, interval=0.5, settling=None,
+                 signal=None, trace=None):
+        """
+        iterations: number of measurement iterations to run
+        measure:    callable returning one conductivity reading
+        interval:   seconds to wait between iterations (fixed-delay mode)
+        settling:   settling.SettlingDetector; when given, each iteration
+                    streams readings until they are stable instead of
+                    sleeping `interval`, and reports the settled mean
+        signal:     conductivity_dsp.SignalPipeline; raw readings are taken
+                    `signal.decimate` times faster and only the clean,
+                    block-averaged samples reach the detector and the
+                    readings (and are published as EVENT_SAMPLES)
+        trace:      trace_store.TraceWriter receiving every raw reading
+                    (written from the worker thread; close it after the run)
+        """
+        self.iterations = iterations
+        self.measure = measure
+        self.interval = interval
+        self.settling = settling
+        self.signal = signal
+        self.trace = trace
+
+        self.events = queue.Queue()
+        self.readings = []
+        self.settle_times = []  # seconds each iteration took to settle
+
+        self._thread = None
+        self._cancel = threading.Event()
+        self._resume = threading.Event()
+        self._resume.set()  # not paused
+
+    # ---------- Control (safe to call from the Tk thread) ----------
+    def start(self):
+        """Starts the worker thread. Returns immediately."""
+        if self._thread is not None:
+            raise RuntimeError("Experiment engine already started")
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def pause(self):
+        self._resume.clear()
+
+    def resume(self):
+        self._resume.set()
+
+    def cancel(self):
+        self._cancel.set()
+        self._resume.set()  # wake a paused worker so it can exit
+
+    @property
+    def paused(self):
+        return not self._resume.is_set()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def join(self, timeout=None):
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    # ---------- Worker ----------
+    def _wait(self, seconds):
+        """Sleeps up to `seconds`, returning early if cancelled."""
+        return not self._cancel.wait(seconds)
+
+    def _check_pause(self, i):
+        if self._resume.is_set():
+            return
+        self.events.put((EVENT_PAUSED, i, None))
+        self._resume.wait()
+        if not self._cancel.is_set():
+            self.events.put((EVENT_RESUMED, i, None))
+
+    def _run(self):
+        i = 0
+        try:
+            for i in range(self.iterations):
+                self._check_pause(i)
+                if self._cancel.is_set():
+                    break
+                if self.settling is not None:
+                    value = self._measure_settled(i)
+                    if value is None:
+                        break  # cancelled while settling
+                elif self.signal is not None:
+                    value = self._measure_block(i)
+                else:
+                    with tracer.span("measure"):
+                        value = self.measure()
+                    tracer.count("samples")
+                    if self.trace is not None:
+                        self.trace.append(time.time(), value, i)
+                self.readings.append(value)
+                self.events.put((EVENT_PROGRESS, i, value))
+                if self.settling is None and i < self.iterations - 1:
+                    with tracer.span("settle"):
+                        settled = self._wait(self.interval)
+                    if not settled:
+                        break
+        except Exception as exc:
+            self.events.put((EVENT_ERROR, i, exc))
+            return
+
+        kind = EVENT_CANCELLED if self._cancel.is_set() else EVENT_DONE
+        self.events.put((kind, len(self.readings), list(self.readings)))
+
+    def _filter(self, i, timestamps, values):
+        """Runs a block of raw readings through the signal pipeline and publishes the clean ones."""
+        with tracer.span("filter"):
+            t, v = self.signal.process(timestamps, values)
+        if len(v):
+            self.events.put((EVENT_SAMPLES, i, (t.tolist(), v.tolist())))
+        return t, v
+
+    def _measure_block(self, i):
+        """Fixed-delay mode with a signal pipeline: one block of raw readings, averaged."""
+        self.signal.reset()
+        timestamps, values = [], []
+        with tracer.span("measure"):
+            for _ in range(self.signal.decimate):
+                values.append(self.measure())
+                timestamps.append(time.time())
+        tracer.count("samples", len(values))
+        if self.trace is not None:
+            self.trace.extend(timestamps, values, i)
+        _, v = self._filter(i, timestamps, values)
+        return float(v.mean())
+
+    def _measure_settled(self, i):
+        """
+        Streams readings into the settling detector until it reports a stable
+        window (or max_seconds passes). Returns the window mean, or None if
+        cancelled. With a signal pipeline the detector sees the clean samples,
+        one per `signal.decimate` raw readings.
+        """
+        detector = self.settling
+        detector.reset()
+        decimate = 1
+        if self.signal is not None:
+            self.signal.reset()  # a new mix: the previous level means nothing
+            decimate = self.signal.decimate
+        restart = getattr(self.measure, "restart", None)  # simulated probes re-mix here
+        if restart is not None:
+            restart()
+        started = time.perf_counter()
+        raw_t, raw_v = [], []
+        with tracer.span("settle"):
+            while True:
+                with tracer.span("measure"):
+                    value = self.measure()
+                tracer.count("samples")
+                now = time.perf_counter()
+                stamp = time.time()
+                if self.trace is not None:
+                    self.trace.append(stamp, value, i)
+                if self.signal is None:
+                    settled = detector.add(now, value)
+                else:
+                    raw_t.append(stamp)
+                    raw_v.append(value)
+                    settled = False
+                    if len(raw_v) == decimate:
+                        for t, v in zip(*self._filter(i, raw_t, raw_v)):
+                            settled = detector.add(t, v)
+                        raw_t, raw_v = [], []
+                if settled:
+                    break
+                if now - started >= detector.max_seconds:
+                    tracer.count("settle_timeouts")
+                    break
+                if not self._wait(detector.sample_period / decimate):
+                    return None
+        self.settle_times.append(time.perf_counter() - started)
+        return detector.mean()
+
+    def outcome(self):
+        """
+        After join(): drains every queued event and returns the terminal one,
+        (EVENT_DONE | EVENT_CANCELLED | EVENT_ERROR, index, payload), or None
+        if the worker hasn't finished. For callers that don't poll events.
+        """
+        while True:
+            try:
+                kind, index, payload = self.events.get_nowait()
+            except queue.Empty:
+                return None
+            if kind in (EVENT_DONE, EVENT_CANCELLED, EVENT_ERROR):
+                return kind, index, payload
+
+    # ---------- Draining (call from the Tk thread) ----------
+    def drain(self, handler, budget=0.008):
+        """
+        Pops queued events and passes each to handler(kind, index, payload).
+        Stops after `budget` seconds so a burst never stalls a frame.
+        Returns True once a terminal event (done/cancelled/error) was seen.
+        """
+        deadline = time.perf_counter() + budget
+        finished = False
+        while time.perf_counter() < deadline:
+            try:
+                kind, index, payload = self.events.get_nowait()
+            except queue.Empty:
+                break
+            handler(kind, index, payload)
+            if kind in (EVENT_DONE, EVENT_CANCELLED, EVENT_ERROR):
+                finished = True
+                break
+        return finished
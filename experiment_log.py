@@ -0,0 +1,180 @@
+import json
+import os
+import threading
+import time
+
+# ------------------------------------------------------------------
+# PERSISTENT EXPERIMENT LOG (append-only JSON lines)
+#
+# One record per line:
+#   {"type": "experiment", "experiment_number": 3, ...}
+#   {"type": "sample", "experiment_number": 3, "iteration": 0, "t": ..., "value": ...}
+#
+# append() only adds to an in-memory buffer, so callers on the hot path
+# (acquisition, Tk thread) never touch the disk. A writer thread flushes
+# the buffer and fsyncs in batches. A crash loses at most the last
+# `flush_interval` seconds, and a half-written final line is skipped on read.
+# ------------------------------------------------------------------
+
+RECORD_EXPERIMENT = "experiment"
+RECORD_SAMPLE = "sample"
+
+
+class ExperimentLog:
+    def __init__(self, path, flush_interval=1.0, max_buffered=1000):
+        """
+        path:           JSON-lines file (created if missing)
+        flush_interval: seconds between background flush + fsync
+        max_buffered:   flush early once this many records are waiting
+        """
+        self.path = path
+        self.flush_interval = flush_interval
+        self.max_buffered = max_buffered
+
+        self._buffer = []
+        self._lock = threading.Lock()        # guards the buffer
+        self._write_lock = threading.Lock()  # one flush at a time, so lines stay in order
+        self._wake = threading.Event()
+        self._closed = False
+        self._file = open(path, "a", encoding="utf-8")
+        self.records_written = 0
+
+        self._thread = threading.Thread(target=self._writer, daemon=True)
+        self._thread.start()
+
+    # ---------- Appending (cheap, any thread) ----------
+    def append(self, record):
+        with self._lock:
+            if self._closed:
+                raise ValueError("Experiment log is closed")
+            self._buffer.append(record)
+            if len(self._buffer) >= self.max_buffered:
+                self._wake.set()
+
+    def log_experiment(self, exp_data):
+        record = {"type": RECORD_EXPERIMENT, "logged_at": time.time()}
+        record.update(exp_data)
+        self.append(record)
+
+    def log_sample(self, experiment_number, iteration, value, timestamp=None):
+        self.append({
+            "type": RECORD_SAMPLE,
+            "experiment_number": experiment_number,
+            "iteration": iteration,
+            "t": time.time() if timestamp is None else timestamp,
+            "value": value,
+        })
+
+    # ---------- Writing (writer thread) ----------
+    def flush(self):
+        """Writes and fsyncs everything buffered so far (safe from any thread)."""
+        with self._write_lock:
+            with self._lock:
+                pending, self._buffer = self._buffer, []
+            if not pending:
+                return
+            self._file.write("".join(json.dumps(r, separators=(",", ":")) + "\n" for r in pending))
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self.records_written += len(pending)
+
+    def _writer(self):
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._wake.set()
+        self._thread.join(2.0)
+        self.flush()  # waits for a writer still flushing after the join timed out
+        with self._write_lock:
+            self._file.close()
+
+
+def read_records(path, record_type=None):
+    """Yields records from a log file, skipping a torn last line after a crash."""
+    if not os.path.exists(path):
+        return
+    # Records are written compactly, so other types can be skipped without parsing
+    marker = f'"type":"{record_type}"' if record_type else None
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if marker is not None and marker not in line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record_type is None or record.get("type") == record_type:
+                yield record
+
+
+def read_records_from(path, offset=0, record_type=None):
+    """
+    Yields (record, end offset) for each complete line after byte `offset`;
+    a line still being written is left for the next read. Pass the last end
+    offset back in to carry on from there.
+    """
+    if not os.path.exists(path):
+        return
+    marker = f'"type":"{record_type}"'.encode() if record_type else None
+    with open(path, "rb") as f:
+        f.seek(offset)
+        for line in f:
+            if not line.endswith(b"\n"):
+                return
+            offset += len(line)
+            if marker is not None and marker not in line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record_type is None or record.get("type") == record_type:
+                yield record, offset
+
+
+def last_experiment_number(path, tail_bytes=65536):
+    """
+    Highest experiment number in the log, found by reading the file
+    backwards `tail_bytes` at a time until a complete numbered record
+    turns up (so resuming numbering stays cheap on large logs, and a
+    record longer than one block is still found).
+    """
+    if not os.path.exists(path):
+        return 0
+    best = None
+    with open(path, "rb") as f:
+        pos = f.seek(0, os.SEEK_END)
+        carry = b""  # start of the earliest line read so far (may be partial)
+        while pos > 0 and best is None:
+            step = min(tail_bytes, pos)
+            pos -= step
+            f.seek(pos)
+            lines = (f.read(step) + carry).split(b"\n")
+            carry = lines.pop(0) if pos > 0 else b""
+            for line in lines:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # blank, or a torn final write
+                if isinstance(record, dict) and "experiment_number" in record:
+                    best = max(best or 0, int(record["experiment_number"]))
+    return best or 0
+
+
+def format_experiment_summary(e):
+    """Console summary for a single experiment record (printed once, when it's new)."""
+    lines = [
+        f"  Experiment #{e['experiment_number']} ({e['mode']}) -> Iterations: {e['iterations']}",
+        f"    GUI compounds: {e['gui_compounds']}",
+        f"    Parsed (GUI -> dict): {e['parsed_compounds']}",
+        "    Controller 'additives' used:",
+    ]
+    for add_name, add_vals in e["controller_additives"].items():
+        lines.append(f"      {add_name}: {add_vals}")
+    return "\n".join(lines)
@@ -0,0 +1,328 @@
+import json
+import os
+import time
+
+from dispense_scheduler import DispensePlan, OP_PURGE, DEFAULT_PURGE_SECONDS
+from experiment_controller import plan_for, PORT_ARGON_GAS
+from formulation import Formulation, Component
+from reagent_registry import reagents
+
+# ------------------------------------------------------------------
+# PERSISTENT EXPERIMENT QUEUE
+#
+# Formulations enqueued from the Manual or Automatic tab (or the CLI)
+# are kept in a small JSON file, rewritten atomically on every change
+# (once per batch with enqueue_all()), so an overnight queue survives a
+# crash or restart. A job that was running when the program stopped
+# goes back to "pending" on load; one marked "failed" (it failed every
+# attempt) stays failed until removed.
+#
+# The scheduler runs jobs back to back, grouped by the set of additive
+# ports they use. Every change of port set costs a changeover purge of
+# the shared line, so identical sets run together and the next group is
+# the one closest to the current set (fewest ports to change). Ties keep
+# the order jobs were enqueued in.
+#
+# An Automatic job stores only its compounds: the optimizer picks the
+# percentages from the GUI's candidate set when the job starts. Runners
+# without one (headless, rig pool) hold such jobs - they stay pending and
+# are reported as skipped - rather than dispense them at 0% (LP30 only).
+# ------------------------------------------------------------------
+
+EXPERIMENT_QUEUE_PATH = "experiment_queue.json"
+
+STATUS_PENDING = "pending"
+STATUS_RUNNING = "running"
+STATUS_FAILED = "failed"
+
+HELD_AUTOMATIC = "Automatic job: the optimizer's candidate set is only in the GUI (run it from the Automatic tab)"
+
+
+class QueuedExperiment:
+    __slots__ = ("job_id", "mode", "components", "total_add_pct", "iterations",
+                 "status", "enqueued_at")
+
+    def __init__(self, job_id, mode, components, total_add_pct, iterations,
+                 status=STATUS_PENDING, enqueued_at=None):
+        """
+        components: [(name, percentage, additive_key), ...]; for an
+                    Automatic job these are the compounds the optimizer
+                    chooses percentages for when the job starts
+        """
+        self.job_id = job_id
+        self.mode = mode
+        self.components = [tuple(c) for c in components]
+        self.total_add_pct = float(total_add_pct)
+        self.iterations = int(iterations)
+        self.status = status
+        self.enqueued_at = time.time() if enqueued_at is None else enqueued_at
+
+    def formulation(self):
+        return Formulation(Component(name, pct, key) for name, pct, key in self.components)
+
+    @property
+    def ports(self):
+        """Additive ports this job dispenses from (LP30 is always used)."""
+        return frozenset(
+            reagents[key].port for _, pct, key in self.components
+            if key in reagents and (pct > 0 or self.mode == "Automatic")
+        )
+
+    def label(self):
+        compounds = ", ".join(f"{name} {pct:.2f}%" for name, pct, _ in self.components)
+        return f"#{self.job_id} {self.mode} x{self.iterations}: {compounds or 'LP30 only'}"
+
+    def to_dict(self):
+        return {
+            "job_id": self.job_id,
+            "mode": self.mode,
+            "components": [list(c) for c in self.components],
+            "total_add_pct": self.total_add_pct,
+            "iterations": self.iterations,
+            "status": self.status,
+            "enqueued_at": self.enqueued_at,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**data)
+
+
+# ------------------------------------------------------------------
+# SCHEDULING
+# ------------------------------------------------------------------
+def changeover_cost(current_ports, ports):
+    """One purge for any change of port set, plus each port that changes."""
+    if current_ports is None or current_ports == ports:
+        return 0
+    return 1 + len(current_ports ^ ports)
+
+
+def schedule(jobs, current_ports=None):
+    """
+    Orders jobs to keep changeovers to a minimum: jobs sharing a port set
+    run together, and each next group is the cheapest one to switch to.
+    """
+    groups = {}
+    for job in jobs:
+        groups.setdefault(job.ports, []).append(job)
+
+    order = []
+    while groups:
+        ports = min(groups, key=lambda p: (changeover_cost(current_ports, p), groups[p][0].job_id))
+        order.extend(groups.pop(ports))
+        current_ports = ports
+    return order
+
+
+def count_changeovers(jobs, current_ports=None):
+    count = 0
+    for job in jobs:
+        if changeover_cost(current_ports, job.ports):
+            count += 1
+        current_ports = job.ports
+    return count
+
+
+def changeover_plan(previous_ports, ports, purge_seconds=DEFAULT_PURGE_SECONDS):
+    """Argon purge of the shared line before a different port set, else None."""
+    if not changeover_cost(previous_ports, ports):
+        return None
+    return DispensePlan([(OP_PURGE, PORT_ARGON_GAS, purge_seconds)])
+
+
+# ------------------------------------------------------------------
+# QUEUE
+# ------------------------------------------------------------------
+class ExperimentQueue:
+    def __init__(self, path=EXPERIMENT_QUEUE_PATH):
+        """path: JSON file to persist to, or None for an in-memory queue."""
+        self.path = path
+        self.jobs = []
+        self.next_id = 1
+        self._plans = {}  # job_id -> DispensePlan, for backlog()
+        self.load()
+
+    def load(self):
+        if self.path is None or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except ValueError:
+            return  # the atomic save never leaves a torn file; ignore a hand-edited one
+        self.next_id = data.get("next_id", 1)
+        self.jobs = [QueuedExperiment.from_dict(d) for d in data.get("jobs", [])]
+        for job in self.jobs:
+            if job.status == STATUS_RUNNING:
+                job.status = STATUS_PENDING  # interrupted runs are retried
+
+    def save(self):
+        if self.path is None:
+            return
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"next_id": self.next_id, "jobs": [j.to_dict() for j in self.jobs]}, f)
+        os.replace(tmp, self.path)
+
+    def __len__(self):
+        return len(self.jobs)
+
+    def pending(self):
+        return [job for job in self.jobs if job.status == STATUS_PENDING]
+
+    def failed(self):
+        return [job for job in self.jobs if job.status == STATUS_FAILED]
+
+    def enqueue(self, formulation, total_add_pct, iterations, mode="Manual"):
+        job = self._add(formulation, total_add_pct, iterations, mode)
+        self.save()
+        return job
+
+    def enqueue_all(self, items):
+        """Enqueues (formulation, total, iterations, mode) items with one save."""
+        jobs = [self._add(*item) for item in items]
+        self.save()
+        return jobs
+
+    def _add(self, formulation, total_add_pct, iterations, mode="Manual"):
+        job = QueuedExperiment(
+            self.next_id, mode,
+            [(c.name, c.percentage, c.additive_key) for c in formulation],
+            total_add_pct, iterations,
+        )
+        self.next_id += 1
+        self.jobs.append(job)
+        return job
+
+    def next_job(self, current_ports=None, skip=()):
+        """
+        The scheduler's pick among the pending jobs, marked running (or
+        None). Jobs whose ids are in `skip` stay pending but are passed over.
+        """
+        pending = [job for job in self.pending() if job.job_id not in skip]
+        if not pending:
+            return None
+        job = schedule(pending, current_ports)[0]
+        job.status = STATUS_RUNNING
+        self.save()
+        return job
+
+    def complete(self, job):
+        """Removes a finished job (its results are in the experiment log)."""
+        self.jobs.remove(job)
+        self._plans.pop(job.job_id, None)
+        self.save()
+
+    def requeue(self, job):
+        """Puts a cancelled or failed job back in the queue."""
+        job.status = STATUS_PENDING
+        self.save()
+
+    def fail(self, job):
+        """Gives up on a job: it stays in the queue, no longer pending."""
+        job.status = STATUS_FAILED
+        self.save()
+
+    def remove(self, job_id):
+        self.jobs = [job for job in self.jobs if job.job_id != job_id]
+        self._plans.pop(job_id, None)
+        self.save()
+
+    def clear(self):
+        self.jobs = []
+        self._plans = {}
+        self.save()
+
+    def validate(self, policy):
+        """
+        Validates every pending job in one pass (formulation_validation):
+        rejected jobs are dropped and normalized ones rewritten. Returns
+        the ValidationReport.
+        """
+        from formulation_validation import validate_batch
+        pending = self.pending()
+        report = validate_batch(
+            ((job.label(), job.formulation(), job.total_add_pct, job.mode) for job in pending), policy
+        )
+        rejected = set()
+        for job, result in zip(pending, report):
+            if not result.accepted:
+                rejected.add(job.job_id)
+            elif result.normalized:
+                job.components = [(c.name, c.percentage, c.additive_key) for c in result.formulation]
+                self._plans.pop(job.job_id, None)
+        self.jobs = [job for job in self.jobs if job.job_id not in rejected]
+        self.save()
+        return report
+
+    def plan(self, job, recipes=None):
+        """
+        The job's dispense plan, planned once per job (through a RecipeCache
+        if one is given, so the run itself finds it there too).
+        """
+        plan = self._plans.get(job.job_id)
+        if plan is None:
+            if recipes is not None:
+                plan = recipes.get_or_build(job.formulation(), job.total_add_pct)[0].plan
+            else:
+                plan = plan_for(job.formulation(), job.total_add_pct)
+            self._plans[job.job_id] = plan
+        return plan
+
+    def backlog(self, exclude=None, recipes=None):
+        """[(plan, iterations)] for every pending job, for ProgressModel.predict_remaining()."""
+        return [
+            (self.plan(job, recipes), job.iterations)
+            for job in self.pending() if job is not exclude
+        ]
+
+
+def next_manual_job(queue, current_ports, skip, out=None):
+    """
+    queue.next_job() for runners without an optimizer: Automatic jobs are
+    put back, added to `skip` (passed over from then on) and reported to
+    `out` as skipped. Returns the next Manual job, or None.
+    """
+    while True:
+        job = queue.next_job(current_ports, skip=skip)
+        if job is None or job.mode != "Automatic":
+            return job
+        queue.requeue(job)
+        skip.add(job.job_id)
+        if out is not None:
+            out({"job_id": job.job_id, "skipped": HELD_AUTOMATIC})
+
+
+def run_queue(queue, runner, out=None):
+    """
+    Runs every pending Manual job with an ExperimentRunner in scheduled
+    order (Automatic jobs are held, see next_manual_job()). Validate the
+    queue first (ExperimentQueue.validate()). Returns the list of records;
+    `out(result)` is called as each one finishes. A job that raises goes
+    back to the queue and is reported as an error; the rest still run.
+    """
+    records = []
+    current_ports = None
+    skip = set()  # held or failed in this run
+    while True:
+        job = next_manual_job(queue, current_ports, skip, out)
+        if job is None:
+            return records
+        try:
+            purge = changeover_plan(current_ports, job.ports)
+            if purge is not None:
+                runner.dispense(purge)
+            record = runner.run(job.formulation(), job.total_add_pct, job.iterations, mode=job.mode)
+        except Exception as exc:
+            queue.requeue(job)
+            skip.add(job.job_id)
+            if out is not None:
+                out({"job_id": job.job_id, "error": f"{type(exc).__name__}: {exc}"})
+            continue
+        current_ports = job.ports
+        queue.complete(job)
+        record["job_id"] = job.job_id
+        records.append(record)
+        if out is not None:
+            out(record)
@@ -0,0 +1,102 @@
+from reagent_registry import reagents
+
+# ------------------------------------------------------------------
+# FORMULATION MODEL
+#
+# Single source of truth for the compounds selected in the GUI. The
+# listbox text is rendered from it (never parsed back), the total is
+# kept up to date on every add, and lookups by additive key are O(1).
+# GUI compound names and their additive keys come from the reagent
+# registry (reagent_registry.py).
+# ------------------------------------------------------------------
+
+
+def additive_key_for(name):
+    """Maps a GUI compound name to its key in the controller 'additives' dict."""
+    key = reagents.key_for(name)
+    if key is None:
+        key = name.upper().replace(" ", "_")
+    return key
+
+
+class Component:
+    __slots__ = ("name", "additive_key", "percentage")
+
+    def __init__(self, name, percentage, additive_key=None):
+        self.name = name
+        self.additive_key = additive_key or additive_key_for(name)
+        self.percentage = float(percentage)
+
+    def label(self):
+        """Text shown in the compounds listbox."""
+        return f"{self.name}: {self.percentage:.2f}%"
+
+    def __repr__(self):
+        return f"Component({self.name!r}, {self.percentage!r}, {self.additive_key!r})"
+
+
+class Formulation:
+    """
+    Ordered set of components, one per additive key. Adding a compound
+    that is already present adds to its percentage.
+    """
+    __slots__ = ("components", "_by_key", "total_percentage")  # _by_key: key -> row index
+
+    def __init__(self, components=()):
+        self.components = []
+        self._by_key = {}
+        self.total_percentage = 0.0
+        for c in components:
+            self.add(c.name, c.percentage, c.additive_key)
+
+    def add(self, name, percentage, additive_key=None):
+        """
+        Adds a compound and returns (index, created): the component's row
+        index and whether it is a new row (False = existing row updated).
+        """
+        key = additive_key or additive_key_for(name)
+        index = self._by_key.get(key)
+        self.total_percentage += float(percentage)
+        if index is not None:
+            self.components[index].percentage += float(percentage)
+            return index, False
+        self._by_key[key] = len(self.components)
+        self.components.append(Component(name, percentage, key))
+        return len(self.components) - 1, True
+
+    def clear(self):
+        self.components.clear()
+        self._by_key.clear()
+        self.total_percentage = 0.0
+
+    def copy(self):
+        return Formulation(self.components)
+
+    def get(self, additive_key):
+        """Component for an additive key, or None."""
+        index = self._by_key.get(additive_key)
+        return self.components[index] if index is not None else None
+
+    def percentage_of(self, additive_key):
+        component = self.get(additive_key)
+        return component.percentage if component is not None else 0.0
+
+    def __contains__(self, additive_key):
+        return additive_key in self._by_key
+
+    def __len__(self):
+        return len(self.components)
+
+    def __iter__(self):
+        return iter(self.components)
+
+    def labels(self):
+        return [c.label() for c in self.components]
+
+    def by_additive_key(self):
+        """{additive_key: percentage}, e.g. {"TEP": 3.0}."""
+        return {c.additive_key: c.percentage for c in self.components}
+
+    def by_name(self):
+        """{gui name: percentage}, e.g. {"Compound 1": 3.0}."""
+        return {c.name: c.percentage for c in self.components}
@@ -0,0 +1,123 @@
+import numpy as np
+
+# ------------------------------------------------------------------
+# AUTOMATIC-MODE DESIGN ENGINE
+#
+# Candidate formulations are rows of a float array `pcts` with one
+# column per selected compound (additive percentages of the whole
+# electrolyte). Every row sums to the total additive concentration;
+# LP30 fills the remaining 100 - total percent.
+#
+# Everything here is batched NumPy: no Python loop runs per candidate.
+# ------------------------------------------------------------------
+
+
+def _compositions(n_parts, units):
+    """
+    All non-negative integer vectors of length n_parts summing to `units`,
+    shape (C(units + n_parts - 1, n_parts - 1), n_parts).
+
+    Built one column at a time: every partial row is repeated once per
+    value the next column can still take (0 .. remaining).
+    """
+    if n_parts < 1:
+        return np.zeros((1, 0), dtype=np.int64)
+    rows = np.zeros((1, 0), dtype=np.int64)
+    remaining = np.array([units], dtype=np.int64)
+    for _ in range(n_parts - 1):
+        counts = remaining + 1
+        rows = np.repeat(rows, counts, axis=0)
+        # ragged arange: 0..counts[i]-1 for each original row, concatenated
+        starts = np.repeat(np.cumsum(counts) - counts, counts)
+        values = np.arange(counts.sum(), dtype=np.int64) - starts
+        rows = np.column_stack([rows, values])
+        remaining = np.repeat(remaining, counts) - values
+    return np.column_stack([rows, remaining])
+
+
+def simplex_grid(n_compounds, total, step):
+    """
+    Full grid of mixtures: every combination of n_compounds percentages in
+    multiples of `step` that sums to `total`.
+    """
+    if step <= 0:
+        raise ValueError("step must be positive")
+    units = int(round(total / step))
+    if abs(units * step - total) > 1e-9:
+        raise ValueError(f"total ({total}) must be a multiple of step ({step})")
+    return _compositions(n_compounds, units) * float(step)
+
+
+def _unit_to_simplex(u, total):
+    """
+    Maps points in the (d-1)-dimensional unit cube to d-part mixtures
+    summing to `total` (sorted-uniform spacings; uniform on the simplex).
+    """
+    n = u.shape[0]
+    cuts = np.sort(u, axis=1)
+    edges = np.hstack([np.zeros((n, 1)), cuts, np.ones((n, 1))])
+    return np.diff(edges, axis=1) * total
+
+
+def latin_hypercube(n_samples, n_compounds, total, rng=None):
+    """Latin-hypercube design over the mixture simplex."""
+    rng = np.random.default_rng(rng)
+    dims = max(n_compounds - 1, 0)
+    # one stratum per sample in each dimension, strata shuffled per column
+    strata = rng.permuted(np.tile(np.arange(n_samples), (dims, 1)), axis=1).T
+    u = (strata + rng.random((n_samples, dims))) / n_samples
+    return _unit_to_simplex(u, total)
+
+
+def sobol_design(n_samples, n_compounds, total, seed=None):
+    """Scrambled Sobol design over the mixture simplex (needs SciPy)."""
+    from scipy.stats import qmc  # deferred: only this design needs SciPy
+    dims = max(n_compounds - 1, 0)
+    if dims == 0:
+        return np.full((n_samples, 1), float(total))
+    u = qmc.Sobol(d=dims, scramble=True, seed=seed).random(n_samples)
+    return _unit_to_simplex(u, total)
+
+
+def feasible_mask(pcts, min_pct=0.0, max_pct=None, total=None, tol=1e-6):
+    """
+    Boolean mask of rows that respect per-compound bounds and (optionally)
+    sum to `total`. min_pct/max_pct may be scalars or per-column arrays.
+    """
+    pcts = np.asarray(pcts, dtype=float)
+    mask = np.all(pcts >= np.asarray(min_pct) - tol, axis=1)
+    if max_pct is not None:
+        mask &= np.all(pcts <= np.asarray(max_pct) + tol, axis=1)
+    if total is not None:
+        mask &= np.abs(pcts.sum(axis=1) - total) <= tol
+    return mask
+
+
+def to_volumes(pcts, total_volume):
+    """
+    Per-candidate dispense volumes in ml, shape (n, n_compounds + 1).
+    Column 0 is LP30 (the balance), then one column per compound.
+    """
+    pcts = np.asarray(pcts, dtype=float)
+    lp30 = np.clip(100.0 - pcts.sum(axis=1, keepdims=True), 0.0, None)
+    return np.hstack([lp30, pcts]) * (total_volume / 100.0)
+
+
+def generate_candidates(n_compounds, total, total_volume, design="grid", step=0.5,
+                        n_samples=1000, min_pct=0.0, max_pct=None, seed=None):
+    """
+    One-call pipeline used by the Automatic tab:
+    design -> feasibility filter -> volumes.
+
+    Returns (pcts, volumes) with infeasible candidates removed.
+    """
+    if design == "grid":
+        pcts = simplex_grid(n_compounds, total, step)
+    elif design == "lhs":
+        pcts = latin_hypercube(n_samples, n_compounds, total, rng=seed)
+    elif design == "sobol":
+        pcts = sobol_design(n_samples, n_compounds, total, seed=seed)
+    else:
+        raise ValueError(f"Unknown design: {design}")
+    pcts = pcts[feasible_mask(pcts, min_pct, max_pct, total)]
+    return pcts, to_volumes(pcts, total_volume)
@@ -0,0 +1,190 @@
+from experiment_controller import RECOMMENDED_TOTAL
+from formulation import Formulation, Component
+from reagent_registry import reagents
+
+# ------------------------------------------------------------------
+# FORMULATION VALIDATION
+#
+# Checks a whole batch of formulations in one pass and collects every
+# violation into one report instead of asking about each one in a
+# dialog. What happens to a formulation with warnings is a policy:
+#
+#   strict     reject it
+#   warn       run it anyway; the warnings go in the report
+#   normalize  scale the compounds so they add up to the entered
+#              total, then run it (remaining warnings are reported)
+#
+# Errors (impossible percentages, compounds not on the manifold) are
+# rejected under every policy.
+# Only Manual formulations get the total checks; Automatic ones are
+# chosen by the optimizer.
+# ------------------------------------------------------------------
+
+POLICY_STRICT = "strict"
+POLICY_WARN = "warn"
+POLICY_NORMALIZE = "normalize"
+POLICIES = (POLICY_STRICT, POLICY_WARN, POLICY_NORMALIZE)
+DEFAULT_POLICY = POLICY_WARN
+
+SEVERITY_ERROR = "error"
+SEVERITY_WARNING = "warning"
+SEVERITY_FIXED = "fixed"  # corrected by the normalize policy
+
+SUM_TOLERANCE = 0.01  # percent
+
+
+class Violation:
+    __slots__ = ("rule", "severity", "title", "message")
+
+    def __init__(self, rule, severity, title, message):
+        self.rule = rule
+        self.severity = severity
+        self.title = title
+        self.message = message
+
+    def __repr__(self):
+        return f"Violation({self.rule!r}, {self.severity!r})"
+
+
+def check_totals(total_add_pct, total_compound_pct):
+    """The Manual-mode total checks, as warnings (exceeds total, total != 10, sum != 10)."""
+    violations = []
+    if total_compound_pct > total_add_pct + 1e-9:
+        violations.append(Violation(
+            "exceeds_total", SEVERITY_WARNING, "Compounds Exceed Entered Total",
+            f"The sum of your selected compounds is {total_compound_pct:.2f}%, "
+            f"which exceeds the total additive concentration you entered ({total_add_pct:.2f}%)."
+        ))
+    if abs(total_add_pct - RECOMMENDED_TOTAL) > 0.001:
+        violations.append(Violation(
+            "total_not_recommended", SEVERITY_WARNING, "Confirm Total Concentration",
+            f"You entered {total_add_pct:.2f}% as the total additive concentration. "
+            f"The recommended value is {RECOMMENDED_TOTAL:g}%."
+        ))
+    if abs(total_compound_pct - RECOMMENDED_TOTAL) > SUM_TOLERANCE:
+        violations.append(Violation(
+            "sum_not_recommended", SEVERITY_WARNING, "Confirm Compound Percentages",
+            f"The sum of individual compound percentages is {total_compound_pct:.2f}%. "
+            f"It is suggested to have a total of {RECOMMENDED_TOTAL:g}%."
+        ))
+    return violations
+
+
+def check_errors(formulation, total_add_pct):
+    violations = []
+    if not 0.0 <= total_add_pct <= 100.0:
+        violations.append(Violation(
+            "invalid_total", SEVERITY_ERROR, "Invalid Total Concentration",
+            f"The total additive concentration must be between 0% and 100% (got {total_add_pct:.2f}%)."
+        ))
+    for c in formulation:
+        if c.additive_key not in reagents:
+            violations.append(Violation(
+                "unknown_compound", SEVERITY_ERROR, "Unknown Compound",
+                f"{c.name} is not a reagent on the valve manifold (see reagents.json)."
+            ))
+        if c.percentage < 0:
+            violations.append(Violation(
+                "negative_percentage", SEVERITY_ERROR, "Invalid Percentage",
+                f"{c.name} has a negative percentage ({c.percentage:.2f}%)."
+            ))
+    return violations
+
+
+def normalized(formulation, total_add_pct):
+    """Copy of the formulation with its compounds scaled to add up to total_add_pct."""
+    scale = total_add_pct / formulation.total_percentage
+    return Formulation(Component(c.name, c.percentage * scale, c.additive_key) for c in formulation)
+
+
+class ValidationResult:
+    __slots__ = ("index", "label", "formulation", "total_add_pct", "mode", "violations", "accepted")
+
+    def __init__(self, index, label, formulation, total_add_pct, mode):
+        self.index = index
+        self.label = label
+        self.formulation = formulation  # normalized copy under the normalize policy
+        self.total_add_pct = total_add_pct
+        self.mode = mode
+        self.violations = []
+        self.accepted = True
+
+    @property
+    def normalized(self):
+        return any(v.severity == SEVERITY_FIXED for v in self.violations)
+
+
+class ValidationReport:
+    def __init__(self, policy, results):
+        self.policy = policy
+        self.results = results
+
+    def __iter__(self):
+        return iter(self.results)
+
+    def __len__(self):
+        return len(self.results)
+
+    def accepted(self):
+        return [r for r in self.results if r.accepted]
+
+    def rejected(self):
+        return [r for r in self.results if not r.accepted]
+
+    def count(self, severity):
+        return sum(1 for r in self.results for v in r.violations if v.severity == severity)
+
+    def summary(self):
+        parts = [f"{len(self.results)} checked", f"{len(self.accepted())} accepted"]
+        if self.rejected():
+            parts.append(f"{len(self.rejected())} rejected")
+        for severity, name in ((SEVERITY_ERROR, "error(s)"), (SEVERITY_WARNING, "warning(s)"),
+                               (SEVERITY_FIXED, "normalized")):
+            n = self.count(severity)
+            if n:
+                parts.append(f"{n} {name}")
+        return f"Validation ({self.policy}): " + ", ".join(parts)
+
+    def lines(self):
+        """One line per violation, for a terminal."""
+        for r in self.results:
+            status = "" if r.accepted else " [rejected]"
+            for v in r.violations:
+                yield f"{r.label}{status}: {v.severity}: {v.title}: {v.message}"
+
+
+def validate(formulation, total_add_pct, mode="Manual", policy=DEFAULT_POLICY, index=0, label=None):
+    """Validates one formulation (see validate_batch())."""
+    result = ValidationResult(index, label or f"#{index + 1}", formulation, total_add_pct, mode)
+    result.violations = check_errors(formulation, total_add_pct)
+    if result.violations:
+        result.accepted = False
+        return result
+    if mode != "Manual":
+        return result
+
+    if (policy == POLICY_NORMALIZE and formulation.total_percentage > 0
+            and abs(formulation.total_percentage - total_add_pct) > SUM_TOLERANCE):
+        result.formulation = normalized(formulation, total_add_pct)
+        result.violations.append(Violation(
+            "normalized", SEVERITY_FIXED, "Compounds Normalized",
+            f"Compound percentages scaled from {formulation.total_percentage:.2f}% "
+            f"to {total_add_pct:.2f}% in total."
+        ))
+    warnings = check_totals(total_add_pct, result.formulation.total_percentage)
+    result.violations.extend(warnings)
+    result.accepted = not (warnings and policy == POLICY_STRICT)
+    return result
+
+
+def validate_batch(items, policy=DEFAULT_POLICY):
+    """
+    items: iterable of (label, formulation, total_add_pct, mode)
+    Returns a ValidationReport with one result per item, in order.
+    """
+    if policy not in POLICIES:
+        raise ValueError(f"Unknown validation policy: {policy}")
+    return ValidationReport(policy, [
+        validate(formulation, total, mode, policy, index, label)
+        for index, (label, formulation, total, mode) in enumerate(items)
+    ])
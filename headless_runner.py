@@ -0,0 +1,287 @@
+import argparse
+import csv
+import json
+import sys
+
+from experiment_controller import (
+    ExperimentRunner, formulation_from_dict, make_settling_detector,
+    make_signal_pipeline,
+    EXPERIMENT_LOG_PATH, ARDUINO_PORT, BAUD_RATE,
+)
+from experiment_log import ExperimentLog, last_experiment_number
+from experiment_queue import ExperimentQueue, run_queue, EXPERIMENT_QUEUE_PATH, HELD_AUTOMATIC
+from formulation_validation import validate_batch, POLICIES, POLICY_STRICT, DEFAULT_POLICY
+from rig_pool import RigPool, RigRegistry, make_runner
+from recipe_cache import RecipeCache
+from trace_store import TraceStore
+from experiment_engine import simulated_measurement
+from instrumentation import tracer
+from settling import SimulatedProbe
+
+# ------------------------------------------------------------------
+# HEADLESS EXPERIMENT RUNNER (no display, no dialogs)
+#
+#   python headless_runner.py formulations.jsonl
+#   python headless_runner.py formulations.csv --strict --log runs.jsonl
+#   python headless_runner.py formulations.csv --policy normalize
+#   python headless_runner.py formulations.jsonl --trace trace.json --metrics metrics.prom
+#   python headless_runner.py formulations.csv --enqueue    (add to the persistent queue)
+#   python headless_runner.py --queue                       (run the queue, scheduled)
+#   python headless_runner.py formulations.jsonl --rigs 4   (4 simulated rigs in parallel)
+#   python headless_runner.py --queue --rig-config rigs.json
+#   python headless_runner.py formulations.jsonl --settle 30 --traces traces
+#   BATTERY_REAGENTS=manifold16.json python headless_runner.py formulations.csv
+#
+# Compound names and ports come from reagents.json (see reagent_registry.py).
+#
+# Formulation files:
+#   .jsonl / .json  one object per line:
+#       {"compounds": {"Compound 1": 5, "Compound 2": 5}, "total": 10, "iterations": 3}
+#   .csv            header row; "total", "iterations" and "mode" columns are
+#                   optional, every other column is a compound percentage:
+#       total,iterations,Compound 1,Compound 2
+#       10,3,5,5
+#
+# The whole file (or queue) is validated in one pass before anything
+# runs; the report goes to stderr and rejected jobs are emitted as
+# skipped. One JSON result per experiment is streamed to stdout as it
+# finishes. Automatic jobs need the GUI's optimizer: they are skipped
+# here (and stay in the persistent queue).
+# ------------------------------------------------------------------
+
+RESERVED_COLUMNS = ("total", "iterations", "mode")
+
+
+def read_jobs(path):
+    """Yields job dicts from a .jsonl/.json or .csv formulation file."""
+    if path.endswith(".csv"):
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                compounds = {
+                    k: float(v) for k, v in row.items()
+                    if k not in RESERVED_COLUMNS and v not in (None, "")
+                }
+                job = {"compounds": compounds}
+                for key in RESERVED_COLUMNS:
+                    if row.get(key):
+                        job[key] = row[key]
+                yield job
+    else:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run battery additive experiments without the GUI.")
+    parser.add_argument("formulations", nargs="?", help="formulation file (.jsonl, .json or .csv)")
+    parser.add_argument("--log", default=EXPERIMENT_LOG_PATH, help="append-only experiment log (JSON lines)")
+    parser.add_argument("--no-log", action="store_true", help="do not write the experiment log")
+    parser.add_argument("--iterations", type=int, default=1, help="default iterations per experiment")
+    parser.add_argument("--interval", type=float, default=0.0, help="seconds between iterations")
+    parser.add_argument("--settle", type=float, metavar="MAX_SECONDS",
+                        help="end each iteration once readings are stable (at most MAX_SECONDS)")
+    parser.add_argument("--raw", action="store_true",
+                        help="with --settle: feed raw readings to the detector (no filtering)")
+    parser.add_argument("--temperature", type=float, metavar="DEG_C",
+                        help="with --settle: compensate readings taken at this temperature to 25 C")
+    parser.add_argument("--policy", choices=POLICIES, default=DEFAULT_POLICY,
+                        help="formulations with warnings: skip them (strict), run them (warn) or "
+                             "scale the compounds to the entered total (normalize)")
+    parser.add_argument("--strict", action="store_true", help="same as --policy strict")
+    parser.add_argument("--arduino", nargs="?", const=ARDUINO_PORT, default=None,
+                        help="send dispense plans to the Arduino (default port: %(const)s)")
+    parser.add_argument("--enqueue", action="store_true",
+                        help="add the formulations to the persistent queue instead of running them")
+    parser.add_argument("--queue", action="store_true",
+                        help="run every pending job in the persistent queue, in scheduled order")
+    parser.add_argument("--queue-file", default=EXPERIMENT_QUEUE_PATH, help="persistent queue file")
+    parser.add_argument("--rigs", type=int, metavar="N",
+                        help="run on N simulated rigs in parallel (shared queue, merged log)")
+    parser.add_argument("--time-scale", type=float, default=1.0,
+                        help="simulated rigs dispense in real time scaled by this factor")
+    parser.add_argument("--rig-config", metavar="PATH",
+                        help="run on every rig listed in a rigs.json registry, in parallel")
+    parser.add_argument("--traces", metavar="DIR",
+                        help="record every raw reading in a binary trace store (trace_store.py)")
+    parser.add_argument("--trace", help="write a Chrome trace (JSON) of every pipeline stage")
+    parser.add_argument("--metrics", help="write Prometheus-style counters and latency histograms")
+    args = parser.parse_args(argv)
+    if not args.formulations and not args.queue:
+        parser.error("a formulation file or --queue is required")
+    if args.enqueue and not args.formulations:
+        parser.error("--enqueue needs a formulation file")
+    if args.strict:
+        args.policy = POLICY_STRICT
+    return args
+
+
+def job_settings(job, default_iterations):
+    """(formulation, total, iterations, mode) for one job from a formulation file."""
+    formulation = formulation_from_dict(job.get("compounds", {}))
+    total = float(job.get("total", formulation.total_percentage))
+    iterations = int(job.get("iterations", default_iterations))
+    return formulation, total, iterations, job.get("mode", "Manual")
+
+
+def validated_jobs(args):
+    """
+    Reads and validates the whole formulation file in one pass and prints
+    the report to stderr. Returns [(line number, settings or None if
+    rejected, result)], settings as from job_settings() after normalization.
+    """
+    jobs = [job_settings(job, args.iterations) for job in read_jobs(args.formulations)]
+    report = validate_batch(
+        ((f"line {n}", formulation, total, mode)
+         for n, (formulation, total, _, mode) in enumerate(jobs, start=1)), args.policy
+    )
+    print_report(report)
+    return [
+        (n, (r.formulation, r.total_add_pct, iterations, mode) if r.accepted else None, r)
+        for n, ((_, _, iterations, mode), r) in enumerate(zip(jobs, report), start=1)
+    ]
+
+
+def print_report(report):
+    for line in report.lines():
+        print(line, file=sys.stderr)
+    print(report.summary(), file=sys.stderr)
+
+
+def rejection(result):
+    return "; ".join(v.title for v in result.violations)
+
+
+def run_on_rigs(args, log, first_number, emit):
+    """
+    Runs the formulation file (and/or the persistent queue) on several rigs
+    at once: one shared queue, one merged log.
+    """
+    if args.rig_config:
+        registry = RigRegistry.load(args.rig_config)
+    else:
+        registry = RigRegistry.simulated(args.rigs)
+
+    if args.queue:
+        queue = ExperimentQueue(args.queue_file)
+        print_report(queue.validate(args.policy))
+    else:
+        queue = ExperimentQueue(path=None)  # file jobs only, nothing persisted
+    if args.formulations:
+        accepted = []
+        for line_no, settings, result in validated_jobs(args):
+            if settings is None:
+                emit({"job": line_no, "skipped": rejection(result)})
+            else:
+                accepted.append(settings)
+        queue.enqueue_all(accepted)
+
+    recipes = RecipeCache()  # replicates are planned once, whichever rig runs them
+    traces = TraceStore(args.traces) if args.traces else None
+    pool = RigPool(
+        registry,
+        runner_factory=lambda rig: make_runner(
+            rig, log=log, interval=args.interval, settle=args.settle,
+            time_scale=args.time_scale, recipes=recipes, raw=args.raw, temperature=args.temperature,
+            traces=traces,
+        ),
+        first_experiment_number=first_number,
+    )
+    pool.run(queue, out=emit)
+    from serial_transport import transport_pool
+    transport_pool.close_all()
+
+
+def main(argv=None, out=sys.stdout):
+    args = parse_args(argv)
+    if args.enqueue:
+        queue = ExperimentQueue(args.queue_file)
+        queue.enqueue_all(settings for _, settings, _ in validated_jobs(args) if settings is not None)
+        print(f"{len(queue.pending())} job(s) pending in {args.queue_file}", file=sys.stderr)
+        return 0
+
+    if args.trace or args.metrics:
+        tracer.enable()
+
+    log = None
+    first_number = 0
+    if not args.no_log:
+        first_number = last_experiment_number(args.log)
+        log = ExperimentLog(args.log)
+
+    ran = skipped = failed = retried = 0
+
+    def emit(result):
+        nonlocal ran, skipped, failed, retried
+        if "skipped" in result:
+            skipped += 1
+        elif "error" in result and result.get("failed", True) is False:
+            retried += 1  # a rig pool attempt; the job goes back to the queue
+        elif "error" in result:
+            failed += 1
+        else:
+            ran += 1
+        out.write(json.dumps(result) + "\n")
+        out.flush()
+
+    transport = None
+    try:
+        if args.rigs or args.rig_config:
+            run_on_rigs(args, log, first_number, emit)
+        else:
+            if args.arduino:
+                from serial_transport import transport_pool
+                transport = transport_pool.get(args.arduino, baudrate=BAUD_RATE)
+
+            settling = signal = None
+            measure = simulated_measurement
+            if args.settle:
+                settling = make_settling_detector(max_seconds=args.settle)
+                measure = SimulatedProbe()  # a stand-in that actually settles
+                if not args.raw:
+                    signal = make_signal_pipeline(temperature=args.temperature)
+
+            runner = ExperimentRunner(
+                measure=measure, interval=args.interval, transport=transport, log=log,
+                first_experiment_number=first_number, settling=settling,
+                signal=signal, traces=TraceStore(args.traces) if args.traces else None,
+            )
+            if args.formulations:
+                for line_no, settings, result in validated_jobs(args):
+                    if settings is None:
+                        emit({"job": line_no, "skipped": rejection(result)})
+                        continue
+                    formulation, total, iterations, mode = settings
+                    if mode == "Automatic":  # no optimizer here: don't run its 0% compounds
+                        emit({"job": line_no, "skipped": HELD_AUTOMATIC})
+                        continue
+                    try:
+                        record = runner.run(formulation, total, iterations, mode=mode)
+                    except Exception as exc:  # failed or cancelled: not logged, reported
+                        emit({"job": line_no, "error": f"{type(exc).__name__}: {exc}"})
+                    else:
+                        emit(dict(record, job=line_no))
+            if args.queue:
+                queue = ExperimentQueue(args.queue_file)
+                print_report(queue.validate(args.policy))
+                run_queue(queue, runner, out=emit)
+    finally:
+        if log is not None:
+            log.close()
+        if transport is not None:
+            transport.close()
+        if args.trace:
+            tracer.write_chrome_trace(args.trace)
+        if args.metrics:
+            tracer.write_prometheus(args.metrics)
+
+    print(f"{ran} experiment(s) run, {skipped} skipped"
+          + (f", {failed} failed" if failed else "")
+          + (f", {retried} attempt(s) retried" if retried else ""), file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,360 @@
+import math
+import time
+
+import numpy as np
+
+from formulation import additive_key_for
+
+# ------------------------------------------------------------------
+# INDEXED EXPERIMENT HISTORY
+#
+# Every experiment record becomes one row of NumPy columns: number,
+# date, mode, rig, iterations, result metrics (mean / std / min / max
+# conductivity) and one column per additive percentage. Each column
+# has a secondary index (row ids sorted by value), so a range such as
+# "TEP between 3 and 7" is two binary searches. A query starts from its
+# most selective indexed condition and checks the others on just those
+# rows, vectorized.
+#
+# Rows added live go to an unsorted tail that queries scan directly;
+# the index is re-sorted once the tail grows past a fraction of the
+# table, so appends stay O(1) amortized.
+#
+# Text queries (GUI History tab):
+#   TEP=3..7 mean>50 mode=Manual since=2026-10-01
+# ------------------------------------------------------------------
+
+METRIC_FIELDS = ("mean", "std", "min", "max")
+NUMERIC_FIELDS = ("experiment_number", "logged_at", "iterations") + METRIC_FIELDS
+CATEGORICAL_FIELDS = ("mode", "rig")
+
+# Query text aliases -> field
+FIELD_ALIASES = {
+    "#": "experiment_number", "number": "experiment_number", "n": "experiment_number",
+    "date": "logged_at", "logged": "logged_at",
+    "conductivity": "mean",
+}
+
+MIN_TAIL = 1024        # rows appended before the first re-sort
+TAIL_FRACTION = 1 / 16  # ...then once the tail reaches this fraction of the table
+
+
+class Range:
+    __slots__ = ("lo", "hi", "lo_open", "hi_open")
+
+    def __init__(self, lo=None, hi=None, lo_open=False, hi_open=False):
+        """lo/hi: bounds (None = unbounded); *_open: exclude the bound itself."""
+        self.lo = -math.inf if lo is None else float(lo)
+        self.hi = math.inf if hi is None else float(hi)
+        self.lo_open = lo_open
+        self.hi_open = hi_open
+
+    def mask(self, values):
+        lower = values > self.lo if self.lo_open else values >= self.lo
+        upper = values < self.hi if self.hi_open else values <= self.hi
+        return lower & upper
+
+    def __repr__(self):
+        return (f"Range({'(' if self.lo_open else '['}{self.lo:g}, "
+                f"{self.hi:g}{')' if self.hi_open else ']'})")
+
+
+def record_metrics(record):
+    """(mean, std, min, max) of a record's conductivity readings (NaN if none)."""
+    readings = record.get("conductivity_readings") or []
+    if not readings:
+        return (math.nan,) * 4
+    mean = sum(readings) / len(readings)
+    var = sum((r - mean) ** 2 for r in readings) / (len(readings) - 1) if len(readings) > 1 else 0.0
+    return mean, math.sqrt(var), min(readings), max(readings)
+
+
+def record_additives(record):
+    """{additive_key: percentage} of a logged experiment."""
+    by_key = {}
+    for name, pct in record.get("parsed_compounds", {}).items():
+        key = additive_key_for(name)
+        by_key[key] = by_key.get(key, 0.0) + pct
+    return by_key
+
+
+class _Column:
+    """Growable float64 column with a sorted index over its first `indexed` rows."""
+
+    def __init__(self, values=()):
+        self.data = np.asarray(values, dtype=np.float64)
+        self.size = len(self.data)
+        self.reindex()
+
+    def reindex(self):
+        values = self.data[:self.size]
+        self.order = np.argsort(values, kind="stable")  # NaN sorts last
+        self.sorted = values[self.order]
+        self.indexed = self.size
+
+    def append(self, value):
+        if self.size == len(self.data):
+            grown = np.full(max(16, 2 * self.size), np.nan)
+            grown[:self.size] = self.data[:self.size]
+            self.data = grown
+        self.data[self.size] = value
+        self.size += 1
+
+    @property
+    def values(self):
+        return self.data[:self.size]
+
+    def maybe_reindex(self):
+        if self.size - self.indexed > max(MIN_TAIL, self.size * TAIL_FRACTION):
+            self.reindex()
+
+    def estimate(self, r):
+        """Rows matching r in the indexed part (two binary searches)."""
+        lo, hi = self._bounds(r)
+        return hi - lo + (self.size - self.indexed)
+
+    def _bounds(self, r):
+        lo = np.searchsorted(self.sorted, r.lo, "right" if r.lo_open else "left")
+        hi = np.searchsorted(self.sorted, r.hi, "left" if r.hi_open else "right")
+        return int(lo), int(max(lo, hi))
+
+    def rows(self, r):
+        """Row ids matching r, ascending."""
+        lo, hi = self._bounds(r)
+        rows = self.order[lo:hi]
+        if self.indexed < self.size:
+            tail = np.arange(self.indexed, self.size)
+            rows = np.concatenate((rows, tail[r.mask(self.data[self.indexed:self.size])]))
+        return np.sort(rows)
+
+
+class HistoryIndex:
+    def __init__(self):
+        self.records = []
+        self._columns = {}    # field -> _Column
+        self._codes = {field: {} for field in CATEGORICAL_FIELDS}  # value -> code
+        self._additives = []  # additive keys, in column order
+
+    # ---------- Building ----------
+    @classmethod
+    def from_records(cls, records):
+        """Builds every column and index in one pass over the records."""
+        index = cls()
+        raw = {field: [] for field in NUMERIC_FIELDS + CATEGORICAL_FIELDS}
+        additive_rows = []
+        for record in records:
+            index.records.append(record)
+            for field, value in index._row(record).items():
+                raw[field].append(value)
+            additive_rows.append(record_additives(record))
+            for key in additive_rows[-1]:
+                if key not in index._columns and key not in index._additives:
+                    index._additives.append(key)
+        for field, values in raw.items():
+            index._columns[field] = _Column(values)
+        for key in index._additives:
+            index._columns[key] = _Column([row.get(key, 0.0) for row in additive_rows])
+        return index
+
+    @classmethod
+    def load(cls, log_path):
+        from experiment_log import read_records, RECORD_EXPERIMENT
+        return cls.from_records(read_records(log_path, RECORD_EXPERIMENT))
+
+    def _row(self, record):
+        mean, std, lo, hi = record_metrics(record)
+        return {
+            "experiment_number": record.get("experiment_number", math.nan),
+            "logged_at": record.get("logged_at", math.nan),
+            "iterations": record.get("iterations", math.nan),
+            "mean": mean, "std": std, "min": lo, "max": hi,
+            "mode": self._code("mode", record.get("mode")),
+            "rig": self._code("rig", record.get("rig")),
+        }
+
+    def _code(self, field, value):
+        if value is None:
+            return math.nan
+        codes = self._codes[field]
+        return codes.setdefault(value, float(len(codes)))
+
+    def add(self, record):
+        """Adds one experiment (e.g. as it is logged); indexes catch up lazily."""
+        n = len(self.records)
+        self.records.append(record)
+        for field, value in self._row(record).items():
+            self._columns[field].append(value)
+        additives = record_additives(record)
+        for key in additives:
+            if key not in self._columns:
+                self._additives.append(key)
+                self._columns[key] = _Column(np.zeros(n))
+        for key in self._additives:
+            self._columns[key].append(additives.get(key, 0.0))
+
+    def __len__(self):
+        return len(self.records)
+
+    @property
+    def additive_keys(self):
+        return list(self._additives)
+
+    # ---------- Queries ----------
+    def _condition(self, field, spec):
+        """(column, Range) for one condition; a categorical value maps to its code."""
+        if field in CATEGORICAL_FIELDS:
+            codes = self._codes[field]
+            code = codes.get(spec)
+            if code is None:  # typed by hand: "manual" for "Manual"
+                code = next((c for v, c in codes.items() if str(v).lower() == str(spec).lower()), -1.0)
+            return self._columns[field], Range(code, code)
+        if not isinstance(spec, Range):
+            lo, hi = spec if isinstance(spec, tuple) else (spec, spec)
+            spec = Range(lo, hi)
+        column = self._columns.get(field)
+        if column is None:
+            if field not in NUMERIC_FIELDS:  # an additive no experiment used: 0% everywhere
+                column = _Column(np.zeros(len(self.records)))
+            else:
+                raise KeyError(field)
+        return column, spec
+
+    def rows(self, **conditions):
+        """
+        Row ids (ascending) matching every condition, e.g.
+        rows(TEP=(3, 7), mean=Range(50, lo_open=True), mode="Manual").
+        A condition is a Range, an inclusive (lo, hi) tuple (None = open)
+        or a single value.
+        """
+        if not conditions:
+            return np.arange(len(self.records))
+        resolved = [self._condition(field, spec) for field, spec in conditions.items()]
+        for column, _ in resolved:
+            column.maybe_reindex()
+        resolved.sort(key=lambda cr: cr[0].estimate(cr[1]))
+        (column, first), rest = resolved[0], resolved[1:]
+        rows = column.rows(first)
+        for column, r in rest:
+            if not len(rows):
+                break
+            rows = rows[r.mask(column.values[rows])]
+        return rows
+
+    def query(self, order_by=None, descending=False, limit=None, **conditions):
+        """Matching records, by experiment order or sorted by a numeric field."""
+        rows = self.rows(**conditions)
+        if order_by is not None:
+            values = self._columns[order_by].values[rows]
+            order = np.argsort(-values if descending else values, kind="stable")
+            rows = rows[order]
+        if limit is not None:
+            rows = rows[:limit]
+        return [self.records[i] for i in rows]
+
+    def count(self, **conditions):
+        return len(self.rows(**conditions))
+
+    def best_per_combination(self, metric="mean", size=None, rows=None):
+        """
+        Best experiment (highest `metric`) for each set of additives used
+        together, e.g. size=2 for "best mixture of each additive pair".
+        Returns [(additive keys, record)], best first.
+        """
+        if rows is None:
+            rows = np.arange(len(self.records))
+        used = np.stack(
+            [self._columns[key].values[rows] > 0 for key in self._additives], axis=1
+        ) if self._additives else np.zeros((len(rows), 0), dtype=bool)
+        combo = used.astype(np.int64) @ (1 << np.arange(used.shape[1], dtype=np.int64))
+        score = self._columns[metric].values[rows]
+        keep = ~np.isnan(score)
+        if size is not None:
+            keep &= used.sum(axis=1) == size
+        rows, combo, score = rows[keep], combo[keep], score[keep]
+        order = np.lexsort((-score, combo))  # by combination, best first within each
+        firsts = order[np.r_[True, combo[order][1:] != combo[order][:-1]]] if len(order) else order
+        firsts = firsts[np.argsort(-score[firsts], kind="stable")]
+        return [
+            (tuple(k for bit, k in enumerate(self._additives) if combo[i] >> bit & 1), self.records[rows[i]])
+            for i in firsts
+        ]
+
+
+# ------------------------------------------------------------------
+# TEXT QUERIES
+# ------------------------------------------------------------------
+def _parse_date(text, end_of_day=False):
+    t = time.mktime(time.strptime(text, "%Y-%m-%d"))
+    return t + 86400 if end_of_day else t
+
+
+def parse_query(text):
+    """
+    "TEP=3..7 mean>50 mode=Manual since=2026-10-01" -> conditions for
+    HistoryIndex.rows(). Operators: = (value or lo..hi), >, >=, <, <=.
+    Raises ValueError on a term it can't read.
+    """
+    conditions = {}
+    for term in text.split():
+        for op in (">=", "<=", "=", ">", "<"):
+            name, sep, value = term.partition(op)
+            if sep and name:
+                break
+        else:
+            raise ValueError(f"Can't read '{term}' (expected e.g. TEP=3..7 or mean>50)")
+        lowered = name.lower()
+        if lowered in ("since", "until"):
+            day = _parse_date(value, end_of_day=lowered == "until")
+            conditions["logged_at"] = Range(day, None) if lowered == "since" else Range(None, day, hi_open=True)
+            continue
+        field = FIELD_ALIASES.get(lowered, lowered)
+        if field in CATEGORICAL_FIELDS:
+            conditions[field] = value
+            continue
+        if field not in NUMERIC_FIELDS:
+            field = name.upper()  # additive key
+        try:
+            if op == "=" and ".." in value:
+                lo, hi = value.split("..", 1)
+                spec = Range(float(lo) if lo else None, float(hi) if hi else None)
+            elif op == "=":
+                spec = Range(float(value), float(value))
+            elif op in (">", ">="):
+                spec = Range(float(value), None, lo_open=op == ">")
+            else:
+                spec = Range(None, float(value), hi_open=op == "<")
+        except ValueError:
+            raise ValueError(f"'{value}' is not a number in '{term}'") from None
+        conditions[field] = spec
+    return conditions
+
+
+# --- Query speed over 10^6 synthetic experiments: python history_index.py ---
+if __name__ == "__main__":
+    N = 1_000_000
+    rng = np.random.default_rng(0)
+    names = ["Compound 1", "Compound 2", "Compound 3"]
+    started = time.perf_counter()
+    pcts = rng.uniform(0, 10, (N, 3)) * (rng.random((N, 3)) < 0.6)
+    means = rng.uniform(0, 100, N)
+    records = [
+        {"experiment_number": i + 1, "mode": "Manual" if i % 3 else "Automatic",
+         "logged_at": 1.7e9 + i * 60, "iterations": 3,
+         "conductivity_readings": [float(means[i])] * 3,
+         "parsed_compounds": {n: float(p) for n, p in zip(names, pcts[i]) if p > 0}}
+        for i in range(N)
+    ]
+    print(f"{N} synthetic records in {time.perf_counter() - started:.1f} s")
+    started = time.perf_counter()
+    index = HistoryIndex.from_records(records)
+    print(f"index built in {time.perf_counter() - started:.1f} s")
+
+    for text in ("TEP=3..7 mean>90", "TEP=3..7 ADDITIVE_X=0..1 mean>95 mode=Manual",
+                 "n=500000..500100", "mean>99.99"):
+        conditions = parse_query(text)
+        started = time.perf_counter()
+        rows = index.rows(**conditions)
+        print(f"  {text!r}: {len(rows)} rows in {(time.perf_counter() - started) * 1000:.1f} ms")
+    started = time.perf_counter()
+    best = index.best_per_combination(size=2)
+    print(f"  best per additive pair: {len(best)} pairs in {(time.perf_counter() - started) * 1000:.1f} ms")
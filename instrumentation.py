@@ -0,0 +1,186 @@
+import json
+import os
+import threading
+import time
+
+# ------------------------------------------------------------------
+# HOT-PATH INSTRUMENTATION
+#
+#   from instrumentation import tracer
+#   with tracer.span("dispense"):
+#       ...
+#   tracer.count("samples")
+#
+# Spans feed a latency histogram per stage and (optionally) a Chrome
+# trace (chrome://tracing / Perfetto). Counters and histograms export
+# as Prometheus text. When the tracer is disabled span() hands back one
+# shared no-op object, so the cost is a single attribute check.
+#
+# Enable with BATTERY_TRACE=1 or tracer.enable().
+# ------------------------------------------------------------------
+
+# Histogram bucket upper bounds in seconds (Prometheus "le" labels)
+LATENCY_BUCKETS = (
+    0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0,
+)
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Histogram:
+    __slots__ = ("counts", "total", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)  # last slot is +Inf
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        i = 0
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                break
+        else:
+            i = len(LATENCY_BUCKETS)
+        self.counts[i] += 1
+        self.total += seconds
+        self.count += 1
+
+
+class _Span:
+    __slots__ = ("tracer", "name", "start")
+
+    def __init__(self, tracer, name):
+        self.tracer = tracer
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.tracer._finish(self.name, self.start, time.perf_counter())
+        return False
+
+
+class Tracer:
+    def __init__(self, enabled=False, max_events=100000):
+        """
+        enabled:    record spans/counters (False = near-zero overhead)
+        max_events: cap on stored Chrome-trace events (histograms keep counting)
+        """
+        self.enabled = enabled
+        self.max_events = max_events
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter()
+        self.reset()
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        with self._lock:
+            self.events = []
+            self.dropped_events = 0
+            self.counters = {}
+            self.histograms = {}
+
+    # ---------- Recording ----------
+    def span(self, name):
+        """Context manager timing one pipeline stage."""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name)
+
+    def traced(self, name):
+        """Decorator form of span()."""
+        def decorate(fn):
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return fn(*args, **kwargs)
+                with _Span(self, name):
+                    return fn(*args, **kwargs)
+            wrapper.__name__ = fn.__name__
+            wrapper.__doc__ = fn.__doc__
+            return wrapper
+        return decorate
+
+    def count(self, name, n=1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def _finish(self, name, start, end):
+        duration = end - start
+        with self._lock:
+            hist = self.histograms.get(name)
+            if hist is None:
+                hist = self.histograms[name] = Histogram()
+            hist.observe(duration)
+            if len(self.events) < self.max_events:
+                self.events.append((name, start, duration, threading.get_ident()))
+            else:
+                self.dropped_events += 1
+
+    # ---------- Export ----------
+    def chrome_trace(self):
+        """Trace in Chrome's JSON "traceEvents" format (times in microseconds)."""
+        pid = os.getpid()
+        with self._lock:
+            events = [
+                {
+                    "name": name, "ph": "X", "pid": pid, "tid": tid,
+                    "ts": (start - self._origin) * 1e6, "dur": duration * 1e6,
+                }
+                for name, start, duration, tid in self.events
+            ]
+            counters = dict(self.counters)
+        return {"traceEvents": events, "otherData": {"counters": counters}}
+
+    def write_chrome_trace(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.chrome_trace(), f)
+
+    def prometheus_text(self, prefix="battery"):
+        """Counters and stage histograms in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            for name, value in sorted(self.counters.items()):
+                metric = f"{prefix}_{name}_total"
+                lines.append(f"# TYPE {metric} counter")
+                lines.append(f"{metric} {value}")
+            metric = f"{prefix}_stage_seconds"
+            if self.histograms:
+                lines.append(f"# TYPE {metric} histogram")
+            for stage, hist in sorted(self.histograms.items()):
+                cumulative = 0
+                for bound, n in zip(LATENCY_BUCKETS, hist.counts):
+                    cumulative += n
+                    lines.append(f'{metric}_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+                lines.append(f'{metric}_bucket{{stage="{stage}",le="+Inf"}} {hist.count}')
+                lines.append(f'{metric}_sum{{stage="{stage}"}} {hist.total}')
+                lines.append(f'{metric}_count{{stage="{stage}"}} {hist.count}')
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path, prefix="battery"):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self.prometheus_text(prefix))
+
+
+# Process-wide tracer used by the controller pipeline
+tracer = Tracer(enabled=os.environ.get("BATTERY_TRACE") == "1")
@@ -0,0 +1,216 @@
+import json
+import math
+import os
+
+# ------------------------------------------------------------------
+# PROGRESS / ETA MODEL
+#
+# Per-stage timing statistics learned from past runs:
+#   dispense seconds per ml, per port
+#   valve switch and argon purge seconds
+#   fixed overhead per pump command (parse + ack), kept apart from the
+#   per-ml rate so small doses and many-command plans are not mispredicted
+#   settle seconds per iteration
+#
+# Each statistic is a running (Welford) mean/variance, so every new
+# observation is O(1). The history is scanned once (or a snapshot is
+# loaded) and from then on estimates are updated in place as each
+# iteration and experiment finishes.
+#
+# The snapshot records how far into the experiment log it has read, so
+# loading it folds in whatever was logged since (headless runs, other
+# rigs). Experiments the GUI learned live are listed in it too, so their
+# log records are not learned twice.
+# ------------------------------------------------------------------
+
+# Priors used until a stage has been observed (seconds)
+DEFAULT_SECONDS_PER_ML = 2.0
+DEFAULT_VALVE_SECONDS = 0.8
+DEFAULT_PURGE_SECONDS = 2.8
+DEFAULT_COMMAND_SECONDS = 0.05
+DEFAULT_SETTLE_SECONDS = 2.0  # the old hard-coded "2 s per iteration"
+
+
+class RunningStat:
+    __slots__ = ("n", "mean", "m2")
+
+    def __init__(self, n=0, mean=0.0, m2=0.0):
+        self.n = n
+        self.mean = mean
+        self.m2 = m2
+
+    def add(self, x, weight=1):
+        """Welford update; `weight` > 1 adds x as that many identical samples."""
+        for _ in range(int(weight)):
+            self.n += 1
+            delta = x - self.mean
+            self.mean += delta / self.n
+            self.m2 += delta * (x - self.mean)
+
+    def value(self, default):
+        return self.mean if self.n else default
+
+    @property
+    def std(self):
+        return math.sqrt(self.m2 / (self.n - 1)) if self.n > 1 else 0.0
+
+    def to_list(self):
+        return [self.n, self.mean, self.m2]
+
+
+class ProgressModel:
+    def __init__(self):
+        self.seconds_per_ml = {}  # port -> RunningStat
+        self.valve = RunningStat()
+        self.purge = RunningStat()
+        self.command = RunningStat()
+        self.settle = RunningStat()
+        self.log_offset = 0   # bytes of the experiment log learned from so far
+        self.learned = set()  # experiment numbers learned live, logged past log_offset
+
+    # ---------- Learning ----------
+    def observe_settle(self, seconds):
+        """One finished iteration (call live, as each iteration completes)."""
+        self.settle.add(seconds)
+
+    def observe_dispense(self, breakdown):
+        """Per-stage times of one dispense (SimulatedPump.last_breakdown format)."""
+        if not breakdown:
+            return
+        for port, (ml, seconds) in breakdown.get("dispense", {}).items():
+            if ml > 0:
+                stat = self.seconds_per_ml.setdefault(int(port), RunningStat())
+                stat.add(seconds / ml)
+        for stage, stat in (("valve", self.valve), ("purge", self.purge), ("command", self.command)):
+            count, seconds = breakdown.get(stage, (0, 0.0))
+            if count:
+                stat.add(seconds / count, weight=count)
+
+    def observe_record(self, record):
+        """Learns from one persisted experiment record."""
+        self.observe_dispense(record.get("stage_times"))
+        for seconds in record.get("settle_times", ()):
+            self.observe_settle(seconds)
+
+    def mark_learned(self, number):
+        """The experiment `number` was observed live; skip its log record."""
+        self.learned.add(number)
+
+    def catch_up(self, log_path):
+        """
+        Learns from the experiment records logged since the last catch_up()
+        (or the snapshot), except those already observed live.
+        """
+        from experiment_log import read_records_from, RECORD_EXPERIMENT
+        for record, self.log_offset in read_records_from(log_path, self.log_offset, RECORD_EXPERIMENT):
+            number = record.get("experiment_number")
+            if number in self.learned:
+                self.learned.discard(number)
+            else:
+                self.observe_record(record)
+
+    @classmethod
+    def from_history(cls, records):
+        model = cls()
+        for record in records:
+            model.observe_record(record)
+        return model
+
+    # ---------- Prediction ----------
+    def settle_seconds(self):
+        return self.settle.value(DEFAULT_SETTLE_SECONDS)
+
+    def dispense_seconds(self, plan):
+        """Predicted time for a dispense_scheduler.DispensePlan."""
+        from dispense_scheduler import OP_VALVE, OP_DISPENSE, OP_PURGE
+        fallback = self._mean_seconds_per_ml()
+        overhead = self.command.value(DEFAULT_COMMAND_SECONDS)
+        total = 0.0
+        for op, port, amount in plan:
+            total += overhead
+            if op == OP_DISPENSE:
+                stat = self.seconds_per_ml.get(port)
+                total += amount * (stat.value(fallback) if stat else fallback)
+            elif op == OP_VALVE:
+                total += self.valve.value(DEFAULT_VALVE_SECONDS)
+            elif op == OP_PURGE:
+                total += self.purge.value(DEFAULT_PURGE_SECONDS)
+        return total
+
+    def _mean_seconds_per_ml(self):
+        seen = [s.mean for s in self.seconds_per_ml.values() if s.n]
+        return sum(seen) / len(seen) if seen else DEFAULT_SECONDS_PER_ML
+
+    def predict_experiment(self, plan, iterations):
+        return self.dispense_seconds(plan) + iterations * self.settle_seconds()
+
+    def predict_remaining(self, iterations_left, queued=()):
+        """
+        Remaining seconds for the running experiment (`iterations_left`) plus
+        every queued (plan, iterations) pair.
+        """
+        total = iterations_left * self.settle_seconds()
+        for plan, iterations in queued:
+            total += self.predict_experiment(plan, iterations)
+        return total
+
+    # ---------- Snapshot ----------
+    def to_dict(self):
+        return {
+            "seconds_per_ml": {str(p): s.to_list() for p, s in self.seconds_per_ml.items()},
+            "valve": self.valve.to_list(),
+            "purge": self.purge.to_list(),
+            "command": self.command.to_list(),
+            "settle": self.settle.to_list(),
+            "log_offset": self.log_offset,
+            "learned": sorted(self.learned),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        model = cls()
+        model.seconds_per_ml = {int(p): RunningStat(*v) for p, v in data["seconds_per_ml"].items()}
+        model.valve = RunningStat(*data["valve"])
+        model.purge = RunningStat(*data["purge"])
+        model.command = RunningStat(*data["command"])  # missing in an old snapshot: rebuilt from the log
+        model.settle = RunningStat(*data["settle"])
+        model.log_offset = int(data["log_offset"])  # missing in an old snapshot: rebuilt
+        model.learned = set(data["learned"])
+        return model
+
+    def save(self, path):
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f)
+        os.replace(tmp, path)
+
+
+def load_progress_model(snapshot_path, log_path):
+    """
+    Loads the saved statistics and folds in the experiments logged since,
+    or learns them from the whole experiment log in one pass. Reads the
+    log: call it off the Tk thread.
+    """
+    model = None
+    if os.path.exists(snapshot_path):
+        try:
+            with open(snapshot_path, encoding="utf-8") as f:
+                model = ProgressModel.from_dict(json.load(f))
+        except (ValueError, KeyError, TypeError):
+            pass  # corrupt snapshot: rebuild from the log
+    log_size = os.path.getsize(log_path) if os.path.exists(log_path) else 0
+    if model is None or model.log_offset > log_size:
+        model = ProgressModel()  # no snapshot, or the log was replaced
+    model.catch_up(log_path)
+    return model
+
+
+def format_eta(seconds):
+    seconds = max(0, int(round(seconds)))
+    hours, rest = divmod(seconds, 3600)
+    minutes, secs = divmod(rest, 60)
+    if hours:
+        return f"{hours}h {minutes:02d}m"
+    if minutes:
+        return f"{minutes}m {secs:02d}s"
+    return f"{secs}s"
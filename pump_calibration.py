@@ -0,0 +1,379 @@
+import hashlib
+import json
+import math
+import os
+import random
+
+from dispense_scheduler import DEFAULT_FLOW_RATE
+from reagent_registry import reagents
+
+# ------------------------------------------------------------------
+# PUMP CALIBRATION (gravimetric)
+#
+# The pump does not deliver exactly what it is told: viscous reagents
+# (LP30) slip more the faster they are pushed, and every dispense loses
+# a little to priming the line, which matters most for small additive
+# volumes. A calibration run dispenses a grid of volumes at a grid of
+# flow rates onto a balance, and each port gets a fitted model
+#
+#   delivered = (g0 + g1 * rate + g2 * rate^2) * commanded - prime
+#
+# plus, per calibrated rate, the bias left over and the scatter
+# (absolute + relative to the volume). To dispense a target volume the
+# model inverts this to the volume to command, and picks the fastest
+# calibrated rate whose predicted scatter (2 sigma) stays within
+# tolerance. Rates are never extrapolated beyond the calibrated grid.
+#
+# pump_calibration.json (or $BATTERY_CALIBRATION) holds the fitted
+# models; without it plans are built exactly as before (no RATE
+# commands, nominal volumes).
+#
+#   python pump_calibration.py             (calibrate a simulated pump, compare)
+#   python pump_calibration.py --save PATH (... and write its calibration)
+# ------------------------------------------------------------------
+
+CALIBRATION_PATH = os.environ.get("BATTERY_CALIBRATION", "pump_calibration.json")
+
+DEFAULT_TOLERANCE = 0.02   # of the target volume
+MIN_TOLERANCE = 0.002      # ml; floor for small volumes (about the balance resolution)
+CONFIDENCE = 2.0           # sigmas of scatter that must fit inside the tolerance
+
+CALIBRATION_RATES = (0.25, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0)  # ml/s
+CALIBRATION_VOLUMES = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5)      # ml
+CALIBRATION_REPEATS = 5
+
+
+class CalibrationPoint:
+    __slots__ = ("port", "commanded", "rate", "measured", "seconds")
+
+    def __init__(self, port, commanded, rate, measured, seconds=None):
+        self.port = port
+        self.commanded = commanded  # ml sent with DISPENSE (the firmware's steps * ml/step)
+        self.rate = rate            # ml/s sent with RATE
+        self.measured = measured    # ml delivered (balance grams / density)
+        self.seconds = seconds
+
+    def __repr__(self):
+        return f"CalibrationPoint({self.port}, {self.commanded}, {self.rate}, {self.measured})"
+
+
+def run_calibration(dispense, weigh, port, volumes=CALIBRATION_VOLUMES, rates=CALIBRATION_RATES,
+                    repeats=CALIBRATION_REPEATS, density=None):
+    """
+    Dispenses every (volume, rate) pair `repeats` times and weighs each one.
+
+    dispense(port, ml, rate): runs one dispense, returns its seconds (or None)
+    weigh():                  grams added to the balance since the last call
+    density:                  g/ml; defaults to the reagent's (reagent_registry)
+    """
+    if density is None:
+        reagent = reagents.by_port(port)
+        density = reagent.density if reagent is not None and reagent.density else 1.0
+    points = []
+    for rate in rates:
+        for volume in volumes:
+            for _ in range(repeats):
+                weigh()  # tare
+                seconds = dispense(port, volume, rate)
+                points.append(CalibrationPoint(port, volume, rate, weigh() / density, seconds))
+    return points
+
+
+class DispenseSetting:
+    __slots__ = ("port", "target", "commanded", "rate", "error", "within_tolerance")
+
+    def __init__(self, port, target, commanded, rate, error, within_tolerance):
+        self.port = port
+        self.target = target
+        self.commanded = commanded
+        self.rate = rate
+        self.error = error  # predicted worst-case error, ml
+        self.within_tolerance = within_tolerance
+
+    @property
+    def seconds(self):
+        return self.commanded / self.rate
+
+    def __repr__(self):
+        return (f"DispenseSetting(port={self.port}, {self.target:.4f} ml -> {self.commanded:.4f} ml "
+                f"@ {self.rate:g} ml/s, +/-{self.error:.4f})")
+
+
+class PortModel:
+    __slots__ = ("port", "gain", "prime", "rates", "bias", "noise")
+
+    def __init__(self, port, gain, prime, rates, bias, noise):
+        """
+        gain:  (g0, g1, g2) of delivered/commanded as a quadratic in the rate
+        prime: ml lost per dispense
+        rates: calibrated rates, ascending
+        bias:  {rate: remaining relative bias}
+        noise: {rate: (absolute ml, relative) scatter}
+        """
+        self.port = port
+        self.gain = tuple(gain)
+        self.prime = prime
+        self.rates = sorted(rates)
+        self.bias = bias
+        self.noise = noise
+
+    def efficiency(self, rate):
+        g0, g1, g2 = self.gain
+        return g0 + g1 * rate + g2 * rate * rate
+
+    def delivered(self, commanded, rate):
+        return self.efficiency(rate) * commanded - self.prime
+
+    def command(self, target, rate):
+        """Volume to command so that `target` ml comes out at this rate."""
+        return (target / (1.0 + self.bias.get(rate, 0.0)) + self.prime) / self.efficiency(rate)
+
+    def error(self, target, rate):
+        absolute, relative = self.noise.get(rate, (0.0, 0.0))
+        return CONFIDENCE * math.sqrt(absolute * absolute + (relative * target) ** 2)
+
+    def choose(self, target, tolerance=DEFAULT_TOLERANCE, min_tolerance=MIN_TOLERANCE):
+        """Fastest calibrated rate that keeps `target` within tolerance (else the most accurate one)."""
+        allowed = max(tolerance * target, min_tolerance)
+        best = None
+        for rate in self.rates:
+            commanded = self.command(target, rate)
+            if commanded <= 0:
+                continue
+            setting = DispenseSetting(self.port, target, commanded, rate,
+                                      self.error(target, rate), False)
+            setting.within_tolerance = setting.error <= allowed
+            if best is None:
+                best = setting
+            elif setting.within_tolerance:
+                if not best.within_tolerance or setting.seconds < best.seconds:
+                    best = setting
+            elif not best.within_tolerance and setting.error < best.error:
+                best = setting
+        return best
+
+    def to_dict(self):
+        return {
+            "port": self.port, "gain": list(self.gain), "prime": self.prime, "rates": self.rates,
+            "bias": {str(r): b for r, b in self.bias.items()},
+            "noise": {str(r): list(n) for r, n in self.noise.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            data["port"], data["gain"], data["prime"], data["rates"],
+            {float(r): b for r, b in data["bias"].items()},
+            {float(r): tuple(n) for r, n in data["noise"].items()},
+        )
+
+
+def fit_port(points):
+    """Least-squares PortModel from one port's CalibrationPoints (needs 2+ rates)."""
+    import numpy as np
+
+    port = points[0].port
+    v = np.array([p.commanded for p in points], dtype=np.float64)
+    q = np.array([p.rate for p in points], dtype=np.float64)
+    m = np.array([p.measured for p in points], dtype=np.float64)
+    rates = sorted(set(q.tolist()))
+    if len(rates) < 2:
+        raise ValueError(f"Port {port}: calibration needs at least two flow rates")
+    # delivered = g0 v + g1 v q + g2 v q^2 - prime (a quadratic needs three rates)
+    columns = [v, v * q, v * q * q][:min(3, len(rates))] + [-np.ones_like(v)]
+    coef = np.linalg.lstsq(np.stack(columns, axis=1), m, rcond=None)[0]
+    gain = list(coef[:-1]) + [0.0] * (4 - len(coef))
+    model = PortModel(port, gain, float(coef[-1]), rates, {}, {})
+
+    for rate in rates:
+        at = q == rate
+        predicted = model.delivered(v[at], rate)
+        # What the gain curve misses at this rate, as a fraction of the volume
+        bias = float(np.mean((m[at] - predicted) / np.maximum(predicted, 1e-9)))
+        residual = m[at] - predicted * (1.0 + bias)
+        # Scatter: residual^2 ~ absolute^2 + (relative * volume)^2, reweighted
+        # so the large volumes don't drown out the small ones
+        design = np.stack((np.ones(at.sum()), predicted ** 2), axis=1)
+        weights = np.ones(at.sum())
+        for _ in range(3):
+            var = np.maximum(np.linalg.lstsq(design * weights[:, None], residual ** 2 * weights,
+                                             rcond=None)[0], 0.0)
+            weights = 1.0 / np.maximum(design @ var, 1e-12)
+        # Upper 95% bound on sigma from this many samples (few repeats underestimate it)
+        upper = 1.0 + 1.645 / math.sqrt(2.0 * max(at.sum() - 1, 1))
+        model.bias[rate] = bias
+        model.noise[rate] = (float(np.sqrt(var[0])) * upper, float(np.sqrt(var[1])) * upper)
+    return model
+
+
+class PumpCalibration:
+    def __init__(self, models=(), tolerance=DEFAULT_TOLERANCE, min_tolerance=MIN_TOLERANCE):
+        self.models = {model.port: model for model in models}
+        self.tolerance = tolerance
+        self.min_tolerance = min_tolerance
+        self._models_hash = None
+
+    @classmethod
+    def fit(cls, points, **options):
+        by_port = {}
+        for point in points:
+            by_port.setdefault(point.port, []).append(point)
+        return cls([fit_port(port_points) for port_points in by_port.values()], **options)
+
+    @property
+    def active(self):
+        """False if nothing is calibrated: plans then stay uncorrected, at the default rate."""
+        return bool(self.models) or any(r.flow_rate for r in reagents)
+
+    def choose(self, port, ml):
+        """DispenseSetting for `ml` at `port`, or None for an uncalibrated port."""
+        model = self.models.get(port)
+        return model.choose(ml, self.tolerance, self.min_tolerance) if model is not None else None
+
+    def settings(self, port, ml):
+        """(ml to command, ml/s) for dispense_scheduler.build_dispense_plan()."""
+        setting = self.choose(port, ml)
+        if setting is not None:
+            return setting.commanded, setting.rate
+        reagent = reagents.by_port(port)  # uncalibrated: the reagent's configured rate
+        return ml, (reagent.flow_rate if reagent is not None and reagent.flow_rate else DEFAULT_FLOW_RATE)
+
+    @property
+    def fingerprint(self):
+        """
+        Identifies what plans are built with: the fitted models (hashed once)
+        plus the reagents' configured flow rates.
+        """
+        if self._models_hash is None:
+            text = json.dumps(self.to_dict(), sort_keys=True, separators=(",", ":"))
+            self._models_hash = hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+        return self._models_hash, tuple((r.port, r.flow_rate) for r in reagents)
+
+    def to_dict(self):
+        return {
+            "tolerance": self.tolerance, "min_tolerance": self.min_tolerance,
+            "ports": [model.to_dict() for _, model in sorted(self.models.items())],
+        }
+
+    @classmethod
+    def load(cls, path=CALIBRATION_PATH):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(
+            [PortModel.from_dict(entry) for entry in data["ports"]],
+            data.get("tolerance", DEFAULT_TOLERANCE), data.get("min_tolerance", MIN_TOLERANCE),
+        )
+
+    @classmethod
+    def load_or_default(cls, path=CALIBRATION_PATH):
+        return cls.load(path) if os.path.exists(path) else cls()
+
+    def save(self, path=CALIBRATION_PATH):
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=2)
+        os.replace(tmp, path)
+
+
+# Shared calibration for this process (used by experiment_controller.plan_dispense;
+# to recalibrate, assign a new one - RecipeCache keys include its fingerprint)
+calibration = PumpCalibration.load_or_default()
+
+
+def calibration_fingerprint():
+    """Fingerprint of the calibration plan_dispense() currently uses."""
+    return calibration.fingerprint
+
+
+class PumpPhysics:
+    """
+    What a simulated pump really delivers: viscous slip growing with the
+    square of the rate, a fixed priming loss per dispense, and scatter that
+    grows with rate and viscosity. For SimulatedPump(physics=...).
+    """
+
+    def __init__(self, viscosity=None, slip=0.015, prime=0.004, noise=0.003, abs_noise=0.0004, seed=None):
+        """
+        viscosity: {port: mPa*s}; defaults to the reagent registry's (1.0 if unknown)
+        """
+        if viscosity is None:
+            viscosity = {r.port: r.viscosity for r in reagents if r.viscosity}
+        self.viscosity = viscosity
+        self.slip = slip
+        self.prime = prime
+        self.noise = noise
+        self.abs_noise = abs_noise
+        self._random = random.Random(seed)
+
+    def deliver(self, port, ml, rate):
+        mu = self.viscosity.get(port, 1.0)
+        efficiency = 1.0 - self.slip * mu * rate * rate
+        scatter = self.noise * (1.0 + 0.5 * mu * rate * rate)
+        delivered = (efficiency * (1.0 + self._random.gauss(0.0, scatter)) * ml - self.prime
+                     + self._random.gauss(0.0, self.abs_noise))
+        return max(delivered, 0.0)
+
+
+def simulated_calibration(physics, ports, **options):
+    """Calibrates `ports` of a simulated pump (dispense + an ideal balance)."""
+    pending = [0.0]
+
+    def dispense(port, ml, rate):
+        pending[0] += physics.deliver(port, ml, rate)
+        return ml / rate
+
+    def weigh():
+        grams, pending[0] = pending[0], 0.0
+        return grams  # density 1: grams == ml
+
+    points = []
+    for port in ports:
+        points.extend(run_calibration(dispense, weigh, port, density=1.0))
+    return PumpCalibration.fit(points, **options)
+
+
+# --- Calibrated vs nominal dispensing on a simulated pump: python pump_calibration.py ---
+if __name__ == "__main__":
+    import sys
+
+    from experiment_controller import formulation_from_dict, integrate_additives, fresh_additives
+    from dispense_scheduler import build_dispense_plan, SimulatedPump, used_volumes
+
+    physics = PumpPhysics(seed=1)
+    ports = [r.port for r in reagents if r is not reagents.purge]
+    fitted = simulated_calibration(physics, ports)
+    print(f"Calibrated ports {ports} at rates {list(CALIBRATION_RATES)} ml/s")
+    for port in ports:
+        model = fitted.models[port]
+        print(f"  port {port} ({reagents.by_port(port).key}): gain {model.efficiency(0):.3f} at rest, "
+              f"{model.efficiency(1.0):.3f} at 1 ml/s, prime {model.prime * 1000:.1f} ul")
+
+    formulation = formulation_from_dict({"Compound 1": 5.0, "Compound 2": 3.0, "Compound 3": 2.0})
+    additives_dict = integrate_additives(formulation, 10.0, target=fresh_additives())
+    targets = used_volumes(additives_dict)
+    purge, bulk = reagents.purge.port, reagents.solvent.port
+
+    for label, settings in (("nominal", None), ("calibrated", fitted.settings)):
+        plan = build_dispense_plan(additives_dict, purge, bulk_port=bulk, dispense_settings=settings)
+        errors = {port: [] for port in targets}
+        times = []
+        for _ in range(200):
+            pump = SimulatedPump(physics=physics)
+            times.append(pump.run(plan))
+            for port, target in targets.items():
+                errors[port].append((pump.delivered[port] - target) / target)
+        print(f"{label:>10}: {sum(times) / len(times):.1f} s per formulation")
+        for port, target in sorted(targets.items()):
+            e = sorted(abs(x) for x in errors[port])
+            spec = max(fitted.tolerance, fitted.min_tolerance / target)
+            within = e[int(0.95 * len(e))]
+            print(f"{'':>12}port {port}: {target:.3f} ml, mean error {sum(errors[port]) / len(e) * 100:+.2f}%, "
+                  f"95% within {within * 100:.2f}% (spec {spec * 100:.1f}%{'' if within <= spec else ', OUT'})")
+        for port, target in sorted(targets.items()):
+            if settings is not None:
+                print(f"{'':>12}{fitted.choose(port, target)}")
+
+    if "--save" in sys.argv:
+        path = sys.argv[sys.argv.index("--save") + 1]
+        fitted.save(path)
+        print(f"Wrote {path}")
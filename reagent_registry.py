@@ -0,0 +1,209 @@
+import json
+import os
+
+# ------------------------------------------------------------------
+# REAGENT / PORT REGISTRY
+#
+# Every reagent on the valve manifold, with its GUI name, controller
+# key, port and physical properties. Name, key and port lookups are
+# plain dict lookups, so a 16-port manifold costs the same per lookup
+# as the 5-port one; adding a port is an edit to the config file.
+#
+# reagents.json (or $BATTERY_REAGENTS):
+#   {"reagents": [
+#       {"key": "LP30", "name": "LP30", "port": 1, "role": "solvent",
+#        "density": 1.29, "viscosity": 3.0},
+#       {"key": "TEP", "name": "Compound 1", "port": 2, "role": "additive",
+#        "density": 1.07, "viscosity": 1.6, "flow_rate": 0.48},
+#       {"key": "ARGON", "name": "Argon", "port": 3, "role": "purge"},
+#       ...]}
+#
+# role: "additive" (selectable in the GUI), "solvent" (the bulk that
+# fills the balance; exactly one) or "purge" (the line gas; exactly one).
+# Without a config file the built-in rig layout below is used.
+# ------------------------------------------------------------------
+
+REAGENT_CONFIG_PATH = os.environ.get("BATTERY_REAGENTS", "reagents.json")
+
+ROLE_ADDITIVE = "additive"
+ROLE_SOLVENT = "solvent"
+ROLE_PURGE = "purge"
+ROLES = (ROLE_ADDITIVE, ROLE_SOLVENT, ROLE_PURGE)
+
+# The rig as wired today (used when there is no config file)
+DEFAULT_REAGENTS = [
+    {"key": "LP30", "name": "LP30", "port": 1, "role": ROLE_SOLVENT, "density": 1.29, "viscosity": 3.0},
+    {"key": "TEP", "name": "Compound 1", "port": 2, "role": ROLE_ADDITIVE, "density": 1.07, "viscosity": 1.6},
+    {"key": "ARGON", "name": "Argon", "port": 3, "role": ROLE_PURGE},
+    {"key": "ADDITIVE_X", "name": "Compound 2", "port": 4, "role": ROLE_ADDITIVE},
+    {"key": "ADDITIVE_Y", "name": "Compound 3", "port": 5, "role": ROLE_ADDITIVE},
+]
+
+
+class Reagent:
+    __slots__ = ("key", "name", "port", "role", "density", "viscosity", "flow_rate")
+
+    def __init__(self, key, name=None, port=None, role=ROLE_ADDITIVE,
+                 density=None, viscosity=None, flow_rate=None):
+        """
+        key:       controller key (e.g. "TEP"), as used in the 'additives' dict
+        name:      name shown in the GUI (defaults to the key)
+        density:   g/ml; viscosity: mPa*s (None = not measured)
+        flow_rate: pump calibration at this port, ml/s (None = pump default)
+        """
+        if role not in ROLES:
+            raise ValueError(f"Reagent {key}: unknown role {role!r} (expected one of {', '.join(ROLES)})")
+        if port is None:
+            raise ValueError(f"Reagent {key}: no port")
+        self.key = key
+        self.name = name or key
+        self.port = int(port)
+        self.role = role
+        self.density = density
+        self.viscosity = viscosity
+        self.flow_rate = flow_rate
+
+    def to_dict(self):
+        entry = {"key": self.key, "name": self.name, "port": self.port, "role": self.role}
+        for field in ("density", "viscosity", "flow_rate"):
+            value = getattr(self, field)
+            if value is not None:
+                entry[field] = value
+        return entry
+
+    def __repr__(self):
+        return f"Reagent({self.key!r}, {self.name!r}, port={self.port}, role={self.role!r})"
+
+
+class ReagentRegistry:
+    def __init__(self, reagents=()):
+        self._by_key = {}
+        self._by_name = {}
+        self._by_port = {}
+        self.solvent = None
+        self.purge = None
+        for reagent in reagents:
+            self.add(reagent)
+
+    def add(self, reagent):
+        if reagent.key in self._by_key:
+            raise ValueError(f"Duplicate reagent key: {reagent.key}")
+        if reagent.name in self._by_name:
+            raise ValueError(f"Duplicate reagent name: {reagent.name}")
+        if reagent.port in self._by_port:
+            raise ValueError(f"Port {reagent.port} is already used by {self._by_port[reagent.port].key}")
+        if reagent.role == ROLE_SOLVENT:
+            if self.solvent is not None:
+                raise ValueError(f"Two solvents: {self.solvent.key} and {reagent.key}")
+            self.solvent = reagent
+        elif reagent.role == ROLE_PURGE:
+            if self.purge is not None:
+                raise ValueError(f"Two purge gases: {self.purge.key} and {reagent.key}")
+            self.purge = reagent
+        self._by_key[reagent.key] = reagent
+        self._by_name[reagent.name] = reagent
+        self._by_port[reagent.port] = reagent
+
+    # ---------- Lookups (O(1)) ----------
+    def __getitem__(self, key):
+        return self._by_key[key]
+
+    def __contains__(self, key):
+        return key in self._by_key
+
+    def get(self, key, default=None):
+        return self._by_key.get(key, default)
+
+    def by_name(self, name):
+        return self._by_name.get(name)
+
+    def by_port(self, port):
+        return self._by_port.get(port)
+
+    def key_for(self, name):
+        """Controller key for a GUI name (a key is accepted as-is); None if unknown."""
+        reagent = self._by_name.get(name) or self._by_key.get(name)
+        return reagent.key if reagent is not None else None
+
+    def port_of(self, key):
+        return self._by_key[key].port
+
+    def __iter__(self):
+        return iter(self._by_key.values())
+
+    def __len__(self):
+        return len(self._by_key)
+
+    @property
+    def additives(self):
+        return [r for r in self if r.role == ROLE_ADDITIVE]
+
+    def compound_names(self):
+        """GUI names of the selectable additives, for the compound comboboxes."""
+        return [r.name for r in self.additives]
+
+    def additives_dict(self):
+        """A fresh controller 'additives' dictionary: every additive plus the solvent."""
+        entries = {
+            r.key: {"port": r.port, "used": False, "percentage": 0, "volume": 0.0}
+            for r in self.additives
+        }
+        if self.solvent is not None:  # always used by default
+            entries[self.solvent.key] = {"port": self.solvent.port, "used": True, "percentage": 100, "volume": 0.0}
+        return entries
+
+    # ---------- Config ----------
+    def check(self):
+        if self.solvent is None or self.purge is None:
+            raise ValueError("The reagent registry needs one solvent and one purge reagent")
+        return self
+
+    @classmethod
+    def from_dicts(cls, entries):
+        return cls(Reagent(**entry) for entry in entries).check()
+
+    @classmethod
+    def default(cls):
+        return cls.from_dicts(DEFAULT_REAGENTS)
+
+    @classmethod
+    def load(cls, path=REAGENT_CONFIG_PATH):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        return cls.from_dicts(data["reagents"])
+
+    @classmethod
+    def load_or_default(cls, path=REAGENT_CONFIG_PATH):
+        return cls.load(path) if os.path.exists(path) else cls.default()
+
+    def save(self, path=REAGENT_CONFIG_PATH):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"reagents": [r.to_dict() for r in sorted(self, key=lambda r: r.port)]}, f, indent=2)
+
+
+# Shared registry for this process (formulation, controller, GUI)
+reagents = ReagentRegistry.load_or_default()
+
+
+# --- Lookup cost vs manifold size: python reagent_registry.py [--write PATH] ---
+if __name__ == "__main__":
+    import sys
+    import timeit
+
+    if "--write" in sys.argv:
+        path = sys.argv[sys.argv.index("--write") + 1]
+        reagents.save(path)
+        print(f"Wrote {len(reagents)} reagents to {path}")
+        sys.exit()
+
+    for ports in (5, 16, 64):
+        registry = ReagentRegistry.from_dicts(
+            DEFAULT_REAGENTS[:3] + [
+                {"key": f"ADDITIVE_{i}", "name": f"Compound {i}", "port": i + 1}
+                for i in range(3, ports)
+            ]
+        )
+        name = f"Compound {ports - 1}"
+        n = 200_000
+        per_lookup = timeit.timeit(lambda: registry.port_of(registry.key_for(name)), number=n) / n
+        print(f"{ports:2d} ports: name -> key -> port in {per_lookup * 1e9:.0f} ns")
@@ -0,0 +1,159 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+from experiment_controller import (
+    integrate_additives, plan_dispense, fresh_additives, formulation_warnings, TOTAL_VOLUME,
+)
+from formulation import additive_key_for
+from reagent_registry import reagents
+
+# ------------------------------------------------------------------
+# RECIPE CACHE
+#
+# Replicates run the same formulation again and again. A recipe is
+# everything derived from (formulation, total additive %, TOTAL_VOLUME):
+# the validation warnings, the final 'additives' volumes and the
+# compiled pump batch. Recipes are kept in an LRU cache keyed by a
+# canonical hash, so a replicate skips integration and planning. The
+# cache key also carries the pump calibration's fingerprint: a plan made
+# before a recalibration is not served after it.
+#
+# Past results (mean conductivity per experiment) are kept per recipe
+# key for the whole session, independent of eviction, and can be
+# seeded from the experiment log.
+# ------------------------------------------------------------------
+
+DEFAULT_CAPACITY = 256
+PCT_DECIMALS = 6  # percentages are rounded so float noise doesn't split recipes
+
+
+def canonical_recipe(by_additive_key, total_add_pct, total_volume=TOTAL_VOLUME):
+    """Order-independent description of a recipe (zero-percentage entries dropped)."""
+    return {
+        "additives": sorted(
+            (key, round(float(pct), PCT_DECIMALS))
+            for key, pct in by_additive_key.items() if round(float(pct), PCT_DECIMALS)
+        ),
+        "total": round(float(total_add_pct), PCT_DECIMALS),
+        "volume": round(float(total_volume), PCT_DECIMALS),
+    }
+
+
+def recipe_key(formulation, total_add_pct, total_volume=TOTAL_VOLUME):
+    return _hash(canonical_recipe(formulation.by_additive_key(), total_add_pct, total_volume))
+
+
+def recipe_key_for_record(record):
+    """Recipe key of a logged experiment (older records carry no "recipe" field)."""
+    if record.get("recipe"):
+        return record["recipe"]
+    by_key = {}
+    for name, pct in record.get("parsed_compounds", {}).items():
+        key = additive_key_for(name)
+        by_key[key] = by_key.get(key, 0.0) + pct
+    lp30 = record.get("controller_additives", {}).get(reagents.solvent.key, {}).get("percentage", 100)
+    return _hash(canonical_recipe(by_key, 100 - lp30))
+
+
+def _hash(canonical):
+    text = json.dumps(canonical, separators=(",", ":"))
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+
+
+class Recipe:
+    __slots__ = ("key", "warnings", "additives", "plan", "frame")
+
+    def __init__(self, key, warnings, additives, plan):
+        self.key = key
+        self.warnings = warnings    # [(title, message)] from formulation_warnings()
+        self.additives = additives  # final 'additives' dict (volumes filled in)
+        self.plan = plan            # DispensePlan
+        self.frame = plan.frame()   # compiled batch, ready to send
+
+    def used_additives(self):
+        return {k: v for k, v in self.additives.items() if v["used"]}
+
+
+class RecipeCache:
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self._recipes = OrderedDict()  # (key, calibration) -> Recipe, least recently used first
+        self._results = {}             # key -> [(experiment number, mean conductivity)]
+        self._lock = threading.Lock()  # shared by the worker threads of a RigPool
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._recipes)
+
+    def get_or_build(self, formulation, total_add_pct, total_volume=TOTAL_VOLUME):
+        """Returns (recipe, hit); a miss integrates and plans once and caches the result."""
+        from pump_calibration import calibration_fingerprint
+        key = recipe_key(formulation, total_add_pct, total_volume)
+        cache_key = (key, calibration_fingerprint())
+        with self._lock:
+            recipe = self._recipes.get(cache_key)
+            if recipe is not None:
+                self._recipes.move_to_end(cache_key)
+                self.hits += 1
+                return recipe, True
+            self.misses += 1
+
+        additives = integrate_additives(formulation, total_add_pct, total_volume, target=fresh_additives())
+        recipe = Recipe(
+            key, formulation_warnings(total_add_pct, formulation.total_percentage),
+            additives, plan_dispense(additives),
+        )
+        with self._lock:
+            self._recipes[cache_key] = recipe
+            self._recipes.move_to_end(cache_key)
+            while len(self._recipes) > self.capacity:
+                self._recipes.popitem(last=False)
+        return recipe, False
+
+    # ---------- Past results ----------
+    def add_result(self, key, experiment_number, readings):
+        if not readings:
+            return
+        with self._lock:
+            self._results.setdefault(key, []).append(
+                (experiment_number, sum(readings) / len(readings))
+            )
+
+    def results(self, key):
+        with self._lock:
+            return list(self._results.get(key, ()))
+
+    def load_results(self, records):
+        """Seeds past results from experiment log records."""
+        for record in records:
+            self.add_result(
+                recipe_key_for_record(record), record.get("experiment_number"),
+                record.get("conductivity_readings") or [],
+            )
+
+    def merge_results(self, past):
+        """
+        Adds the results of another cache (one loaded from the log on a
+        worker thread) ahead of the ones recorded here since; a run in both
+        is kept once.
+        """
+        with past._lock:
+            loaded = {key: list(results) for key, results in past._results.items()}
+        with self._lock:
+            for key, results in loaded.items():
+                seen = {number for number, _ in results}
+                results.extend(r for r in self._results.get(key, ()) if r[0] not in seen)
+                self._results[key] = results
+
+
+def format_results(results):
+    """One-line summary of a recipe's past results."""
+    if not results:
+        return "no previous runs"
+    means = [mean for _, mean in results]
+    avg = sum(means) / len(means)
+    spread = (sum((m - avg) ** 2 for m in means) / (len(means) - 1)) ** 0.5 if len(means) > 1 else 0.0
+    return f"{avg:.2f} ± {spread:.2f} over {len(means)} run(s) (last #{results[-1][0]}: {means[-1]:.2f})"
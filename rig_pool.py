@@ -0,0 +1,254 @@
+import json
+import threading
+import time
+
+from experiment_controller import (
+    ExperimentRunner, make_settling_detector, make_signal_pipeline,
+    ARDUINO_PORT, COND_METER_PORT, BAUD_RATE,
+)
+from experiment_engine import simulated_measurement
+from dispense_scheduler import SimulatedPump
+from experiment_queue import changeover_plan, next_manual_job, STATUS_FAILED
+from instrumentation import tracer
+
+# ------------------------------------------------------------------
+# MULTI-RIG ORCHESTRATION
+#
+# A registry of mixing stations (one Arduino + conductivity meter pair
+# each) and a pool with one worker thread per rig. Workers take jobs
+# from one shared ExperimentQueue: whichever rig is free takes the
+# job that is cheapest to change over to from what it ran last. All
+# rigs write to the same ExperimentLog, and each record is tagged with
+# its rig. Experiment numbers come from one shared counter.
+#
+# A job that raises goes back to the queue for any rig to retry; after
+# `max_attempts` failures it is marked failed. The rig stays in service.
+# Automatic jobs are held in the queue (see experiment_queue.py).
+#
+# The rigs spend their time waiting on serial I/O and on the chemistry,
+# not on Python, so threads are enough and throughput scales with the
+# number of rigs.
+#
+# rigs.json:
+#   {"rigs": [{"name": "station-1", "arduino_port": "/dev/ttyUSB0",
+#              "meter_port": "/dev/ttyUSB1"}, ...]}
+# A rig without an arduino_port is simulated.
+# ------------------------------------------------------------------
+
+RIG_CONFIG_PATH = "rigs.json"
+MAX_JOB_ATTEMPTS = 3
+
+
+class Rig:
+    __slots__ = ("name", "arduino_port", "meter_port")
+
+    def __init__(self, name, arduino_port=None, meter_port=None):
+        self.name = name
+        self.arduino_port = arduino_port
+        self.meter_port = meter_port
+
+    @property
+    def simulated(self):
+        return self.arduino_port is None
+
+    def to_dict(self):
+        return {"name": self.name, "arduino_port": self.arduino_port, "meter_port": self.meter_port}
+
+    def __repr__(self):
+        return f"Rig({self.name!r}, {self.arduino_port!r}, {self.meter_port!r})"
+
+
+class RigRegistry:
+    def __init__(self, rigs=()):
+        self._rigs = {}
+        for rig in rigs:
+            self.add(rig)
+
+    def add(self, rig):
+        if rig.name in self._rigs:
+            raise ValueError(f"Duplicate rig name: {rig.name}")
+        used = {r.arduino_port for r in self._rigs.values()} | {r.meter_port for r in self._rigs.values()}
+        for port in (rig.arduino_port, rig.meter_port):
+            if port is not None and port in used:
+                raise ValueError(f"Port {port} is already used by another rig")
+        self._rigs[rig.name] = rig
+
+    def get(self, name):
+        return self._rigs[name]
+
+    def __iter__(self):
+        return iter(self._rigs.values())
+
+    def __len__(self):
+        return len(self._rigs)
+
+    @classmethod
+    def default(cls):
+        """The single rig on ARDUINO_PORT / COND_METER_PORT."""
+        return cls([Rig("rig-1", ARDUINO_PORT, COND_METER_PORT)])
+
+    @classmethod
+    def simulated(cls, count):
+        return cls(Rig(f"sim-{i + 1}") for i in range(count))
+
+    @classmethod
+    def load(cls, path=RIG_CONFIG_PATH):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(Rig(**entry) for entry in data["rigs"])
+
+    def save(self, path=RIG_CONFIG_PATH):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"rigs": [rig.to_dict() for rig in self]}, f, indent=2)
+
+
+def make_runner(rig, log=None, interval=0.0, settle=None, time_scale=1.0,
+                recipes=None, raw=False, temperature=None, traces=None):
+    """
+    ExperimentRunner for one rig. Simulated rigs get a real-time pump
+    model (sped up by time_scale) so pool throughput can be measured.
+    Pass one RecipeCache to share planned recipes between rigs. With
+    `settle`, readings are filtered unless `raw` (see make_signal_pipeline()).
+    A shared TraceStore is safe: every experiment writes its own files.
+    """
+    transport = None
+    pump = None
+    if rig.simulated:
+        pump = SimulatedPump(realtime=True, time_scale=time_scale)
+    else:
+        from serial_transport import transport_pool
+        transport = transport_pool.get(rig.arduino_port, baudrate=BAUD_RATE)
+    measure = simulated_measurement  # until the meters are wired up
+    settling = signal = None
+    if settle:
+        from settling import SimulatedProbe
+        settling = make_settling_detector(max_seconds=settle)
+        if not raw:
+            signal = make_signal_pipeline(temperature=temperature)  # per rig: filters keep state
+        measure = SimulatedProbe()
+    return ExperimentRunner(
+        measure=measure, interval=interval, transport=transport, log=log,
+        pump=pump, settling=settling, rig=rig.name, recipes=recipes,
+        signal=signal, traces=traces,
+    )
+
+
+class RigPool:
+    def __init__(self, registry, runner_factory=make_runner, first_experiment_number=0,
+                 max_attempts=MAX_JOB_ATTEMPTS):
+        """
+        registry:       RigRegistry of the stations to drive
+        runner_factory: callable(rig) -> ExperimentRunner (one per rig, own state)
+        max_attempts:   runs of one job that may fail before it is marked failed
+        """
+        self.registry = registry
+        self.runners = {rig.name: runner_factory(rig) for rig in registry}
+        self.experiment_count = first_experiment_number
+        self.max_attempts = max_attempts
+        self.failures = {}  # job_id -> failed attempts so far
+        self.held = set()   # Automatic job ids left in the queue
+        self._lock = threading.Lock()  # guards the queue, the numbering and the results
+
+    def _take(self, queue, current_ports, results, out):
+        with self._lock:
+            job = next_manual_job(queue, current_ports, self.held,
+                                  lambda result: self._emit(results, out, result))
+            if job is None:
+                return None, None
+            self.experiment_count += 1
+            return job, self.experiment_count
+
+    def _worker(self, rig, queue, results, out):
+        runner = self.runners[rig.name]
+        current_ports = None
+        while True:
+            job, number = self._take(queue, current_ports, results, out)
+            if job is None:
+                return
+            try:
+                purge = changeover_plan(current_ports, job.ports)
+                if purge is not None:
+                    runner.dispense(purge)
+                record = runner.run(
+                    job.formulation(), job.total_add_pct, job.iterations,
+                    mode=job.mode, number=number,
+                )
+            except Exception as exc:
+                # The job is retried (on whichever rig is free) until it has
+                # failed max_attempts times; the rig carries on either way
+                tracer.count("job_failures")
+                with self._lock:
+                    attempts = self.failures[job.job_id] = self.failures.get(job.job_id, 0) + 1
+                    if attempts >= self.max_attempts:
+                        queue.fail(job)
+                    else:
+                        queue.requeue(job)
+                    self._emit(results, out, {
+                        "job_id": job.job_id, "rig": rig.name, "attempt": attempts,
+                        "failed": attempts >= self.max_attempts, "error": str(exc),
+                    })
+                continue
+            current_ports = job.ports
+            record["job_id"] = job.job_id
+            record["rig"] = rig.name
+            with self._lock:
+                queue.complete(job)
+                self._emit(results, out, record)
+
+    @staticmethod
+    def _emit(results, out, result):
+        results.append(result)
+        if out is not None:
+            out(result)
+
+    def run(self, queue, out=None):
+        """
+        Runs every pending job of an ExperimentQueue on all rigs in
+        parallel and returns the results in completion order.
+        `out(result)` is called as each one finishes (one at a time).
+        Every failed attempt is an error result; so is each job left
+        unfinished when the workers stop. Held Automatic jobs are skipped.
+        """
+        results = []
+        self.failures = {}
+        self.held = set()
+        workers = [
+            threading.Thread(target=self._worker, args=(rig, queue, results, out),
+                             name=f"rig-{rig.name}", daemon=True)
+            for rig in self.registry
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        for job in queue.jobs:  # finished jobs have been removed
+            if job.status != STATUS_FAILED and job.job_id not in self.held:
+                self._emit(results, out, {"job_id": job.job_id, "error": f"Left unfinished ({job.status})"})
+        return results
+
+
+# --- Throughput with N simulated rigs: python rig_pool.py ---
+if __name__ == "__main__":
+    from experiment_controller import formulation_from_dict
+    from experiment_queue import ExperimentQueue
+
+    JOBS = 24
+    TIME_SCALE = 0.01  # a ~14 s dispense takes ~0.14 s
+    mixes = [{"Compound 1": 5, "Compound 2": 5}, {"Compound 3": 10}, {"Compound 1": 10}]
+
+    baseline = None
+    for rigs in (1, 2, 4, 8):
+        queue = ExperimentQueue(path=None)
+        for i in range(JOBS):
+            queue.enqueue(formulation_from_dict(mixes[i % len(mixes)]), 10.0, 3)
+        pool = RigPool(
+            RigRegistry.simulated(rigs),
+            runner_factory=lambda rig: make_runner(rig, interval=0.02, time_scale=TIME_SCALE),
+        )
+        start = time.perf_counter()
+        results = pool.run(queue)
+        elapsed = time.perf_counter() - start
+        rate = len(results) / elapsed
+        baseline = baseline or rate
+        print(f"{rigs} rig(s): {len(results)} experiments in {elapsed:.2f} s "
+              f"({rate:.1f}/s, x{rate / baseline:.2f})")
@@ -0,0 +1,342 @@
+import os
+import threading
+import time
+
+from instrumentation import tracer
+
+# ------------------------------------------------------------------
+# SERIAL TRANSPORT LAYER
+#
+# One long-lived, buffered connection per port (ARDUINO_PORT,
+# COND_METER_PORT, ...). Opening an Arduino port toggles DTR and resets
+# the board, which costs 1-2 s, so we pay that once per session and
+# reuse the connection for every command afterwards.
+#
+# A failed open or read is retried after reconnecting; lines already
+# received survive the reconnect. A failed write is never retried: the
+# Arduino may already have received (part of) the batch, so resending
+# could dispense twice. write_commands() raises TransportError and the
+# caller decides, e.g. from the batch's acknowledgement.
+#
+# pyserial is imported lazily so the GUI starts without it installed.
+# ------------------------------------------------------------------
+
+DEFAULT_BAUD_RATE = 115200
+LINE_TERMINATOR = b"\n"
+
+
+class TransportError(Exception):
+    """Raised when a port cannot be (re)opened, a write fails or a read times out."""
+
+
+def open_serial_port(port, baudrate):
+    """Default opener: a non-blocking pyserial port."""
+    import serial  # deferred: only needed once a device is actually used
+    return serial.Serial(port, baudrate=baudrate, timeout=0, write_timeout=1.0)
+
+
+class SerialTransport:
+    def __init__(self, port, baudrate=DEFAULT_BAUD_RATE, reset_delay=2.0,
+                 reconnect_attempts=3, reconnect_backoff=0.5, opener=open_serial_port):
+        """
+        port:               device path or COM name
+        baudrate:           line speed
+        reset_delay:        seconds to wait after opening (Arduino auto-reset)
+        reconnect_attempts: how many times to reopen before giving up
+        reconnect_backoff:  seconds between reconnect attempts
+        opener:             callable(port, baudrate) -> serial-like object
+        """
+        self.port = port
+        self.baudrate = baudrate
+        self.reset_delay = reset_delay
+        self.reconnect_attempts = reconnect_attempts
+        self.reconnect_backoff = reconnect_backoff
+        self.opener = opener
+
+        self._conn = None
+        self._rx = bytearray()
+        self._lock = threading.RLock()
+
+        # Simple counters, handy when benchmarking
+        self.opens = 0
+        self.reconnects = 0
+        self.bytes_written = 0
+        self.lines_read = 0
+
+    # ---------- Connection management ----------
+    @property
+    def is_open(self):
+        return self._conn is not None
+
+    def open(self):
+        """Opens the port if needed. Idempotent."""
+        with self._lock:
+            if self._conn is not None:
+                return
+            self._conn = self.opener(self.port, self.baudrate)
+            self.opens += 1
+            if self.reset_delay:
+                time.sleep(self.reset_delay)
+            # Discard anything the board printed while booting
+            waiting = getattr(self._conn, "in_waiting", 0)
+            if waiting:
+                self._conn.read(waiting)
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                try:
+                    self._conn.close()
+                except OSError:
+                    pass
+                self._conn = None
+            self._rx.clear()
+
+    def _drop_connection(self):
+        """Closes the port but keeps the complete lines already received."""
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except OSError:
+                pass
+            self._conn = None
+        # A partial line would be spliced onto whatever the new connection sends
+        del self._rx[self._rx.rfind(LINE_TERMINATOR) + 1:]
+
+    def reconnect(self):
+        """Closes and reopens the port, retrying with a fixed backoff."""
+        with self._lock:
+            self._drop_connection()
+            last_error = None
+            for attempt in range(self.reconnect_attempts):
+                try:
+                    self.open()
+                    self.reconnects += 1
+                    tracer.count("serial_reconnects")
+                    return
+                except (OSError, ValueError) as exc:  # SerialException subclasses OSError
+                    last_error = exc
+                    time.sleep(self.reconnect_backoff)
+            raise TransportError(f"Could not reopen {self.port}: {last_error}")
+
+    def _ensure_open(self):
+        if self._conn is None:
+            try:
+                self.open()
+            except (OSError, ValueError):
+                self.reconnect()
+
+    def _read_with_reconnect(self, action):
+        """Runs a read; if the port failed, reconnects once and reads again."""
+        with self._lock:
+            self._ensure_open()
+            try:
+                return action()
+            except (OSError, ValueError):
+                tracer.count("serial_retries")
+                self.reconnect()
+                return action()
+
+    # ---------- Writing ----------
+    def write_commands(self, commands):
+        """
+        Frames each command with a newline and sends the whole batch in a
+        single write call. Raises TransportError if the write fails; the
+        batch is not resent (see above).
+        """
+        if isinstance(commands, str):
+            commands = [commands]
+        payload = b"".join(c.encode("ascii") + LINE_TERMINATOR for c in commands)
+        if not payload:
+            return 0
+
+        with self._lock:
+            self._ensure_open()
+            try:
+                written = self._conn.write(payload)
+                self._conn.flush()
+            except (OSError, ValueError) as exc:
+                tracer.count("serial_write_failures")
+                self._drop_connection()  # reopened on the next call
+                raise TransportError(
+                    f"Write to {self.port} failed ({exc}); the batch may have been "
+                    f"partly received and was not resent"
+                ) from exc
+        self.bytes_written += written or 0
+        return written
+
+    # ---------- Reading ----------
+    def _pop_line(self):
+        idx = self._rx.find(LINE_TERMINATOR)
+        if idx < 0:
+            return None
+        line = bytes(self._rx[:idx])
+        del self._rx[:idx + 1]
+        self.lines_read += 1
+        return line.rstrip(b"\r").decode("ascii", errors="replace")
+
+    def _fill(self):
+        waiting = self._conn.in_waiting
+        if waiting:
+            self._rx += self._conn.read(waiting)
+        return waiting
+
+    def poll_line(self):
+        """Non-blocking: returns one complete line, or None if none is buffered."""
+        line = self._pop_line()
+        if line is not None:
+            return line
+        self._read_with_reconnect(self._fill)
+        return self._pop_line()
+
+    def read_line(self, timeout=1.0, poll_interval=0.002):
+        """Waits up to `timeout` seconds for one complete line."""
+        deadline = time.perf_counter() + timeout
+        while True:
+            line = self.poll_line()
+            if line is not None:
+                return line
+            if time.perf_counter() >= deadline:
+                raise TransportError(f"Timed out waiting for a line from {self.port}")
+            time.sleep(poll_interval)
+
+    def read_lines(self, count, timeout=1.0):
+        """Reads `count` lines sharing one overall timeout."""
+        deadline = time.perf_counter() + timeout
+        lines = []
+        for _ in range(count):
+            lines.append(self.read_line(max(0.0, deadline - time.perf_counter())))
+        return lines
+
+    def transact(self, commands, timeout=1.0):
+        """Writes a batch and reads one reply line per command."""
+        if isinstance(commands, str):
+            commands = [commands]
+        with self._lock:
+            self.write_commands(commands)
+            return self.read_lines(len(commands), timeout)
+
+
+class TransportPool:
+    """Keeps exactly one SerialTransport per port for the whole session."""
+
+    def __init__(self, **defaults):
+        self.defaults = defaults
+        self._transports = {}
+        self._lock = threading.Lock()
+
+    def get(self, port, **options):
+        with self._lock:
+            transport = self._transports.get(port)
+            if transport is None:
+                settings = dict(self.defaults)
+                settings.update(options)
+                transport = SerialTransport(port, **settings)
+                self._transports[port] = transport
+            return transport
+
+    def close_all(self):
+        with self._lock:
+            for transport in self._transports.values():
+                transport.close()
+            self._transports.clear()
+
+    def __contains__(self, port):
+        return port in self._transports
+
+
+# Shared pool used by the controller
+transport_pool = TransportPool()
+
+
+# ------------------------------------------------------------------
+# PTY LOOPBACK (no hardware needed)
+# ------------------------------------------------------------------
+class PtyLoopback:
+    """
+    Fake device on a pseudo-terminal (POSIX only). `port` is a real tty
+    path that SerialTransport can open. Each line received is passed to
+    `responder(line)`; a non-None return value is sent back as a line.
+    """
+
+    def __init__(self, responder=None):
+        import tty  # POSIX only
+        self.responder = responder or (lambda line: line)  # echo by default
+        self.master_fd, self.slave_fd = os.openpty()
+        tty.setraw(self.slave_fd)
+        self.port = os.ttyname(self.slave_fd)
+        self.received = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _serve(self):
+        import select
+        buf = bytearray()
+        while not self._stop.is_set():
+            ready, _, _ = select.select([self.master_fd], [], [], 0.05)
+            if not ready:
+                continue
+            try:
+                chunk = os.read(self.master_fd, 4096)
+            except OSError:
+                break
+            buf += chunk
+            replies = []
+            while True:
+                idx = buf.find(LINE_TERMINATOR)
+                if idx < 0:
+                    break
+                line = bytes(buf[:idx]).decode("ascii", errors="replace")
+                del buf[:idx + 1]
+                self.received.append(line)
+                reply = self.responder(line)
+                if reply is not None:
+                    replies.append(reply.encode("ascii") + LINE_TERMINATOR)
+            if replies:
+                os.write(self.master_fd, b"".join(replies))
+
+    def stop(self):
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join(1.0)
+        for fd in (self.master_fd, self.slave_fd):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+# --- Loopback benchmark: python serial_transport.py ---
+if __name__ == "__main__":
+    N = 200
+    with PtyLoopback(lambda line: "OK " + line) as device:
+        transport = SerialTransport(device.port, reset_delay=0)
+
+        start = time.perf_counter()
+        transport.open()
+        open_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for i in range(N):
+            transport.transact(f"CMD {i}")
+        single_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        transport.transact([f"CMD {i}" for i in range(N)], timeout=5.0)
+        batch_s = time.perf_counter() - start
+
+        transport.close()
+
+    print(f"open:            {open_s * 1000:.2f} ms")
+    print(f"{N} round trips: {single_s * 1000:.2f} ms")
+    print(f"1 batch of {N}:  {batch_s * 1000:.2f} ms")
@@ -0,0 +1,120 @@
+import math
+import random
+import time
+from collections import deque
+
+# ------------------------------------------------------------------
+# ADAPTIVE SETTLING DETECTION
+#
+# Instead of a fixed sleep per iteration, the engine streams readings
+# into a SettlingDetector and ends the iteration as soon as the last
+# `window` samples are flat (|least-squares slope| <= slope_tol) and
+# quiet (std <= std_tol), or when max_seconds is reached.
+#
+# Running sums make every add() O(1) regardless of window size.
+# ------------------------------------------------------------------
+
+
+class SettlingDetector:
+    def __init__(self, window=10, slope_tol=0.05, std_tol=0.1,
+                 sample_period=0.1, max_seconds=30.0):
+        """
+        window:        samples in the rolling window
+        slope_tol:     max |slope| in reading units per second
+        std_tol:       max standard deviation in reading units
+        sample_period: seconds between samples while settling
+        max_seconds:   give up waiting and accept the reading after this long
+        """
+        if window < 3:
+            raise ValueError("window must be at least 3 samples")
+        self.window = window
+        self.slope_tol = slope_tol
+        self.std_tol = std_tol
+        self.sample_period = sample_period
+        self.max_seconds = max_seconds
+        self.reset()
+
+    def reset(self):
+        self._samples = deque()
+        self._t0 = None
+        self._st = self._sv = self._stt = self._stv = self._svv = 0.0
+        self.settled = False
+
+    def add(self, timestamp, value):
+        """Adds one sample; returns True once the window is stable."""
+        if self._t0 is None:
+            self._t0 = timestamp
+        t = timestamp - self._t0  # relative time keeps the sums well-conditioned
+        self._samples.append((t, value))
+        self._st += t
+        self._sv += value
+        self._stt += t * t
+        self._stv += t * value
+        self._svv += value * value
+        if len(self._samples) > self.window:
+            old_t, old_v = self._samples.popleft()
+            self._st -= old_t
+            self._sv -= old_v
+            self._stt -= old_t * old_t
+            self._stv -= old_t * old_v
+            self._svv -= old_v * old_v
+        self.settled = (
+            len(self._samples) == self.window
+            and abs(self.slope()) <= self.slope_tol
+            and self.std() <= self.std_tol
+        )
+        return self.settled
+
+    def slope(self):
+        n = len(self._samples)
+        denom = n * self._stt - self._st * self._st
+        if n < 2 or denom <= 0:
+            return 0.0
+        return (n * self._stv - self._st * self._sv) / denom
+
+    def std(self):
+        n = len(self._samples)
+        if n < 2:
+            return 0.0
+        mean = self._sv / n
+        return math.sqrt(max(self._svv / n - mean * mean, 0.0))
+
+    def mean(self):
+        n = len(self._samples)
+        return self._sv / n if n else 0.0
+
+    @property
+    def elapsed(self):
+        return self._samples[-1][0] if self._samples else 0.0
+
+
+class SimulatedProbe:
+    """
+    Meter stand-in whose reading relaxes exponentially toward a target after
+    every restart() (i.e. after mixing), with Gaussian noise on top.
+    """
+
+    def __init__(self, target=None, tau=None, noise=0.02, seed=None):
+        """
+        target: settled conductivity (random 0-100 if None)
+        tau:    relaxation time constant in seconds (random 0.1-1 s if None)
+        """
+        self.rng = random.Random(seed)
+        self.fixed_target = target
+        self.fixed_tau = tau
+        self.noise = noise
+        self.value = 0.0
+        self.restart()
+
+    def restart(self):
+        """Called by the engine at the start of each iteration."""
+        self.start_value = self.value
+        self.target = self.fixed_target if self.fixed_target is not None else self.rng.uniform(0, 100)
+        self.tau = self.fixed_tau if self.fixed_tau is not None else self.rng.uniform(0.1, 1.0)
+        self.started = time.perf_counter()
+
+    def __call__(self):
+        elapsed = time.perf_counter() - self.started
+        decay = math.exp(-elapsed / self.tau)
+        self.value = self.target + (self.start_value - self.target) * decay
+        return self.value + self.rng.gauss(0.0, self.noise)
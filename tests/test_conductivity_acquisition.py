@@ -0,0 +1,81 @@
+import threading
+import time
+
+import pytest
+
+from conductivity_acquisition import SampleRingBuffer, ConductivityAcquisition
+
+
+def test_reads_everything_written_since_the_cursor():
+    ring = SampleRingBuffer(8)
+    for i in range(5):
+        ring.push(float(i), i * 10.0)
+    samples, cursor = ring.read_since(0)
+    assert samples == [(float(i), i * 10.0) for i in range(5)]
+    assert ring.read_since(cursor) == ([], 5)
+    assert ring.latest() == (4.0, 40.0)
+
+
+def test_wraparound_keeps_the_newest_samples_and_counts_the_dropped():
+    ring = SampleRingBuffer(4)
+    for i in range(10):  # wraps two and a half times
+        ring.push(float(i), float(i))
+    samples, cursor = ring.read_since(0)
+    assert [v for _, v in samples] == [6.0, 7.0, 8.0, 9.0]
+    assert ring.dropped == 6 and cursor == 10
+
+    for i in range(10, 13):  # a partial lap after the wrap
+        ring.push(float(i), float(i))
+    samples, cursor = ring.read_since(cursor)
+    assert [v for _, v in samples] == [10.0, 11.0, 12.0]
+    assert ring.dropped == 6
+
+
+def test_empty_ring_and_invalid_capacity():
+    assert SampleRingBuffer(1).latest() is None
+    with pytest.raises(ValueError):
+        SampleRingBuffer(0)
+
+
+def test_consumer_sees_every_sample_in_order_while_the_producer_runs():
+    ring = SampleRingBuffer(64)
+    count = 5000
+    seen = []
+    done = threading.Event()
+
+    def produce():
+        for i in range(count):
+            while i - len(seen) >= ring.capacity:  # don't lap the consumer in this test
+                time.sleep(0)
+            ring.push(float(i), float(i))
+        done.set()
+
+    producer = threading.Thread(target=produce)
+    producer.start()
+    cursor = 0
+    while not done.is_set() or cursor < ring.head:
+        samples, cursor = ring.read_since(cursor)
+        seen.extend(v for _, v in samples)
+        time.sleep(0)
+    producer.join()
+
+    assert seen == [float(i) for i in range(count)]
+    assert ring.dropped == 0
+
+
+def test_acquisition_counts_meter_errors_and_keeps_sampling():
+    calls = []
+
+    def flaky_meter():
+        calls.append(1)
+        if len(calls) % 2:
+            raise OSError("no reply")
+        return 42.0
+
+    acquisition = ConductivityAcquisition(flaky_meter, sample_rate=1000.0)
+    acquisition.start()
+    while acquisition.buffer.head < 5:
+        time.sleep(0.001)
+    acquisition.stop()
+    assert acquisition.errors >= 5
+    assert acquisition.buffer.latest()[1] == 42.0
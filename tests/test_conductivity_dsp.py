@@ -0,0 +1,138 @@
+import numpy as np
+import pytest
+
+from conductivity_dsp import (
+    MedianFilter, OutlierRejector, EMAFilter, KalmanFilter, TemperatureCompensation,
+    BlockAverager, SignalPipeline, MAD_TO_SIGMA,
+)
+
+
+def signal(n=600, seed=0):
+    rng = np.random.default_rng(seed)
+    x = 50.0 + 10.0 * np.exp(-np.arange(n) / 100.0) + rng.normal(0.0, 0.05, n)
+    x[rng.choice(n, 12, replace=False)] += 25.0  # spikes
+    return x
+
+
+def in_blocks(stage, x, sizes):
+    """Feeds x through stage.process() in blocks of the given sizes (cycled)."""
+    out, start, i = [], 0, 0
+    while start < len(x):
+        size = sizes[i % len(sizes)]
+        out.append(stage.process(x[start:start + size]))
+        start += size
+        i += 1
+    return np.concatenate(out)
+
+
+# ---------- Per-sample reference loops ----------
+def reference_windows(x, window):
+    history = [x[0]] * (window - 1) + list(x)
+    return [np.array(history[n:n + window]) for n in range(len(x))]
+
+
+def reference_median(x, window):
+    return np.array([np.median(w) for w in reference_windows(x, window)])
+
+
+def reference_hampel(x, window, sigmas, min_sigma):
+    out = []
+    for value, w in zip(x, reference_windows(x, window)):
+        median = np.median(w)
+        sigma = max(MAD_TO_SIGMA * np.median(np.abs(w - median)), min_sigma)
+        out.append(median if abs(value - median) > sigmas * sigma else value)
+    return np.array(out)
+
+
+def reference_ema(x, alpha):
+    y, out = x[0], []
+    for value in x:
+        y = (1 - alpha) * y + alpha * value
+        out.append(y)
+    return np.array(out)
+
+
+def reference_kalman(x, q, r):
+    value, variance, out = x[0], r, [x[0]]
+    for z in x[1:]:
+        predicted = variance + q
+        gain = predicted / (predicted + r)
+        variance = (1 - gain) * predicted
+        value += gain * (z - value)
+        out.append(value)
+    return np.array(out)
+
+
+def test_stages_match_their_per_sample_reference_loops():
+    x = signal()
+    assert np.allclose(MedianFilter(7).process(x), reference_median(x, 7))
+    assert np.allclose(OutlierRejector(15, 4.0).process(x), reference_hampel(x, 15, 4.0, 1e-6))
+    assert np.allclose(EMAFilter(0.3).process(x), reference_ema(x, 0.3))
+    assert np.allclose(KalmanFilter(0.03, 0.05).process(x), reference_kalman(x, 0.03 ** 2, 0.05 ** 2))
+
+
+def test_ema_stays_finite_on_long_blocks_with_a_small_alpha():
+    x = np.full(100000, 5.0)
+    out = EMAFilter(0.001).process(x)
+    assert np.isfinite(out).all() and out[-1] == pytest.approx(5.0)
+
+
+@pytest.mark.parametrize("make", [
+    lambda: MedianFilter(7), lambda: OutlierRejector(15), lambda: EMAFilter(0.2), lambda: KalmanFilter(),
+])
+@pytest.mark.parametrize("sizes", [[1], [3, 17], [64], [599]])
+def test_stage_output_does_not_depend_on_the_block_split(make, sizes):
+    x = signal()
+    assert np.allclose(in_blocks(make(), x, sizes), make().process(x))
+
+
+def make_pipeline(decimate=4):
+    return SignalPipeline(
+        [OutlierRejector(15), KalmanFilter()], TemperatureCompensation(30.0), decimate=decimate,
+    )
+
+
+@pytest.mark.parametrize("sizes", [[1], [5, 2, 11], [100], [600]])
+def test_pipeline_output_does_not_depend_on_the_block_split(sizes):
+    x = signal()
+    t = np.arange(len(x)) * 0.1
+    whole_t, whole_v = make_pipeline().process(t, x)
+
+    pipeline = make_pipeline()
+    parts, start, i = [], 0, 0
+    while start < len(x):
+        size = sizes[i % len(sizes)]
+        parts.append(pipeline.process(t[start:start + size], x[start:start + size]))
+        start += size
+        i += 1
+    assert np.allclose(np.concatenate([p[0] for p in parts]), whole_t)
+    assert np.allclose(np.concatenate([p[1] for p in parts]), whole_v)
+    assert len(whole_v) == len(x) // 4 and pipeline.samples_out == len(whole_v)
+
+
+def test_spikes_are_rejected_and_counted():
+    x = np.full(200, 10.0)
+    x[[50, 120]] = 90.0
+    pipeline = SignalPipeline([OutlierRejector(15)])
+    _, clean = pipeline.process(np.arange(200.0), x)
+    assert np.allclose(clean, 10.0) and pipeline.rejected == 2
+
+
+def test_block_averager_carries_a_partial_block():
+    averager = BlockAverager(3)
+    t, v = averager.process([0, 1, 2, 3], [1.0, 2.0, 3.0, 4.0])
+    assert t.tolist() == [1.0] and v.tolist() == [2.0]
+    t, v = averager.process([4, 5], [5.0, 6.0])
+    assert t.tolist() == [4.0] and v.tolist() == [5.0]
+
+
+def test_temperature_compensation_to_the_reference():
+    assert TemperatureCompensation(35.0).process([12.0]) == pytest.approx([10.0])
+    assert TemperatureCompensation(lambda: 25.0).process([12.0]) == pytest.approx([12.0])
+
+
+def test_reset_forgets_the_previous_mix():
+    kalman = KalmanFilter()
+    kalman.process(np.full(50, 100.0))
+    kalman.reset()
+    assert kalman.process([20.0])[0] == 20.0
@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+
+from conductivity_optimizer import ConductivityOptimizer, IncrementalGP, synthetic_conductivity
+from formulation_grid import generate_candidates
+
+BUDGET = 25   # measurements, out of 231 candidates
+SEEDS = range(5)
+
+
+@pytest.fixture(scope="module")
+def candidates():
+    pcts, _ = generate_candidates(3, 10.0, 3.0, design="grid", step=0.5)
+    return pcts
+
+
+def optimize(candidates, seed):
+    optimizer = ConductivityOptimizer(candidates, seed=seed)
+    rng = np.random.default_rng(seed)
+    for _ in range(BUDGET):
+        index, row = optimizer.suggest()
+        optimizer.observe(row, float(synthetic_conductivity(row, noise=0.05, rng=rng)), index)
+    return optimizer
+
+
+def test_converges_on_the_synthetic_optimum(candidates):
+    true_best = synthetic_conductivity(candidates).max()
+    found = [float(synthetic_conductivity(optimize(candidates, seed).best_pcts)) for seed in SEEDS]
+    assert min(found) >= true_best - 0.1  # within 0.1 mS/cm of the best candidate
+
+    # ...and does better than measuring the same number of random candidates
+    random_best = [
+        synthetic_conductivity(candidates[np.random.default_rng(seed).choice(len(candidates), BUDGET,
+                                                                             replace=False)]).max()
+        for seed in SEEDS
+    ]
+    assert np.mean(found) > np.mean(random_best)
+
+
+def test_never_suggests_a_measured_or_skipped_candidate(candidates):
+    optimizer = optimize(candidates, seed=0)
+    optimizer.skip(0)
+    suggested = set()
+    for _ in range(20):
+        index, row = optimizer.suggest()
+        assert not optimizer.tried[index]
+        optimizer.observe(row, float(synthetic_conductivity(row)), index)
+        suggested.add(index)
+    assert 0 not in suggested and len(suggested) == 20
+
+
+def test_incremental_gp_matches_a_full_refit():
+    rng = np.random.default_rng(3)
+    X = rng.uniform(0, 10, (40, 3))  # more points than the initial capacity grows past
+    y = synthetic_conductivity(X, noise=0.1, rng=rng)
+    gp = IncrementalGP(initial_capacity=8)
+    for x, value in zip(X, y):
+        gp.add(x, value)
+
+    Xs = rng.uniform(0, 10, (15, 3))
+    mu, sigma = gp.predict(Xs)
+
+    # Direct solve on standardized targets, as IncrementalGP documents
+    K = gp.kernel(X, X) + gp.noise * np.eye(len(X))
+    Ks = gp.kernel(X, Xs)
+    scale = y.std()
+    alpha = np.linalg.solve(K, (y - y.mean()) / scale)
+    expected_mu = Ks.T @ alpha * scale + y.mean()
+    expected_var = 1.0 - np.sum(Ks * np.linalg.solve(K, Ks), axis=0)
+    assert mu == pytest.approx(expected_mu, rel=1e-6, abs=1e-6)
+    assert sigma == pytest.approx(np.sqrt(np.maximum(expected_var, 1e-12)) * scale, rel=1e-6, abs=1e-6)
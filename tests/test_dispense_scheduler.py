@@ -0,0 +1,82 @@
+from dispense_scheduler import (
+    DispensePlan, SimulatedPump, build_dispense_plan, build_naive_plan,
+    OP_VALVE, OP_DISPENSE, OP_RATE,
+)
+
+ARGON, LP30 = 3, 1
+ADDITIVES = {
+    "TEP": {"port": 2, "used": True, "volume": 0.15},
+    "ADDITIVE_X": {"port": 4, "used": True, "volume": 0.15},
+    "ADDITIVE_Y": {"port": 5, "used": False, "volume": 0.0},
+    "ALIAS": {"port": 4, "used": True, "volume": 0.05},  # shares port 4
+    "TINY": {"port": 6, "used": True, "volume": 0.0001},  # below pump resolution
+    "LP30": {"port": LP30, "used": True, "volume": 2.65},
+}
+
+
+def build():
+    return build_dispense_plan(ADDITIVES, purge_port=ARGON, bulk_port=LP30)
+
+
+def checksum(lines):
+    return sum(sum(line.encode("ascii")) for line in lines) % 65536
+
+
+def test_frame_carries_the_count_and_checksum_of_its_lines():
+    frame = build().frame()
+    body = frame[1:-1]
+    assert frame[0] == f"BATCH {len(body)}"
+    assert frame[-1] == f"END {checksum(body)}"
+    assert body == build().to_lines()
+
+
+def test_checksum_catches_a_changed_line():
+    frame = build().frame()
+    body = list(frame[1:-1])
+    body[1] = body[1].replace("0.150", "0.151")
+    assert frame[-1] != f"END {checksum(body)}"
+
+
+def test_ports_are_merged_and_visited_once_with_the_bulk_last():
+    plan = build()
+    dispenses = [(port, round(amount, 6)) for op, port, amount in plan if op == OP_DISPENSE]
+    assert dispenses == [(2, 0.15), (4, 0.2), (LP30, 2.65)]
+    assert plan.valve_switches == 3
+    assert plan.purges == 2  # between reagents, none before the first or after the last
+    assert plan.commands[0][0] == OP_VALVE and plan.commands[-1][0] == OP_DISPENSE
+
+
+def test_current_port_saves_the_first_switch():
+    plan = build_dispense_plan(ADDITIVES, purge_port=ARGON, bulk_port=LP30, current_port=4)
+    assert plan.commands[0] == (OP_DISPENSE, 4, 0.2)
+    assert plan.valve_switches == 2
+
+
+def test_rate_is_only_sent_when_it_changes():
+    rates = {2: 1.0, 4: 1.0, LP30: 2.0}
+    plan = build_dispense_plan(ADDITIVES, purge_port=ARGON, bulk_port=LP30,
+                               dispense_settings=lambda port, ml: (ml * 1.01, rates[port]))
+    assert [amount for op, _, amount in plan if op == OP_RATE] == [1.0, 2.0]
+    assert "RATE 1.000" in plan.frame()
+    assert OP_RATE not in " ".join(build().frame())  # uncalibrated plans never set it
+
+
+def test_optimized_plan_is_faster_than_the_naive_one():
+    naive = build_naive_plan(ADDITIVES, purge_port=ARGON)
+    plan = build()
+    assert round(plan.total_volume, 6) == round(naive.total_volume, 6)
+    assert SimulatedPump().run(plan) < SimulatedPump().run(naive)
+
+
+def test_breakdown_adds_up_to_the_total():
+    pump = SimulatedPump()
+    total = pump.run(build())
+    b = pump.last_breakdown
+    parts = b["valve"][1] + b["purge"][1] + b["command"][1] + sum(s for _, s in b["dispense"].values())
+    assert abs(parts - total) < 1e-9
+    assert b["command"][0] == len(build())
+
+
+def test_empty_plan_frames_to_an_empty_batch():
+    assert DispensePlan().frame() == ["BATCH 0", "END 0"]
+    assert len(build_naive_plan({}, ARGON)) == 0
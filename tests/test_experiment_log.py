@@ -0,0 +1,73 @@
+import threading
+
+import pytest
+
+from experiment_log import (
+    ExperimentLog, read_records, last_experiment_number, RECORD_EXPERIMENT, RECORD_SAMPLE,
+)
+
+
+def test_records_round_trip_through_the_log(tmp_path):
+    path = str(tmp_path / "log.jsonl")
+    log = ExperimentLog(path)
+    record = {"experiment_number": 7, "mode": "Manual", "conductivity_readings": [1.5, 2.25],
+              "parsed_compounds": {"Compound 1": 10.0}, "stage_times": {"valve": [2, 1.6]}}
+    log.log_experiment(record)
+    log.log_sample(7, 0, 1.5, timestamp=100.0)
+    log.close()
+
+    [experiment] = read_records(path, RECORD_EXPERIMENT)
+    assert experiment["type"] == RECORD_EXPERIMENT and "logged_at" in experiment
+    assert {k: experiment[k] for k in record} == record
+    assert list(read_records(path, RECORD_SAMPLE)) == [
+        {"type": RECORD_SAMPLE, "experiment_number": 7, "iteration": 0, "t": 100.0, "value": 1.5}
+    ]
+    assert len(list(read_records(path))) == 2
+
+
+def test_a_torn_last_line_is_skipped(tmp_path):
+    path = tmp_path / "log.jsonl"
+    path.write_text('{"type":"experiment","experiment_number":1}\n{"type":"experiment","experim')
+    assert [r["experiment_number"] for r in read_records(str(path))] == [1]
+    assert last_experiment_number(str(path)) == 1
+
+
+def test_last_experiment_number_reads_back_past_one_block(tmp_path):
+    path = str(tmp_path / "log.jsonl")
+    log = ExperimentLog(path)
+    log.log_experiment({"experiment_number": 40})
+    log.log_experiment({"experiment_number": 41, "notes": "x" * 5000})  # spans several blocks
+    log.close()
+    assert last_experiment_number(path, tail_bytes=1024) == 41
+    assert last_experiment_number(str(tmp_path / "missing.jsonl")) == 0
+
+
+def test_append_after_close_raises(tmp_path):
+    log = ExperimentLog(str(tmp_path / "log.jsonl"))
+    log.close()
+    with pytest.raises(ValueError):
+        log.log_sample(1, 0, 1.0)
+
+
+def test_concurrent_flushes_keep_lines_whole_and_in_order(tmp_path):
+    path = str(tmp_path / "log.jsonl")
+    log = ExperimentLog(path, flush_interval=0.001, max_buffered=1)
+    count = 20000
+
+    def flush_repeatedly():
+        while not done.is_set():
+            log.flush()
+
+    done = threading.Event()
+    flushers = [threading.Thread(target=flush_repeatedly) for _ in range(3)]
+    for flusher in flushers:
+        flusher.start()
+    for i in range(count):
+        log.log_sample(1, i, float(i), timestamp=0.0)
+    done.set()
+    for flusher in flushers:
+        flusher.join()
+    log.close()
+
+    assert [r["iteration"] for r in read_records(path, RECORD_SAMPLE)] == list(range(count))
+    assert log.records_written == count
@@ -0,0 +1,84 @@
+from experiment_controller import ExperimentRunner, formulation_from_dict
+from experiment_queue import ExperimentQueue, run_queue, STATUS_PENDING, HELD_AUTOMATIC
+from rig_pool import RigPool, RigRegistry, make_runner
+from dispense_scheduler import SimulatedPump
+
+
+def queue_with_automatic_job():
+    queue = ExperimentQueue(path=None)
+    manual = queue.enqueue(formulation_from_dict({"Compound 1": 10}), 10.0, 1)
+    # As the Automatic tab enqueues it: the compounds at 0%, for the optimizer to fill in
+    automatic = queue.enqueue(
+        formulation_from_dict({"Compound 1": 0, "Compound 2": 0}), 10.0, 1, mode="Automatic"
+    )
+    return queue, manual, automatic
+
+
+def recording(runner, runs):
+    """Wraps runner.run() to record the (mode, formulation) of every run in `runs`."""
+    run = runner.run
+
+    def recorded(formulation, *args, **kwargs):
+        runs.append((kwargs.get("mode"), formulation))
+        return run(formulation, *args, **kwargs)
+
+    runner.run = recorded
+    return runner
+
+
+def assert_held(queue, automatic, runs, results):
+    assert all(mode == "Manual" for mode, _ in runs)
+    assert all(f.total_percentage > 0 for _, f in runs)  # nothing was dispensed as LP30 only
+    assert queue.jobs == [automatic] and automatic.status == STATUS_PENDING
+    assert {"job_id": automatic.job_id, "skipped": HELD_AUTOMATIC} in results
+
+
+def test_run_queue_holds_automatic_jobs():
+    queue, manual, automatic = queue_with_automatic_job()
+    runs = []
+    runner = recording(ExperimentRunner(measure=lambda: 1.0, pump=SimulatedPump()), runs)
+    results = []
+    records = run_queue(queue, runner, out=results.append)
+
+    assert [r["job_id"] for r in records] == [manual.job_id]
+    assert_held(queue, automatic, runs, results)
+
+
+def test_rig_pool_holds_automatic_jobs():
+    queue, manual, automatic = queue_with_automatic_job()
+    runs = []
+    pool = RigPool(
+        RigRegistry.simulated(2),
+        runner_factory=lambda rig: recording(make_runner(rig, time_scale=0.001), runs),
+    )
+    results = pool.run(queue)
+
+    assert [r["job_id"] for r in results if "experiment_number" in r] == [manual.job_id]
+    assert not any("error" in r for r in results)
+    assert_held(queue, automatic, runs, results)
+
+
+def test_enqueue_all_saves_once(tmp_path, monkeypatch):
+    queue = ExperimentQueue(str(tmp_path / "queue.json"))
+    saves = []
+    save = queue.save
+    monkeypatch.setattr(queue, "save", lambda: (saves.append(1), save()))
+    queue.enqueue_all((formulation_from_dict({"Compound 1": 10}), 10.0, 1, "Manual") for _ in range(50))
+
+    assert len(saves) == 1
+    assert len(ExperimentQueue(str(tmp_path / "queue.json")).pending()) == 50
+
+
+def test_backlog_plans_each_job_once(monkeypatch):
+    import experiment_queue
+    planned = []
+    monkeypatch.setattr(experiment_queue, "plan_for", lambda f, total: planned.append(f) or object())
+    queue = ExperimentQueue(path=None)
+    jobs = queue.enqueue_all(
+        (formulation_from_dict({"Compound 1": 10}), 10.0, 1, "Manual") for _ in range(5)
+    )
+    for left, job in enumerate(reversed(jobs)):  # as the GUI does when each job starts
+        assert len(queue.backlog(exclude=job)) == len(jobs) - left - 1
+        queue.complete(job)
+
+    assert len(planned) == len(jobs) - 1  # every job but the first to start, once
@@ -0,0 +1,40 @@
+from formulation import Formulation, Component, additive_key_for
+
+
+def test_names_map_to_registry_keys():
+    assert additive_key_for("Compound 1") == "TEP"
+    assert additive_key_for("Compound 3") == "ADDITIVE_Y"
+    assert additive_key_for("TEP") == "TEP"            # a key is accepted as-is
+    assert additive_key_for("Compound 9") == "COMPOUND_9"  # unknown: caught by validation
+
+
+def test_adding_a_compound_twice_updates_its_row():
+    formulation = Formulation()
+    assert formulation.add("Compound 1", 3.0) == (0, True)
+    assert formulation.add("Compound 2", 2.0) == (1, True)
+    assert formulation.add("Compound 1", 1.5) == (0, False)
+
+    assert len(formulation) == 2
+    assert formulation.percentage_of("TEP") == 4.5
+    assert formulation.total_percentage == 6.5
+    assert formulation.labels() == ["Compound 1: 4.50%", "Compound 2: 2.00%"]
+
+
+def test_lookups_and_views():
+    formulation = Formulation([Component("Compound 1", 3), Component("Compound 3", 7)])
+    assert "ADDITIVE_Y" in formulation and "ADDITIVE_X" not in formulation
+    assert formulation.get("ADDITIVE_X") is None
+    assert formulation.percentage_of("ADDITIVE_X") == 0.0
+    assert formulation.by_additive_key() == {"TEP": 3.0, "ADDITIVE_Y": 7.0}
+    assert formulation.by_name() == {"Compound 1": 3.0, "Compound 3": 7.0}
+
+
+def test_copy_is_independent_and_clear_resets_the_total():
+    formulation = Formulation([Component("Compound 1", 3)])
+    copy = formulation.copy()
+    copy.add("Compound 1", 2)
+    assert formulation.percentage_of("TEP") == 3.0 and copy.percentage_of("TEP") == 5.0
+
+    formulation.clear()
+    assert len(formulation) == 0 and formulation.total_percentage == 0.0
+    assert "TEP" not in formulation
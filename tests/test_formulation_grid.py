@@ -0,0 +1,66 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from formulation_grid import (
+    simplex_grid, latin_hypercube, sobol_design, feasible_mask, to_volumes, generate_candidates,
+)
+
+
+@pytest.mark.parametrize("n_compounds", [1, 2, 3, 4])
+def test_grid_matches_a_brute_force_enumeration(n_compounds):
+    total, step = 10.0, 2.5
+    units = int(total / step)
+    expected = sorted(
+        combo for combo in itertools.product(range(units + 1), repeat=n_compounds)
+        if sum(combo) == units
+    )
+    grid = simplex_grid(n_compounds, total, step)
+    assert sorted(tuple(int(round(v / step)) for v in row) for row in grid) == expected
+    assert np.allclose(grid.sum(axis=1), total)
+
+
+def test_grid_rejects_a_step_that_does_not_divide_the_total():
+    with pytest.raises(ValueError):
+        simplex_grid(3, 10.0, 3.0)
+    with pytest.raises(ValueError):
+        simplex_grid(3, 10.0, 0.0)
+
+
+def test_latin_hypercube_is_stratified_and_sums_to_the_total():
+    n = 50
+    pcts = latin_hypercube(n, 3, 10.0, rng=1)
+    assert pcts.shape == (n, 3)
+    assert np.allclose(pcts.sum(axis=1), 10.0) and (pcts >= 0).all()
+
+    # With two compounds the first share is the unit sample itself:
+    # each of the n strata of [0, 1) holds exactly one sample
+    u = latin_hypercube(n, 2, 10.0, rng=1)[:, 0] / 10.0
+    assert sorted(np.floor(u * n).astype(int).tolist()) == list(range(n))
+
+
+def test_sobol_design_sums_to_the_total():
+    pytest.importorskip("scipy")
+    pcts = sobol_design(64, 3, 10.0, seed=2)
+    assert pcts.shape == (64, 3) and np.allclose(pcts.sum(axis=1), 10.0)
+
+
+def test_feasible_mask_applies_bounds_and_total():
+    pcts = np.array([[5.0, 5.0], [9.0, 1.0], [6.0, 3.0]])
+    assert feasible_mask(pcts, min_pct=2.0).tolist() == [True, False, True]
+    assert feasible_mask(pcts, max_pct=[6.0, 5.0]).tolist() == [True, False, True]
+    assert feasible_mask(pcts, total=10.0).tolist() == [True, True, False]
+
+
+def test_volumes_put_lp30_first_and_fill_the_balance():
+    volumes = to_volumes([[5.0, 5.0], [0.0, 0.0]], 3.0)
+    assert np.allclose(volumes, [[2.7, 0.15, 0.15], [3.0, 0.0, 0.0]])
+
+
+def test_generate_candidates_filters_before_computing_volumes():
+    pcts, volumes = generate_candidates(3, 10.0, 3.0, step=2.5, min_pct=2.5)
+    assert (pcts >= 2.5).all() and len(pcts) == 3  # (5, 2.5, 2.5) and its permutations
+    assert volumes.shape == (3, 4) and np.allclose(volumes.sum(axis=1), 3.0)
+    with pytest.raises(ValueError):
+        generate_candidates(3, 10.0, 3.0, design="random")
@@ -0,0 +1,86 @@
+import pytest
+
+from experiment_controller import formulation_from_dict
+from experiment_queue import ExperimentQueue
+from formulation_validation import (
+    validate, validate_batch, POLICIES, POLICY_STRICT, POLICY_WARN, POLICY_NORMALIZE,
+    SEVERITY_ERROR, SEVERITY_WARNING, SEVERITY_FIXED,
+)
+
+
+def test_unknown_compound_is_rejected_under_every_policy():
+    formulation = formulation_from_dict({"Compound 1": 5, "Compound 9": 5})
+    for policy in POLICIES:
+        result = validate(formulation, 10.0, policy=policy)
+        assert not result.accepted
+        errors = [v for v in result.violations if v.severity == SEVERITY_ERROR]
+        assert [v.rule for v in errors] == ["unknown_compound"]
+        assert "Compound 9" in errors[0].message
+
+
+def test_unknown_compound_is_rejected_in_automatic_mode():
+    report = validate_batch([("auto", formulation_from_dict({"Compound 9": 0}), 10.0, "Automatic")])
+    assert report.rejected() and report.count(SEVERITY_ERROR) == 1
+
+
+def test_policies_on_a_formulation_with_warnings():
+    formulation = formulation_from_dict({"Compound 1": 3, "Compound 2": 3})  # 6% of a 10% total
+    strict = validate(formulation, 10.0, policy=POLICY_STRICT)
+    warn = validate(formulation, 10.0, policy=POLICY_WARN)
+    normalize = validate(formulation, 10.0, policy=POLICY_NORMALIZE)
+
+    assert not strict.accepted
+    assert warn.accepted and warn.formulation is formulation
+    assert [v.rule for v in warn.violations] == ["sum_not_recommended"]
+    assert normalize.accepted and normalize.normalized
+    assert normalize.formulation.by_name() == {"Compound 1": 5.0, "Compound 2": 5.0}
+    assert [v.severity for v in normalize.violations] == [SEVERITY_FIXED]  # nothing left to warn about
+    assert formulation.total_percentage == 6  # the input is left alone
+
+
+def test_a_clean_formulation_passes_every_policy():
+    formulation = formulation_from_dict({"Compound 1": 5, "Compound 2": 5})
+    for policy in POLICIES:
+        result = validate(formulation, 10.0, policy=policy)
+        assert result.accepted and not result.violations
+
+
+def test_errors_are_rejected_under_every_policy():
+    for policy in POLICIES:
+        assert not validate(formulation_from_dict({"Compound 1": 5}), 120.0, policy=policy).accepted
+        assert not validate(formulation_from_dict({"Compound 1": -1}), 10.0, policy=policy).accepted
+
+
+def test_automatic_formulations_skip_the_total_checks():
+    formulation = formulation_from_dict({"Compound 1": 0, "Compound 2": 0})
+    result = validate(formulation, 7.0, mode="Automatic", policy=POLICY_STRICT)
+    assert result.accepted and not result.violations
+
+
+def test_batch_report_keeps_order_and_counts():
+    report = validate_batch([
+        ("ok", formulation_from_dict({"Compound 1": 10}), 10.0, "Manual"),
+        ("low", formulation_from_dict({"Compound 1": 6}), 10.0, "Manual"),
+        ("bad", formulation_from_dict({"Compound 1": -1}), 10.0, "Manual"),
+    ], POLICY_WARN)
+    assert [r.label for r in report] == ["ok", "low", "bad"]
+    assert [r.label for r in report.rejected()] == ["bad"]
+    assert (report.count(SEVERITY_ERROR), report.count(SEVERITY_WARNING)) == (1, 1)
+    assert report.summary() == "Validation (warn): 3 checked, 2 accepted, 1 rejected, 1 error(s), 1 warning(s)"
+    assert len(list(report.lines())) == 2
+
+
+def test_unknown_policy_is_refused():
+    with pytest.raises(ValueError):
+        validate_batch([], "lenient")
+
+
+def test_queue_validation_drops_rejected_jobs_and_keeps_normalized_ones():
+    queue = ExperimentQueue(path=None)
+    queue.enqueue(formulation_from_dict({"Compound 1": 3, "Compound 2": 3}), 10.0, 1)
+    queue.enqueue(formulation_from_dict({"Compound 9": 10}), 10.0, 1)
+
+    report = queue.validate(POLICY_NORMALIZE)
+    assert len(report.rejected()) == 1
+    [job] = queue.jobs
+    assert job.formulation().by_name() == {"Compound 1": 5.0, "Compound 2": 5.0}
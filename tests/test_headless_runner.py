@@ -0,0 +1,31 @@
+import io
+import json
+
+from experiment_controller import ExperimentRunner, formulation_from_dict
+from experiment_queue import ExperimentQueue
+import headless_runner
+
+run = ExperimentRunner.run
+
+
+def failing_run(self, formulation, *args, **kwargs):
+    if "ADDITIVE_Y" in formulation:  # Compound 3
+        raise RuntimeError("valve stuck")
+    return run(self, formulation, *args, **kwargs)
+
+
+def test_failing_queue_job_does_not_stop_the_queue(tmp_path, monkeypatch):
+    monkeypatch.setattr(ExperimentRunner, "run", failing_run)
+    path = str(tmp_path / "queue.json")
+    queue = ExperimentQueue(path)
+    for mix in ({"Compound 3": 10}, {"Compound 1": 10}, {"Compound 2": 10}):
+        queue.enqueue(formulation_from_dict(mix), 10.0, 1)
+
+    out = io.StringIO()
+    status = headless_runner.main(["--queue", "--queue-file", path, "--no-log"], out=out)
+    results = [json.loads(line) for line in out.getvalue().splitlines()]
+
+    assert status == 1
+    assert [r["job_id"] for r in results if "error" in r] == [1]
+    assert sorted(r["job_id"] for r in results if "experiment_number" in r) == [2, 3]
+    assert [job.job_id for job in ExperimentQueue(path).pending()] == [1]  # kept for a retry
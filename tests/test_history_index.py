@@ -0,0 +1,158 @@
+import math
+import random
+
+import pytest
+
+import history_index
+from history_index import HistoryIndex, Range, parse_query, record_metrics, record_additives
+
+NAMES = ["Compound 1", "Compound 2", "Compound 3"]
+
+
+def make_records(n, seed=0, names=NAMES, first=1):
+    rng = random.Random(seed)
+    records = []
+    for i in range(n):
+        readings = [round(rng.uniform(0, 100), 1) for _ in range(rng.randint(0, 3))]
+        records.append({
+            "experiment_number": first + i,
+            "logged_at": 1.7e9 + (first + i) * 3600,
+            "iterations": rng.randint(1, 5),
+            "mode": rng.choice(["Manual", "Automatic"]),
+            "rig": rng.choice(["rig-1", "rig-2", None]),
+            "conductivity_readings": readings,
+            "parsed_compounds": {
+                name: float(rng.randint(0, 10)) for name in names if rng.random() < 0.6
+            },
+        })
+    return records
+
+
+def field_value(record, field):
+    metrics = dict(zip(("mean", "std", "min", "max"), record_metrics(record)))
+    if field in metrics:
+        return metrics[field]
+    if field in ("mode", "rig"):
+        return record.get(field)
+    if field in history_index.NUMERIC_FIELDS:
+        return record.get(field, math.nan)
+    return record_additives(record).get(field, 0.0)
+
+
+def brute_force(records, **conditions):
+    """Row ids matching every condition, by checking each record."""
+    def matches(record):
+        for field, spec in conditions.items():
+            value = field_value(record, field)
+            if field in ("mode", "rig"):
+                if value is None or str(value).lower() != str(spec).lower():
+                    return False
+            elif not spec.mask(value):
+                return False
+        return True
+    return [i for i, record in enumerate(records) if matches(record)]
+
+
+QUERIES = [
+    {},
+    {"TEP": Range(3, 7)},
+    {"TEP": Range(3, 7), "mean": Range(50, lo_open=True)},
+    {"ADDITIVE_X": Range(0, 0), "mode": "Manual"},
+    {"ADDITIVE_Y": Range(None, 5, hi_open=True), "rig": "rig-2", "iterations": Range(2, 4)},
+    {"experiment_number": Range(100, 150), "std": Range(0, 20)},
+    {"mode": "automatic", "min": Range(10, 60, lo_open=True, hi_open=True)},
+    {"COMPOUND_4": Range(1, None)},
+    {"rig": "rig-9"},
+]
+
+
+def assert_matches_brute_force(index, records):
+    for conditions in QUERIES:
+        assert list(index.rows(**conditions)) == brute_force(records, **conditions), conditions
+
+
+def test_rows_match_a_brute_force_filter():
+    records = make_records(500)
+    assert_matches_brute_force(HistoryIndex.from_records(records), records)
+
+
+def test_rows_include_the_unsorted_tail():
+    records = make_records(300) + make_records(200, seed=1, names=NAMES + ["Compound 4"], first=301)
+    index = HistoryIndex.from_records(records[:300])
+    for record in records[300:]:  # logged live; Compound 4 appears for the first time
+        index.add(record)
+    assert_matches_brute_force(index, records)
+
+
+def test_rows_after_the_tail_is_reindexed(monkeypatch):
+    monkeypatch.setattr(history_index, "MIN_TAIL", 8)
+    records = make_records(400)
+    index = HistoryIndex.from_records(records[:50])
+    for i, record in enumerate(records[50:]):
+        index.add(record)
+        if i % 37 == 0:  # queries in between re-sort the tail once it grows
+            assert list(index.rows(TEP=Range(2, 8))) == brute_force(records[:51 + i], TEP=Range(2, 8))
+    assert_matches_brute_force(index, records)
+
+
+def test_tuple_and_single_value_conditions():
+    records = make_records(200)
+    index = HistoryIndex.from_records(records)
+    assert list(index.rows(TEP=(3, None))) == brute_force(records, TEP=Range(3, None))
+    assert list(index.rows(TEP=5)) == brute_force(records, TEP=Range(5, 5))
+
+
+def test_query_order_and_limit():
+    records = make_records(200)
+    index = HistoryIndex.from_records(records)
+    top = index.query(order_by="mean", descending=True, limit=5, mode="Manual")
+    expected = sorted(
+        (records[i] for i in brute_force(records, mode="Manual") if not math.isnan(field_value(records[i], "mean"))),
+        key=lambda r: -field_value(r, "mean"),
+    )[:5]
+    assert [r["experiment_number"] for r in top] == [r["experiment_number"] for r in expected]
+
+
+def test_best_per_combination_matches_a_brute_force_search():
+    records = make_records(300)
+    index = HistoryIndex.from_records(records)
+    best = {}
+    for record in records:
+        mean = field_value(record, "mean")
+        used = tuple(sorted(k for k, pct in record_additives(record).items() if pct > 0))
+        if len(used) == 2 and not math.isnan(mean) and (used not in best or mean > field_value(best[used], "mean")):
+            best[used] = record
+
+    result = index.best_per_combination(size=2)
+    assert {tuple(sorted(keys)): record["experiment_number"] for keys, record in result} == \
+        {keys: record["experiment_number"] for keys, record in best.items()}
+    scores = [field_value(record, "mean") for _, record in result]
+    assert scores == sorted(scores, reverse=True)
+
+
+def test_parse_query():
+    conditions = parse_query("TEP=3..7 mean>50 conductivity<=90 mode=Manual n=12 since=2026-10-01")
+    assert (conditions["TEP"].lo, conditions["TEP"].hi) == (3, 7)
+    assert conditions["mean"].hi == 90 and not conditions["mean"].hi_open
+    assert conditions["mode"] == "Manual"
+    assert (conditions["experiment_number"].lo, conditions["experiment_number"].hi) == (12, 12)
+    assert conditions["logged_at"].hi == math.inf
+
+    assert parse_query("tep>=2")["TEP"].lo == 2  # additive keys are case-insensitive
+    until = parse_query("until=2026-10-01")["logged_at"]
+    assert until.hi_open and until.hi - parse_query("since=2026-10-01")["logged_at"].lo == 86400
+    assert parse_query("ADDITIVE_X=..4")["ADDITIVE_X"].lo == -math.inf
+
+
+def test_parse_query_rejects_unreadable_terms():
+    with pytest.raises(ValueError):
+        parse_query("TEP")
+    with pytest.raises(ValueError):
+        parse_query("mean>high")
+
+
+def test_parsed_query_runs_against_the_index():
+    records = make_records(300)
+    index = HistoryIndex.from_records(records)
+    conditions = parse_query("TEP=3..7 mean>50 mode=manual")
+    assert list(index.rows(**conditions)) == brute_force(records, **conditions)
@@ -0,0 +1,75 @@
+import json
+
+from experiment_log import ExperimentLog, read_records_from, RECORD_EXPERIMENT
+from progress_model import ProgressModel, load_progress_model
+
+
+def log_runs(path, numbers, settle=3.0):
+    log = ExperimentLog(path)
+    for number in numbers:
+        log.log_experiment({"experiment_number": number, "settle_times": [settle]})
+        log.log_sample(number, 0, 1.0)
+    log.close()
+
+
+def test_load_folds_in_runs_logged_after_the_snapshot(tmp_path):
+    log_path, snapshot = str(tmp_path / "log.jsonl"), str(tmp_path / "stats.json")
+    log_runs(log_path, [1, 2])
+    load_progress_model(snapshot, log_path).save(snapshot)
+    log_runs(log_path, [3], settle=6.0)  # e.g. a headless run after the GUI closed
+
+    model = load_progress_model(snapshot, log_path)
+    assert model.settle.n == 3
+    assert model.settle.mean == 4.0
+
+
+def test_runs_learned_live_are_not_learned_twice(tmp_path):
+    log_path, snapshot = str(tmp_path / "log.jsonl"), str(tmp_path / "stats.json")
+    log_runs(log_path, [1])
+    model = load_progress_model(snapshot, log_path)
+    model.observe_settle(3.0)  # experiment 2, as the GUI sees it finish
+    model.mark_learned(2)
+    model.save(snapshot)
+    log_runs(log_path, [2, 3])  # the GUI's own record lands after the save
+
+    model = load_progress_model(snapshot, log_path)
+    assert model.settle.n == 3
+    assert not model.learned
+
+
+def test_replaced_log_is_relearned(tmp_path):
+    log_path, snapshot = str(tmp_path / "log.jsonl"), str(tmp_path / "stats.json")
+    log_runs(log_path, [1, 2, 3])
+    load_progress_model(snapshot, log_path).save(snapshot)
+    (tmp_path / "log.jsonl").unlink()
+    log_runs(log_path, [1])
+
+    assert load_progress_model(snapshot, log_path).settle.n == 1
+
+
+def test_old_snapshot_without_offset_is_rebuilt(tmp_path):
+    log_path, snapshot = str(tmp_path / "log.jsonl"), str(tmp_path / "stats.json")
+    log_runs(log_path, [1, 2])
+    data = load_progress_model(snapshot, log_path).to_dict()
+    del data["log_offset"], data["learned"]
+    (tmp_path / "stats.json").write_text(json.dumps(data))
+
+    assert load_progress_model(snapshot, log_path).settle.n == 2
+
+
+def test_a_line_being_written_is_left_for_the_next_read(tmp_path):
+    path = tmp_path / "log.jsonl"
+    path.write_bytes(b'{"type":"experiment","experiment_number":1}\n{"type":"exper')
+    read = list(read_records_from(str(path), 0, RECORD_EXPERIMENT))
+    assert [r["experiment_number"] for r, _ in read] == [1]
+    offset = read[-1][1]
+
+    with open(path, "ab") as f:
+        f.write(b'iment","experiment_number":2}\n')
+    assert [r["experiment_number"] for r, _ in read_records_from(str(path), offset)] == [2]
+
+
+def test_catch_up_without_a_log_is_a_no_op(tmp_path):
+    model = ProgressModel()
+    model.catch_up(str(tmp_path / "missing.jsonl"))
+    assert model.log_offset == 0 and model.settle.n == 0
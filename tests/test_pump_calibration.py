@@ -0,0 +1,59 @@
+import pytest
+
+from pump_calibration import PumpCalibration, PumpPhysics, simulated_calibration
+
+PORTS = (1, 2, 4)
+TARGETS = (0.05, 0.3, 2.7)  # ml: a trace additive, a typical one, the LP30 bulk
+TRIALS = 400
+
+
+@pytest.fixture(scope="module")
+def fitted():
+    return simulated_calibration(PumpPhysics(seed=1), PORTS)
+
+
+def allowed_error(calibration, target):
+    return max(calibration.tolerance * target, calibration.min_tolerance)
+
+
+def percentile_95(errors):
+    errors = sorted(abs(e) for e in errors)
+    return errors[int(0.95 * len(errors))]
+
+
+@pytest.mark.parametrize("port", PORTS)
+@pytest.mark.parametrize("target", TARGETS)
+def test_calibrated_dispenses_stay_within_tolerance(fitted, port, target):
+    setting = fitted.choose(port, target)
+    assert setting.within_tolerance
+
+    pump = PumpPhysics(seed=port * 1000 + int(target * 100))  # fresh draws, same pump
+    errors = [pump.deliver(port, setting.commanded, setting.rate) - target for _ in range(TRIALS)]
+    assert percentile_95(errors) <= allowed_error(fitted, target)
+
+
+def test_uncorrected_dispense_is_out_of_tolerance(fitted):
+    """The check above has teeth: commanding the target itself misses it."""
+    setting = fitted.choose(1, 2.7)
+    pump = PumpPhysics(seed=7)
+    errors = [pump.deliver(1, 2.7, setting.rate) - 2.7 for _ in range(TRIALS)]
+    assert percentile_95(errors) > allowed_error(fitted, 2.7)
+
+
+@pytest.mark.parametrize("port", PORTS)
+def test_chooses_the_fastest_rate_within_tolerance(fitted, port):
+    model = fitted.models[port]
+    for target in TARGETS:
+        setting = fitted.choose(port, target)
+        for rate in model.rates:
+            if model.error(target, rate) <= allowed_error(fitted, target):
+                assert setting.seconds <= model.command(target, rate) / rate + 1e-12
+
+
+def test_save_and_load_keep_the_settings(fitted, tmp_path):
+    path = str(tmp_path / "pump_calibration.json")
+    fitted.save(path)
+    loaded = PumpCalibration.load(path)
+    for port in PORTS:
+        for target in TARGETS:
+            assert loaded.settings(port, target) == pytest.approx(fitted.settings(port, target))
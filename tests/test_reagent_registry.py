@@ -0,0 +1,98 @@
+import pytest
+
+from reagent_registry import (
+    ReagentRegistry, Reagent, DEFAULT_REAGENTS, ROLE_ADDITIVE, ROLE_SOLVENT, ROLE_PURGE,
+)
+
+
+def sixteen_port_registry():
+    return ReagentRegistry.from_dicts(
+        DEFAULT_REAGENTS + [
+            {"key": f"ADDITIVE_{i}", "name": f"Compound {i}", "port": i + 2, "flow_rate": 0.4 + i / 100}
+            for i in range(4, 15)
+        ]
+    )
+
+
+def test_default_lookups():
+    registry = ReagentRegistry.default()
+    assert registry.key_for("Compound 1") == "TEP"
+    assert registry.key_for("TEP") == "TEP"  # a key is accepted as-is
+    assert registry.key_for("Compound 9") is None
+    assert registry.port_of("ADDITIVE_Y") == 5
+    assert registry.by_port(3).key == "ARGON" and registry.by_port(16) is None
+    assert registry.by_name("LP30") is registry["LP30"]
+    assert "TEP" in registry and "Compound 1" not in registry
+    assert registry.get("NOPE", 0) == 0
+    assert (registry.solvent.key, registry.purge.key) == ("LP30", "ARGON")
+    assert registry.compound_names() == ["Compound 1", "Compound 2", "Compound 3"]
+
+
+def test_lookups_on_a_larger_manifold():
+    registry = sixteen_port_registry()
+    assert len(registry) == 16
+    assert registry.port_of(registry.key_for("Compound 14")) == 16
+    assert registry["ADDITIVE_14"].flow_rate == pytest.approx(0.54)
+    assert [r.port for r in registry.additives] == [2, 4, 5] + list(range(6, 17))
+
+
+@pytest.mark.parametrize("entry, message", [
+    ({"key": "TEP", "name": "Compound 9", "port": 9}, "Duplicate reagent key"),
+    ({"key": "NEW", "name": "Compound 1", "port": 9}, "Duplicate reagent name"),
+    ({"key": "NEW", "name": "New", "port": 2}, "already used by TEP"),
+    ({"key": "NMP", "port": 9, "role": ROLE_SOLVENT}, "Two solvents"),
+    ({"key": "N2", "port": 9, "role": ROLE_PURGE}, "Two purge gases"),
+])
+def test_duplicates_are_refused(entry, message):
+    with pytest.raises(ValueError, match=message):
+        ReagentRegistry.from_dicts(DEFAULT_REAGENTS + [entry])
+
+
+def test_a_refused_reagent_leaves_the_registry_unchanged():
+    registry = ReagentRegistry.default()
+    with pytest.raises(ValueError):
+        registry.add(Reagent("NEW", "Compound 1", port=9))
+    assert "NEW" not in registry and registry.by_port(9) is None
+
+
+def test_one_solvent_and_one_purge_are_required():
+    without_purge = [entry for entry in DEFAULT_REAGENTS if entry.get("role") != ROLE_PURGE]
+    with pytest.raises(ValueError, match="one solvent and one purge"):
+        ReagentRegistry.from_dicts(without_purge)
+    without_solvent = [entry for entry in DEFAULT_REAGENTS if entry.get("role") != ROLE_SOLVENT]
+    with pytest.raises(ValueError, match="one solvent and one purge"):
+        ReagentRegistry.from_dicts(without_solvent)
+
+
+def test_bad_entries_are_refused():
+    with pytest.raises(ValueError, match="unknown role"):
+        Reagent("TEP", port=2, role="catalyst")
+    with pytest.raises(ValueError, match="no port"):
+        Reagent("TEP")
+
+
+def test_save_load_round_trip(tmp_path):
+    path = str(tmp_path / "reagents.json")
+    registry = sixteen_port_registry()
+    registry.save(path)
+    loaded = ReagentRegistry.load(path)
+
+    assert [r.to_dict() for r in loaded] == [r.to_dict() for r in sorted(registry, key=lambda r: r.port)]
+    assert loaded["TEP"].density == 1.07 and loaded["ARGON"].density is None
+
+
+def test_load_or_default_without_a_file(tmp_path):
+    registry = ReagentRegistry.load_or_default(str(tmp_path / "missing.json"))
+    assert [r.key for r in registry] == [entry["key"] for entry in DEFAULT_REAGENTS]
+
+
+def test_additives_dict():
+    registry = ReagentRegistry.default()
+    additives = registry.additives_dict()
+    assert set(additives) == {"TEP", "ADDITIVE_X", "ADDITIVE_Y", "LP30"}  # no purge gas
+    assert additives["LP30"] == {"port": 1, "used": True, "percentage": 100, "volume": 0.0}
+    assert additives["TEP"] == {"port": 2, "used": False, "percentage": 0, "volume": 0.0}
+
+    additives["TEP"]["used"] = True
+    assert registry.additives_dict()["TEP"]["used"] is False  # a fresh dict every time
+    assert all(r.role == ROLE_ADDITIVE for r in registry.additives)
@@ -0,0 +1,79 @@
+import pump_calibration
+from experiment_controller import formulation_from_dict
+from pump_calibration import PumpCalibration, PumpPhysics, simulated_calibration
+from recipe_cache import RecipeCache, recipe_key, recipe_key_for_record
+from reagent_registry import reagents
+
+MIX = {"Compound 1": 5, "Compound 2": 5}
+
+
+def test_recalibration_replans_cached_recipes(monkeypatch):
+    cache = RecipeCache()
+    formulation = formulation_from_dict(MIX)
+    monkeypatch.setattr(pump_calibration, "calibration", PumpCalibration())
+    uncalibrated, _ = cache.get_or_build(formulation, 10.0)
+
+    monkeypatch.setattr(pump_calibration, "calibration",
+                        simulated_calibration(PumpPhysics(seed=1), (1, 2, 4)))
+    calibrated, hit = cache.get_or_build(formulation, 10.0)
+    assert not hit
+    assert calibrated.frame != uncalibrated.frame  # corrected volumes and RATE commands
+    assert calibrated.key == uncalibrated.key      # same recipe: past results stay shared
+    assert cache.get_or_build(formulation, 10.0) == (calibrated, True)
+
+
+def test_a_reagent_flow_rate_change_replans(monkeypatch):
+    cache = RecipeCache()
+    formulation = formulation_from_dict(MIX)
+    monkeypatch.setattr(pump_calibration, "calibration", PumpCalibration())
+    before, _ = cache.get_or_build(formulation, 10.0)
+
+    monkeypatch.setattr(reagents["TEP"], "flow_rate", 0.48)
+    after, hit = cache.get_or_build(formulation, 10.0)
+    assert not hit and after.frame != before.frame
+
+
+def test_replicates_hit_whatever_the_compound_order():
+    cache = RecipeCache()
+    first, hit = cache.get_or_build(formulation_from_dict({"Compound 1": 5, "Compound 2": 5}), 10.0)
+    assert not hit
+    again, hit = cache.get_or_build(formulation_from_dict({"Compound 2": 5, "Compound 1": 5}), 10.0)
+    assert hit and again is first
+    other, hit = cache.get_or_build(formulation_from_dict({"Compound 1": 6, "Compound 2": 4}), 10.0)
+    assert not hit and other.key != first.key
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_least_recently_used_recipe_is_evicted():
+    cache = RecipeCache(capacity=2)
+    a, b, c = (formulation_from_dict({"Compound 1": pct}) for pct in (1, 2, 3))
+    cache.get_or_build(a, 10.0)
+    cache.get_or_build(b, 10.0)
+    cache.get_or_build(a, 10.0)  # a is now the most recent
+    cache.get_or_build(c, 10.0)  # evicts b
+    assert len(cache) == 2
+    assert cache.get_or_build(a, 10.0)[1]
+    assert not cache.get_or_build(b, 10.0)[1]
+
+
+def test_results_survive_eviction_and_merge_once():
+    cache = RecipeCache(capacity=1)
+    recipe, _ = cache.get_or_build(formulation_from_dict(MIX), 10.0)
+    cache.add_result(recipe.key, 1, [1.0, 3.0])
+    cache.get_or_build(formulation_from_dict({"Compound 3": 10}), 10.0)  # evicts the recipe
+    assert cache.results(recipe.key) == [(1, 2.0)]
+
+    past = RecipeCache()
+    past.add_result(recipe.key, 0, [4.0])
+    past.add_result(recipe.key, 1, [2.0])  # also recorded live
+    cache.merge_results(past)
+    assert cache.results(recipe.key) == [(0, 4.0), (1, 2.0)]
+
+
+def test_logged_records_map_back_to_their_recipe():
+    formulation = formulation_from_dict(MIX)
+    old_record = {  # written before records carried a "recipe" field
+        "parsed_compounds": {"Compound 1": 5.0, "Compound 2": 5.0},
+        "controller_additives": {"LP30": {"percentage": 90.0}},
+    }
+    assert recipe_key_for_record(old_record) == recipe_key(formulation, 10.0)
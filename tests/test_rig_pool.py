@@ -0,0 +1,78 @@
+import time
+
+from experiment_controller import formulation_from_dict
+from experiment_log import ExperimentLog, read_records, RECORD_EXPERIMENT
+from experiment_queue import ExperimentQueue, STATUS_FAILED
+from rig_pool import RigPool, RigRegistry, make_runner
+
+MIXES = [{"Compound 1": 5, "Compound 2": 5}, {"Compound 3": 10}, {"Compound 1": 10}]
+TIME_SCALE = 0.005  # a ~14 s dispense sleeps ~70 ms
+
+
+def make_queue(jobs):
+    queue = ExperimentQueue(path=None)
+    for i in range(jobs):
+        queue.enqueue(formulation_from_dict(MIXES[i % len(MIXES)]), 10.0, 2)
+    return queue
+
+
+def timed_run(rigs, jobs, log=None):
+    pool = RigPool(
+        RigRegistry.simulated(rigs),
+        runner_factory=lambda rig: make_runner(rig, log=log, interval=0.01, time_scale=TIME_SCALE),
+    )
+    queue = make_queue(jobs)
+    started = time.perf_counter()
+    results = pool.run(queue)
+    return results, time.perf_counter() - started, queue
+
+
+def test_throughput_scales_with_rigs():
+    results_1, elapsed_1, _ = timed_run(1, 12)
+    results_4, elapsed_4, _ = timed_run(4, 12)
+    assert len(results_1) == len(results_4) == 12
+    assert elapsed_4 < elapsed_1 / 2  # ideal is /4; leave room for a busy machine
+
+
+def test_rigs_merge_into_one_log(tmp_path):
+    path = str(tmp_path / "experiments_log.jsonl")
+    log = ExperimentLog(path)
+    results, _, queue = timed_run(3, 9, log=log)
+    log.close()
+
+    records = list(read_records(path, RECORD_EXPERIMENT))
+    assert sorted(r["experiment_number"] for r in records) == list(range(1, 10))
+    assert {r["rig"] for r in records} == {"sim-1", "sim-2", "sim-3"}
+    assert sorted(r["job_id"] for r in results) == list(range(1, 10))
+    assert len(queue) == 0
+
+
+def test_failing_job_is_marked_failed_and_the_rig_keeps_working():
+    def runner_factory(rig):
+        runner = make_runner(rig, time_scale=TIME_SCALE)
+        run = runner.run
+
+        def failing_run(formulation, *args, **kwargs):
+            if any(c.additive_key == "ADDITIVE_Y" for c in formulation):  # Compound 3
+                raise RuntimeError("valve stuck")
+            return run(formulation, *args, **kwargs)
+
+        runner.run = failing_run
+        return runner
+
+    queue = make_queue(6)  # jobs 2 and 5 use Compound 3; one rig must run the rest
+    pool = RigPool(RigRegistry.simulated(1), runner_factory=runner_factory, max_attempts=2)
+    results = pool.run(queue)
+
+    errors = [r for r in results if "error" in r]
+    assert sorted((r["job_id"], r["attempt"]) for r in errors) == [(2, 1), (2, 2), (5, 1), (5, 2)]
+    assert [r["failed"] for r in errors if r["attempt"] == 2] == [True, True]
+    assert sorted(r["job_id"] for r in results if "error" not in r) == [1, 3, 4, 6]
+    assert sorted(job.job_id for job in queue.failed()) == [2, 5]
+    assert all(job.status == STATUS_FAILED for job in queue.jobs)
+
+
+def test_jobs_left_over_are_reported_as_errors():
+    queue = make_queue(2)
+    results = RigPool(RigRegistry()).run(queue)  # no rig to take them
+    assert [(r["job_id"], "error" in r) for r in results] == [(1, True), (2, True)]
@@ -0,0 +1,111 @@
+import time
+
+import pytest
+
+pytest.importorskip("serial")
+pytest.importorskip("tty")  # the loopback is a POSIX pseudo-terminal
+
+from dispense_scheduler import SimulatedPump, send_plan
+from experiment_controller import plan_for, formulation_from_dict
+from serial_transport import SerialTransport, PtyLoopback, TransportError, open_serial_port
+
+
+class FlakyPort:
+    """A real pyserial port that fails on demand (see `faults`)."""
+
+    def __init__(self, conn, faults):
+        self.conn = conn
+        self.faults = faults
+
+    def write(self, data):
+        written = self.conn.write(data)
+        if self.faults["write"]:
+            self.faults["write"] -= 1
+            self.conn.flush()
+            raise OSError("write timeout")  # ...after the bytes went out
+        return written
+
+    @property
+    def in_waiting(self):
+        if self.faults["read"]:
+            self.faults["read"] -= 1
+            raise OSError("device disconnected")
+        return self.conn.in_waiting
+
+    def __getattr__(self, name):
+        return getattr(self.conn, name)
+
+
+@pytest.fixture
+def device():
+    with PtyLoopback(SimulatedPump().respond) as loopback:
+        yield loopback
+
+
+@pytest.fixture
+def faults():
+    return {"write": 0, "read": 0}
+
+
+@pytest.fixture
+def transport(device, faults):
+    transport = SerialTransport(
+        device.port, reset_delay=0, reconnect_backoff=0,
+        opener=lambda port, baudrate: FlakyPort(open_serial_port(port, baudrate), faults),
+    )
+    yield transport
+    transport.close()
+
+
+def a_plan():
+    return plan_for(formulation_from_dict({"Compound 1": 5, "Compound 2": 3}), 10.0)
+
+
+def wait_for(device, count, timeout=2.0):
+    deadline = time.perf_counter() + timeout
+    while len(device.received) < count and time.perf_counter() < deadline:
+        time.sleep(0.005)
+
+
+def test_batch_round_trips_over_the_pty(device, transport):
+    plan = a_plan()
+    assert send_plan(plan, transport) == "OK"
+    assert device.received == plan.frame()
+    assert transport.opens == 1
+
+
+def test_failed_write_is_not_resent(device, transport, faults):
+    plan = a_plan()
+    frame = plan.frame()
+    faults["write"] = 1
+    with pytest.raises(TransportError):
+        send_plan(plan, transport)
+    wait_for(device, len(frame))
+    time.sleep(0.1)  # anything resent would have arrived by now
+    assert device.received == frame  # received once, not twice
+
+    # The next batch reconnects and goes through exactly once
+    assert send_plan(plan, transport) == "OK"
+    assert device.received == frame + frame
+    assert transport.opens == 2
+
+
+def test_reconnect_keeps_received_lines(device, transport):
+    device.responder = lambda line: "OK 1\nOK 2"  # two lines in one write
+    transport.write_commands("STATUS")
+    wait_for(device, 1)
+    time.sleep(0.05)
+    assert transport.read_line() == "OK 1"  # "OK 2" arrived with it and is buffered
+
+    transport._rx += b"OK"  # half a line when the port drops: discarded
+    transport.reconnect()
+    assert transport.read_line() == "OK 2"
+    assert transport.poll_line() is None
+    assert (transport.opens, transport.reconnects) == (2, 1)
+
+
+def test_failed_read_reconnects_and_reads_again(transport, faults):
+    transport.open()
+    faults["read"] = 1
+    assert transport.poll_line() is None  # no exception: reopened and read again
+    assert transport.reconnects == 1
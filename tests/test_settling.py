@@ -0,0 +1,80 @@
+import math
+import random
+
+import pytest
+
+from experiment_engine import ExperimentEngine, EVENT_DONE
+from settling import SettlingDetector, SimulatedProbe
+
+
+def direct_stats(samples):
+    """Least-squares slope and population std of a window, computed from scratch."""
+    n = len(samples)
+    mt = sum(t for t, _ in samples) / n
+    mv = sum(v for _, v in samples) / n
+    sxx = sum((t - mt) ** 2 for t, _ in samples)
+    slope = sum((t - mt) * (v - mv) for t, v in samples) / sxx
+    std = math.sqrt(sum((v - mv) ** 2 for _, v in samples) / n)
+    return slope, std
+
+
+def test_running_sums_match_the_window_computed_directly():
+    rng = random.Random(3)
+    detector = SettlingDetector(window=8)
+    samples = []
+    for i in range(200):
+        t, v = 1000.0 + i * 0.1, 50.0 + 20.0 * math.exp(-i / 30.0) + rng.gauss(0, 0.5)
+        detector.add(t, v)
+        samples.append((t - 1000.0, v))
+        if len(samples) >= 8:
+            slope, std = direct_stats(samples[-8:])
+            assert detector.slope() == pytest.approx(slope, abs=1e-6)
+            assert detector.std() == pytest.approx(std, abs=1e-6)
+            assert detector.mean() == pytest.approx(sum(v for _, v in samples[-8:]) / 8)
+
+
+def test_settles_on_a_flat_quiet_signal_only_once_the_window_is_full():
+    detector = SettlingDetector(window=5, slope_tol=0.05, std_tol=0.1)
+    results = [detector.add(i * 0.1, 42.0 + (0.01 if i % 2 else 0.0)) for i in range(6)]
+    assert results == [False, False, False, False, True, True]
+
+
+def test_a_drifting_or_noisy_signal_does_not_settle():
+    drifting = SettlingDetector(window=5, slope_tol=0.05, std_tol=10.0)
+    assert not any(drifting.add(i * 0.1, 40.0 + i * 0.1) for i in range(50))  # 1 unit/s
+    noisy = SettlingDetector(window=5, slope_tol=100.0, std_tol=0.1)
+    assert not any(noisy.add(i * 0.1, 40.0 + (1.0 if i % 2 else -1.0)) for i in range(50))
+
+
+def test_reset_starts_a_new_iteration():
+    detector = SettlingDetector(window=3)
+    for i in range(3):
+        detector.add(i * 0.1, 1.0)
+    assert detector.settled and detector.elapsed == pytest.approx(0.2)
+    detector.reset()
+    assert not detector.settled and detector.elapsed == 0.0 and detector.mean() == 0.0
+    with pytest.raises(ValueError):
+        SettlingDetector(window=2)
+
+
+def test_engine_iterations_end_when_the_reading_settles():
+    probe = SimulatedProbe(target=60.0, tau=0.02, noise=0.001, seed=1)
+    detector = SettlingDetector(window=5, slope_tol=0.5, std_tol=0.05, sample_period=0.005,
+                                max_seconds=5.0)
+    engine = ExperimentEngine(3, measure=probe, settling=detector)
+    engine.start()
+    engine.join(10.0)
+
+    kind, _, readings = engine.outcome()
+    assert kind == EVENT_DONE
+    assert readings == pytest.approx([60.0] * 3, abs=0.1)
+    assert len(engine.settle_times) == 3 and max(engine.settle_times) < 1.0  # far below max_seconds
+
+
+def test_engine_gives_up_waiting_after_max_seconds():
+    ramp = iter(range(10 ** 6))
+    detector = SettlingDetector(window=3, sample_period=0.001, max_seconds=0.05)
+    engine = ExperimentEngine(1, measure=lambda: float(next(ramp)), settling=detector)
+    engine.start()
+    engine.join(5.0)
+    assert 0.05 <= engine.settle_times[0] < 1.0
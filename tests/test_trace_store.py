@@ -0,0 +1,79 @@
+import os
+
+import numpy as np
+
+from trace_store import TraceStore, COLUMNS
+
+T0 = 1_700_000_000.0
+
+
+def write_trace(root, number=1, samples=1000, chunk_samples=64, dt=0.25):
+    """Samples at T0 + k*dt with value k, in iterations of 100 samples."""
+    writer = TraceStore(str(root)).writer(number, chunk_samples=chunk_samples)
+    for k in range(samples):
+        writer.append(T0 + k * dt, float(k), k // 100)
+    writer.close()
+    return TraceStore(str(root)).open(number)
+
+
+def test_window_matches_a_brute_force_slice(tmp_path):
+    trace = write_trace(tmp_path)
+    t, v = np.asarray(trace.timestamps) / 1e9, np.asarray(trace.values)
+    for start, end in ((None, None), (T0 + 10, T0 + 20), (T0 + 10.1, T0 + 10.2),
+                       (T0 - 5, T0 + 1), (T0 + 249, T0 + 999), (None, T0 + 3), (T0 + 30, T0 + 30)):
+        got_t, got_v = trace.window(start, end)
+        keep = np.ones(len(t), dtype=bool)
+        if start is not None:
+            keep &= t >= start
+        if end is not None:
+            keep &= t < end
+        assert np.array_equal(got_v, v[keep]), (start, end)
+        assert np.array_equal(got_t, t[keep])
+
+
+def test_window_is_half_open(tmp_path):
+    trace = write_trace(tmp_path)
+    _, v = trace.window(T0 + 1.0, T0 + 2.0)  # samples 4..7; 8 is at exactly 2.0 s
+    assert list(v) == [4.0, 5.0, 6.0, 7.0]
+    assert trace.window_slice(T0 + 2.0, T0 + 1.0) == slice(8, 8)  # reversed bounds: empty
+
+
+def test_iteration_slices_one_iteration(tmp_path):
+    trace = write_trace(tmp_path)
+    _, v = trace.iteration(3)
+    assert list(v) == [float(k) for k in range(300, 400)]
+    assert len(trace.iteration(42)[1]) == 0
+
+
+def test_torn_final_chunk_is_ignored(tmp_path):
+    write_trace(tmp_path, samples=100)
+    run = os.path.join(str(tmp_path), "exp-000001")
+    name, _, dtype = COLUMNS[1]
+    with open(os.path.join(run, name), "ab") as f:
+        f.write(b"\0" * np.dtype(dtype).itemsize * 3)  # the value column ran ahead
+
+    trace = TraceStore(str(tmp_path)).open(1)
+    assert len(trace) == 100
+    assert trace.values[-1] == 99.0
+
+
+def test_writer_continues_an_existing_trace(tmp_path):
+    store = TraceStore(str(tmp_path))
+    write_trace(tmp_path, samples=10)
+    writer = store.writer(1)
+    writer.append(T0 + 100, -1.0, 5)
+    writer.close()
+
+    trace = store.open(1)
+    assert len(trace) == 11 and trace.values[-1] == -1.0
+    assert trace.experiment_number == 1
+
+
+def test_store_lists_experiments(tmp_path):
+    store = TraceStore(str(tmp_path))
+    assert store.experiments() == []
+    for number in (12, 3):
+        store.writer(number).close()
+    assert store.experiments() == [3, 12]
+    assert 3 in store and 4 not in store
+    assert len(store.open(3)) == 0 and store.open(3).start is None
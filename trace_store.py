@@ -0,0 +1,199 @@
+import json
+import os
+import sys
+import time
+from array import array
+
+# ------------------------------------------------------------------
+# CONDUCTIVITY TRACE STORE (binary, columnar, append-only)
+#
+# Every raw meter reading of an experiment, in one directory per run:
+#
+#   traces/exp-000012/
+#       meta.json   {"experiment_number": 12, "byteorder": "little", ...}
+#       t.i64       timestamps, int64 nanoseconds since the epoch
+#       v.f32       conductivity, float32
+#       i.i32       iteration index, int32
+#
+# The writer buffers samples in typed arrays and appends them to the
+# column files one chunk at a time, so a sample costs three array
+# appends. Readers memory-map the columns: only the pages that are
+# actually touched are read, and a time window is found by binary
+# search on the (monotonic) timestamps, so slicing one minute out of a
+# 24 h run reads a few pages, not the file.
+#
+# A crash can leave the columns at different lengths; readers use the
+# shortest one, so a torn final chunk is ignored.
+# ------------------------------------------------------------------
+
+TRACE_DIR = "traces"
+CHUNK_SAMPLES = 4096  # samples buffered per column write
+
+COLUMNS = (  # (file name, array typecode, NumPy dtype)
+    ("t.i64", "q", "i8"),
+    ("v.f32", "f", "f4"),
+    ("i.i32", "i", "i4"),
+)
+
+
+def _run_dir(root, experiment_number):
+    return os.path.join(root, f"exp-{int(experiment_number):06d}")
+
+
+class TraceWriter:
+    def __init__(self, directory, experiment_number, chunk_samples=CHUNK_SAMPLES):
+        """Appends to the trace in `directory` (created, or continued if it exists)."""
+        self.directory = directory
+        self.chunk_samples = chunk_samples
+        os.makedirs(directory, exist_ok=True)
+        meta_path = os.path.join(directory, "meta.json")
+        if not os.path.exists(meta_path):
+            with open(meta_path, "w", encoding="utf-8") as f:
+                json.dump({
+                    "experiment_number": experiment_number,
+                    "byteorder": sys.byteorder,
+                    "columns": {name: dtype for name, _, dtype in COLUMNS},
+                    "created_at": time.time(),
+                }, f)
+        self._files = [open(os.path.join(directory, name), "ab") for name, _, _ in COLUMNS]
+        self._t, self._v, self._i = (array(code) for _, code, _ in COLUMNS)
+        self.samples = 0
+
+    def append(self, timestamp, value, iteration=0):
+        """One reading; `timestamp` in seconds since the epoch (time.time())."""
+        self._t.append(int(timestamp * 1e9))
+        self._v.append(value)
+        self._i.append(iteration)
+        self.samples += 1
+        if len(self._t) >= self.chunk_samples:
+            self.flush()
+
+    def extend(self, timestamps, values, iteration=0):
+        """A block of readings from the same iteration."""
+        for timestamp, value in zip(timestamps, values):
+            self.append(timestamp, value, iteration)
+
+    def flush(self):
+        if not self._t:
+            return
+        for f, column in zip(self._files, (self._t, self._v, self._i)):
+            column.tofile(f)
+            del column[:]
+        for f in self._files:
+            f.flush()
+
+    def close(self):
+        if self._files is None:
+            return
+        self.flush()
+        for f in self._files:
+            os.fsync(f.fileno())
+            f.close()
+        self._files = None
+
+
+class Trace:
+    """Read-only, memory-mapped view of one experiment's trace."""
+
+    def __init__(self, directory):
+        import numpy as np
+
+        with open(os.path.join(directory, "meta.json"), encoding="utf-8") as f:
+            self.meta = json.load(f)
+        order = "<" if self.meta.get("byteorder", "little") == "little" else ">"
+        paths = [os.path.join(directory, name) for name, _, _ in COLUMNS]
+        dtypes = [np.dtype(order + dtype) for _, _, dtype in COLUMNS]
+        # Shortest column wins: a crash mid-chunk leaves a torn tail
+        length = min(os.path.getsize(p) // d.itemsize for p, d in zip(paths, dtypes))
+        self.timestamps, self.values, self.iterations = (
+            np.memmap(p, dtype=d, mode="r", shape=(length,)) if length else np.empty(0, dtype=d)
+            for p, d in zip(paths, dtypes)
+        )
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    @property
+    def experiment_number(self):
+        return self.meta.get("experiment_number")
+
+    @staticmethod
+    def _search(column, key, side):
+        # A key of the column's own dtype: a mismatch would convert the whole memmap
+        import numpy as np
+        return int(np.searchsorted(column, column.dtype.type(key), side))
+
+    def window_slice(self, start=None, end=None):
+        """Index range of the samples with start <= t < end (seconds; None = open end)."""
+        lo = 0 if start is None else self._search(self.timestamps, int(start * 1e9), "left")
+        hi = len(self) if end is None else self._search(self.timestamps, int(end * 1e9), "left")
+        return slice(lo, max(lo, hi))
+
+    def window(self, start=None, end=None):
+        """(timestamps in seconds, values) for start <= t < end; only that range is read."""
+        s = self.window_slice(start, end)
+        return self.timestamps[s] / 1e9, self.values[s]
+
+    def iteration(self, index):
+        """(timestamps in seconds, values) of one iteration."""
+        lo = self._search(self.iterations, index, "left")
+        hi = self._search(self.iterations, index, "right")
+        return self.timestamps[lo:hi] / 1e9, self.values[lo:hi]
+
+    @property
+    def start(self):
+        return self.timestamps[0] / 1e9 if len(self) else None
+
+    @property
+    def end(self):
+        return self.timestamps[-1] / 1e9 if len(self) else None
+
+
+class TraceStore:
+    def __init__(self, root=TRACE_DIR):
+        self.root = root
+
+    def writer(self, experiment_number, chunk_samples=CHUNK_SAMPLES):
+        return TraceWriter(_run_dir(self.root, experiment_number), experiment_number, chunk_samples)
+
+    def open(self, experiment_number):
+        return Trace(_run_dir(self.root, experiment_number))
+
+    def __contains__(self, experiment_number):
+        return os.path.exists(os.path.join(_run_dir(self.root, experiment_number), "meta.json"))
+
+    def experiments(self):
+        """Experiment numbers with a trace, ascending."""
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(
+            int(name[4:]) for name in os.listdir(self.root)
+            if name.startswith("exp-") and name[4:].isdigit()
+        )
+
+
+# --- Slice a run: python trace_store.py 12 [--from T0] [--to T1] ---
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Summarize a time window of a conductivity trace.")
+    parser.add_argument("experiment", type=int)
+    parser.add_argument("--root", default=TRACE_DIR)
+    parser.add_argument("--from", dest="start", type=float, help="seconds after the first sample")
+    parser.add_argument("--to", dest="end", type=float, help="seconds after the first sample")
+    args = parser.parse_args()
+
+    trace = TraceStore(args.root).open(args.experiment)
+    if not len(trace):
+        sys.exit(f"Experiment {args.experiment}: empty trace")
+    origin = trace.start
+    t, v = trace.window(
+        None if args.start is None else origin + args.start,
+        None if args.end is None else origin + args.end,
+    )
+    print(f"Experiment {args.experiment}: {len(trace)} samples over {trace.end - origin:.1f} s")
+    if len(v):
+        print(f"  window {t[0] - origin:.2f}-{t[-1] - origin:.2f} s: {len(v)} samples, "
+              f"min {v.min():.3f} / mean {v.mean(dtype='f8'):.3f} / max {v.max():.3f}")
+    else:
+        print("  no samples in that window")
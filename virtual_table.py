@@ -0,0 +1,298 @@
+import bisect
+import tkinter as tk
+from tkinter import ttk
+
+# ------------------------------------------------------------------
+# VIRTUALIZED TABLE
+#
+# A ttk.Treeview that only ever holds `height` items. The rows live in
+# a plain Python model (list + key index); scrolling just rewrites the
+# values of the visible items, and each item is only touched when what
+# it shows actually changes. Adding or updating a row is a diff against
+# the model, never a rebuild of the widget, so tens of thousands of
+# rows stay smooth.
+#
+# Click a column heading to sort (again to reverse); set_filter()
+# shows only rows containing the given text.
+# ------------------------------------------------------------------
+
+
+def _sort_key(value):
+    """
+    Numbers (and numeric text such as "5.00") sort numerically and before
+    other text, which sorts case-insensitively.
+    """
+    if isinstance(value, str):
+        try:
+            value = float(value)
+        except ValueError:
+            return (1, 0, value.lower())
+    if isinstance(value, (int, float)):
+        return (0, value, "")
+    return (1, 0, str(value).lower())
+
+
+class VirtualTable(tk.Frame):
+    def __init__(self, parent, columns, height=10, widths=None, **frame_options):
+        """
+        columns: [(column id, heading text), ...]
+        height:  visible rows (also the number of Treeview items ever created)
+        widths:  {column id: pixels}
+        """
+        super().__init__(parent, **frame_options)
+        self.columns = [c for c, _ in columns]
+        self.headings = dict(columns)
+        self.height = height
+
+        self.tree = ttk.Treeview(self, columns=self.columns, show="headings",
+                                 height=height, selectmode="browse")
+        for col in self.columns:
+            self.tree.heading(col, text=self.headings[col], command=lambda c=col: self.sort_by(c))
+            self.tree.column(col, width=(widths or {}).get(col, 120), stretch=True)
+        self.scrollbar = ttk.Scrollbar(self, orient="vertical", command=self.yview)
+        self.tree.grid(row=0, column=0, sticky="nsew")
+        self.scrollbar.grid(row=0, column=1, sticky="ns")
+        self.rowconfigure(0, weight=1)
+        self.columnconfigure(0, weight=1)
+
+        # One Treeview item per visible slot, reused for every row shown there
+        self._slots = [self.tree.insert("", "end", values=()) for _ in range(height)]
+        self._attached = height
+        self._shown = [None] * height  # (key, values) currently displayed per slot
+
+        # Model
+        self._keys = []
+        self._rows = []
+        self._search = []  # lower-case text per row, for filtering
+        self._index = {}   # key -> model row
+        # View: model rows passing the filter, in display order
+        self._view = []
+        self._view_sort_keys = []  # parallel to _view while sorted (for bisect)
+        self._sorted_all = None    # every row in sort order, reused while only the filter changes
+        self.sort_column = None
+        self.sort_reverse = False
+        self.filter_text = ""
+        self.offset = 0
+        self.selected_key = None
+
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self.tree.bind(sequence, self._on_wheel)
+        self.tree.bind("<Up>", lambda e: self.move_selection(-1))
+        self.tree.bind("<Down>", lambda e: self.move_selection(1))
+        self.tree.bind("<Prior>", lambda e: self.move_selection(-self.height))
+        self.tree.bind("<Next>", lambda e: self.move_selection(self.height))
+        self.tree.bind("<<TreeviewSelect>>", self._on_select)
+
+    # ---------- Model ----------
+    def __len__(self):
+        return len(self._rows)
+
+    @property
+    def visible_count(self):
+        """Rows passing the current filter."""
+        return len(self._view)
+
+    def row(self, key):
+        return self._rows[self._index[key]]
+
+    def upsert(self, key, values):
+        """Adds a row, or updates the row with this key in place."""
+        values = tuple(values)
+        self._sorted_all = None
+        i = self._index.get(key)
+        if i is None:
+            i = len(self._rows)
+            self._index[key] = i
+            self._keys.append(key)
+            self._rows.append(values)
+            self._search.append(self._search_text(values))
+        else:
+            if self._rows[i] == values:
+                return
+            if self._matches(i):
+                self._view_remove(i)
+            self._rows[i] = values
+            self._search[i] = self._search_text(values)
+        if self._matches(i):
+            self._view_insert(i)
+        self._render()
+
+    def extend(self, items):
+        """Bulk add of (key, values) pairs; the view is rebuilt once."""
+        self._sorted_all = None
+        for key, values in items:
+            values = tuple(values)
+            i = self._index.get(key)
+            if i is None:
+                self._index[key] = len(self._rows)
+                self._keys.append(key)
+                self._rows.append(values)
+                self._search.append(self._search_text(values))
+            else:
+                self._rows[i] = values
+                self._search[i] = self._search_text(values)
+        self._rebuild_view()
+
+    def set_rows(self, items):
+        self.clear()
+        self.extend(items)
+
+    def clear(self):
+        self._keys.clear()
+        self._rows.clear()
+        self._search.clear()
+        self._index.clear()
+        self.selected_key = None
+        self._rebuild_view()
+
+    # ---------- Sort & filter ----------
+    def sort_by(self, column, reverse=None):
+        """Sorts by a column; without `reverse`, clicking the same column again flips it."""
+        if reverse is None:
+            reverse = not self.sort_reverse if column == self.sort_column else False
+        self.sort_column = column
+        self.sort_reverse = reverse
+        self._sorted_all = None
+        for col in self.columns:
+            arrow = (" ▼" if reverse else " ▲") if col == column else ""
+            self.tree.heading(col, text=self.headings[col] + arrow)
+        self._rebuild_view()
+
+    def set_filter(self, text):
+        self.filter_text = text.strip().lower()
+        self.offset = 0
+        self._rebuild_view()
+
+    def _search_text(self, values):
+        return " ".join(str(v) for v in values).lower()
+
+    def _matches(self, i):
+        return not self.filter_text or self.filter_text in self._search[i]
+
+    def _row_sort_key(self, i):
+        key = _sort_key(self._rows[i][self.columns.index(self.sort_column)])
+        return (key, i)  # model order breaks ties, so the sort is stable
+
+    def _rebuild_view(self):
+        if self.sort_column is not None:
+            if self._sorted_all is None:
+                self._sorted_all = sorted((self._row_sort_key(i) for i in range(len(self._rows))),
+                                          reverse=self.sort_reverse)
+            self._view_sort_keys = [k for k in self._sorted_all if self._matches(k[1])]
+            self._view = [i for _, i in self._view_sort_keys]
+        else:
+            self._view = [i for i in range(len(self._rows)) if self._matches(i)]
+            self._view_sort_keys = []
+        self._render()
+
+    def _view_insert(self, i):
+        if self.sort_column is None:
+            bisect.insort(self._view, i)  # model order
+            return
+        # Binary search in display order (ascending or descending)
+        key = self._row_sort_key(i)
+        keys = self._view_sort_keys
+        lo, hi = 0, len(keys)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if (keys[mid] > key) if self.sort_reverse else (keys[mid] < key):
+                lo = mid + 1
+            else:
+                hi = mid
+        self._view.insert(lo, i)
+        keys.insert(lo, key)
+
+    def _view_remove(self, i):
+        pos = self._view.index(i)
+        del self._view[pos]
+        if self._view_sort_keys:
+            del self._view_sort_keys[pos]
+
+    # ---------- Scrolling ----------
+    def yview(self, *args):
+        """Scrollbar command: ("moveto", fraction) or ("scroll", n, "units"|"pages")."""
+        if not args:
+            return
+        if args[0] == "moveto":
+            self.scroll_to(int(float(args[1]) * len(self._view)))
+        elif args[0] == "scroll":
+            step = int(args[1]) * (self.height if args[2] == "pages" else 1)
+            self.scroll_to(self.offset + step)
+
+    def scroll_to(self, offset):
+        self.offset = offset
+        self._render()
+
+    def see(self, key):
+        """Scrolls so the row with this key is visible."""
+        i = self._index.get(key)
+        if i is None or not self._matches(i):
+            return
+        pos = self._view.index(i)
+        if pos < self.offset:
+            self.scroll_to(pos)
+        elif pos >= self.offset + self.height:
+            self.scroll_to(pos - self.height + 1)
+
+    def _on_wheel(self, event):
+        if event.num == 4 or getattr(event, "delta", 0) > 0:
+            self.scroll_to(self.offset - 3)
+        else:
+            self.scroll_to(self.offset + 3)
+        return "break"
+
+    # ---------- Selection ----------
+    def _on_select(self, event):
+        selection = self.tree.selection()
+        if selection and selection[0] in self._slots:
+            shown = self._shown[self._slots.index(selection[0])]
+            if shown is not None:
+                self.selected_key = shown[0]
+
+    def move_selection(self, step):
+        if not self._view:
+            return "break"
+        pos = 0
+        i = self._index.get(self.selected_key)
+        if i is not None and self._matches(i):
+            pos = min(max(self._view.index(i) + step, 0), len(self._view) - 1)
+        self.selected_key = self._keys[self._view[pos]]
+        self.see(self.selected_key)
+        self._render()
+        return "break"
+
+    # ---------- Rendering ----------
+    def _render(self):
+        total = len(self._view)
+        self.offset = max(0, min(self.offset, total - self.height))
+        window = self._view[self.offset:self.offset + self.height]
+
+        # Show only as many items as there are rows
+        needed = len(window)
+        while self._attached > needed:
+            self._attached -= 1
+            self.tree.detach(self._slots[self._attached])
+            self._shown[self._attached] = None
+        while self._attached < needed:
+            self.tree.move(self._slots[self._attached], "", self._attached)
+            self._attached += 1
+
+        selected_slot = None
+        for slot, i in enumerate(window):
+            shown = (self._keys[i], self._rows[i])
+            if self._shown[slot] != shown:  # diff: only touch what changed
+                self.tree.item(self._slots[slot], values=self._rows[i])
+                self._shown[slot] = shown
+            if shown[0] == self.selected_key:
+                selected_slot = self._slots[slot]
+
+        if selected_slot is not None:
+            if self.tree.selection() != (selected_slot,):
+                self.tree.selection_set(selected_slot)
+        elif self.tree.selection():
+            self.tree.selection_remove(*self.tree.selection())
+
+        if total:
+            self.scrollbar.set(self.offset / total, min(1.0, (self.offset + self.height) / total))
+        else:
+            self.scrollbar.set(0.0, 1.0)